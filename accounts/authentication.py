@@ -1,6 +1,87 @@
-# accounts/authentication.py
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication as BaseJWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+# User fields kept in the cache: what authentication and the permission
+# classes read. Never the password hash; the revoke check only needs the
+# digest tokens carry.
+CACHED_USER_FIELDS = ('id', 'is_active', 'is_staff', 'role')
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def get_cached_user(user_id):
+    """
+    The user with this id, None if there is none. Built from the cached
+    fields when possible; the others are deferred, loaded on first access.
+    The user gets `password_digest` for the revoke check.
+    """
+    User = get_user_model()
+    key = user_cache_key(user_id)
+    entry = cache.get(key)
+    if entry is None:
+        row = (
+            User.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+            .values(*CACHED_USER_FIELDS, 'password').first()
+        )
+        if row is None:
+            return None
+        entry = {field: row[field] for field in CACHED_USER_FIELDS}
+        entry['password_digest'] = get_md5_hash_password(row['password'])
+        cache.set(key, entry, settings.AUTH_USER_CACHE_TIMEOUT)
+
+    # from_db takes the values in the model's field order
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in entry]
+    user = User.from_db(router.db_for_read(User), field_names, [entry[name] for name in field_names])
+    user.password_digest = entry['password_digest']
+    return user
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class JWTAuthentication(BaseJWTAuthentication):
+    """
+    JWT authentication that resolves the token's user from the cache
+    (keyed by user id, AUTH_USER_CACHE_TIMEOUT seconds) instead of a User
+    SELECT per request. Only CACHED_USER_FIELDS and the password digest are
+    cached. Saving or deleting a User drops its entry (see
+    accounts.signals), but only in the cache of the process that saved it
+    unless CACHES is shared (REDIS_URL): other processes keep authenticating
+    the old values, e.g. a deactivated user, until their entry times out.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        # The same checks as JWTAuthentication.get_user
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != user.password_digest:
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        return user
 
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
 class CookieJWTAuthentication(JWTAuthentication):
     def authenticate(self, request):
@@ -12,4 +93,4 @@ class CookieJWTAuthentication(JWTAuthentication):
         
         # Validate the token
         validated_token = self.get_validated_token(access_token)
-        return self.get_user(validated_token), validated_token
\ No newline at end of file
+        return self.get_user(validated_token), validated_token
@@ -0,0 +1,260 @@
+"""
+Asymmetric JWT signing with rotating keys.
+
+Tokens are signed with the current SigningKey (RS256 or EdDSA, per
+JWT_SIGNING_ALGORITHM) and carry its `kid` in their header. They are
+verified with the published key that kid names. The public keys are
+served as a JWKS (accounts.views.JWKSView), so other services can verify
+tokens themselves.
+
+rotate_signing_keys, run on a schedule, handles rotation. It publishes a
+new key JWT_KEY_PUBLISH_AHEAD before the key starts signing, so JWKS
+caches already hold it by then. The key it replaces stays published
+until every token it signed has expired.
+
+Every process keeps the parsed keys in memory (`key_ring`). It reloads
+the published set every JWT_KEY_RING_REFRESH seconds, or sooner when a
+token names a kid it doesn't know.
+"""
+import base64
+import hashlib
+import json
+import threading
+import time
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from jwt import ExpiredSignatureError, InvalidAlgorithmError, InvalidTokenError
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenBackendExpiredToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import SigningKey
+
+# Unknown kids reload the key ring at most this often (seconds), so tokens
+# with made-up kids can't turn every request into a query
+UNKNOWN_KID_RELOAD_INTERVAL = 5
+
+
+# ============ KEYS ============
+
+def _password():
+    return settings.JWT_KEY_PASSWORD.encode()
+
+
+def generate_private_key(algorithm):
+    if algorithm == 'RS256':
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    if algorithm == 'EdDSA':
+        return ed25519.Ed25519PrivateKey.generate()
+    raise ValueError(f"Unsupported signing algorithm: {algorithm}")
+
+
+def create_signing_key(activates_at=None, algorithm=None):
+    """Generate and store a key pair that signs from `activates_at` (now by default)"""
+    algorithm = algorithm or settings.JWT_SIGNING_ALGORITHM
+    private_key = generate_private_key(algorithm)
+    public_der = private_key.public_key().public_bytes(
+        serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return SigningKey.objects.create(
+        kid=base64.urlsafe_b64encode(hashlib.sha256(public_der).digest()[:12]).decode(),
+        algorithm=algorithm,
+        private_key=private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.BestAvailableEncryption(_password()),
+        ).decode(),
+        public_key=private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode(),
+        activates_at=activates_at or timezone.now(),
+    )
+
+
+def published_keys(now=None):
+    now = now or timezone.now()
+    return SigningKey.objects.filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now))
+
+
+class RingKey:
+    """A published key, parsed once; the private half is decrypted on first use"""
+
+    def __init__(self, row):
+        self.kid = row.kid
+        self.algorithm = row.algorithm
+        self.activates_at = row.activates_at
+        self.expires_at = row.expires_at
+        self.public = serialization.load_pem_public_key(row.public_key.encode())
+        self._private_pem = row.private_key
+        self._private = None
+
+    @property
+    def private(self):
+        if self._private is None:
+            self._private = serialization.load_pem_private_key(self._private_pem.encode(), password=_password())
+        return self._private
+
+    def is_published(self, now):
+        return self.expires_at is None or self.expires_at > now
+
+    def jwk(self):
+        algorithm = jwt.get_algorithm_by_name(self.algorithm)
+        return {**algorithm.to_jwk(self.public, as_dict=True), 'kid': self.kid, 'alg': self.algorithm, 'use': 'sig'}
+
+
+class KeyRing:
+    """The published keys of this process"""
+
+    def __init__(self):
+        self._keys = {}
+        self._loaded_at = None
+        self._jwks = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        keys = {}
+        for row in published_keys():
+            key = self._keys.get(row.kid)
+            if key is None:
+                key = RingKey(row)
+            else:
+                # Rotation sets expires_at on keys already in use
+                key.expires_at = row.expires_at
+            keys[row.kid] = key
+        self._keys = keys
+        self._jwks = None
+        self._loaded_at = time.monotonic()
+
+    def reload(self):
+        with self._lock:
+            self._load()
+
+    def keys(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > settings.JWT_KEY_RING_REFRESH:
+            with self._lock:
+                if self._loaded_at == loaded_at:
+                    self._load()
+        return self._keys
+
+    def verifying_key(self, kid):
+        now = timezone.now()
+        key = self.keys().get(kid)
+        if key is None and time.monotonic() - self._loaded_at > UNKNOWN_KID_RELOAD_INTERVAL:
+            # Possibly a key another process just created
+            self.reload()
+            key = self._keys.get(kid)
+        if key is None or not key.is_published(now):
+            return None
+        return key
+
+    def signing_key(self):
+        """The latest activated key; one is created if there is none"""
+        key = self._current(timezone.now())
+        if key is None:
+            create_signing_key()
+            self.reload()
+            key = self._current(timezone.now())
+        return key
+
+    def _current(self, now):
+        active = [key for key in self.keys().values() if key.activates_at <= now and key.is_published(now)]
+        return max(active, key=lambda key: key.activates_at, default=None)
+
+    def jwks(self):
+        """
+        (document, etag) of the JWKS of the published keys, including ones
+        that don't sign yet
+        """
+        keys = self.keys()
+        if self._jwks is None:
+            now = timezone.now()
+            document = {'keys': [key.jwk() for key in keys.values() if key.is_published(now)]}
+            digest = hashlib.sha1(json.dumps(document, sort_keys=True).encode()).hexdigest()
+            self._jwks = (document, f'"{digest}"')
+        return self._jwks
+
+
+key_ring = KeyRing()
+
+
+# ============ TOKEN BACKEND ============
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    Signs with the key ring's current key and verifies by kid. Tokens
+    without a kid were signed with the HS256 SIMPLE_JWT settings, before
+    asymmetric signing; they are accepted until JWT_ACCEPT_HS256_UNTIL.
+    """
+
+    def __init__(self):
+        super().__init__(
+            api_settings.ALGORITHM,
+            api_settings.SIGNING_KEY,
+            api_settings.VERIFYING_KEY,
+            api_settings.AUDIENCE,
+            api_settings.ISSUER,
+            None,
+            api_settings.LEEWAY,
+            api_settings.JSON_ENCODER,
+        )
+
+    def encode(self, payload):
+        key = key_ring.signing_key()
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+        return jwt.encode(
+            jwt_payload,
+            key.private,
+            algorithm=key.algorithm,
+            headers={'kid': key.kid},
+            json_encoder=self.json_encoder,
+        )
+
+    def decode(self, token, verify=True):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except InvalidTokenError as e:
+            raise TokenBackendError(_("Token is invalid")) from e
+
+        if kid is None:
+            cutoff = settings.JWT_ACCEPT_HS256_UNTIL
+            if not cutoff or timezone.now() >= cutoff:
+                raise TokenBackendError(_("Token is invalid"))
+            return super().decode(token, verify=verify)
+
+        key = key_ring.verifying_key(kid)
+        if key is None and verify:
+            raise TokenBackendError(_("Token is invalid"))
+
+        try:
+            return jwt.decode(
+                token,
+                key.public if key else None,
+                algorithms=[key.algorithm] if key else None,
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.get_leeway(),
+                options={
+                    'verify_aud': self.audience is not None,
+                    'verify_signature': verify,
+                },
+            )
+        except InvalidAlgorithmError as e:
+            raise TokenBackendError(_("Invalid algorithm specified")) from e
+        except ExpiredSignatureError as e:
+            raise TokenBackendExpiredToken(_("Token is expired")) from e
+        except InvalidTokenError as e:
+            raise TokenBackendError(_("Token is invalid")) from e
+
+
+token_backend = KeyRingTokenBackend()
@@ -0,0 +1,214 @@
+"""
+Outbound mail queue.
+
+With EMAIL_BACKEND set to QueuedEmailBackend, sending an email (djoser's
+activation, confirmation and password emails included) stores it as an
+OutboundEmail row instead of talking to the mail server. Rows are stored
+in the caller's transaction, so a rolled-back signup sends nothing.
+
+The send_queued_mail worker delivers due messages in batches over one
+connection of MAIL_QUEUE_DELIVERY_BACKEND (SMTP in production; console or
+locmem to try it out). A failed message is retried with exponential
+backoff and marked failed after MAIL_QUEUE_MAX_ATTEMPTS. Claiming a
+batch pushes its messages' next_attempt_at MAIL_QUEUE_LEASE ahead, so
+other workers skip them, and a crashed worker's batch comes back once
+the lease runs out.
+"""
+import base64
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+# ============ QUEUEING ============
+
+def _attachment(attachment):
+    if not isinstance(attachment, tuple):
+        # A MIMEBase part; store it as its payload
+        attachment = (attachment.get_filename(), attachment.get_payload(decode=True), attachment.get_content_type())
+    filename, content, mimetype = attachment
+    if isinstance(content, str):
+        content = content.encode()
+    return [filename, base64.b64encode(content).decode(), mimetype]
+
+
+def enqueue(messages):
+    """Store EmailMessages for delivery; returns the OutboundEmail rows"""
+    now = timezone.now()
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            subject=message.subject,
+            body=message.body,
+            from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+            to=list(message.to),
+            cc=list(message.cc),
+            bcc=list(message.bcc),
+            reply_to=list(message.reply_to),
+            headers=dict(message.extra_headers),
+            alternatives=[list(alternative) for alternative in getattr(message, 'alternatives', [])],
+            attachments=[_attachment(attachment) for attachment in message.attachments],
+            next_attempt_at=now,
+        )
+        for message in messages
+    ])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Email backend that queues messages for send_queued_mail"""
+
+    def send_messages(self, email_messages):
+        messages = [message for message in email_messages if message.recipients()]
+        if not messages:
+            return 0
+        try:
+            enqueue(messages)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        return len(messages)
+
+
+# ============ DELIVERY ============
+
+def to_message(email, connection=None):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.to,
+        cc=email.cc,
+        bcc=email.bcc,
+        reply_to=email.reply_to,
+        headers=email.headers,
+        alternatives=[tuple(alternative) for alternative in email.alternatives],
+        connection=connection,
+    )
+    for filename, content, mimetype in email.attachments:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+def retry_delay(attempts):
+    """Wait before the next attempt after `attempts` failed ones"""
+    return min(settings.MAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1), settings.MAIL_QUEUE_MAX_RETRY_DELAY)
+
+
+def claim_batch(size):
+    """Take up to `size` due messages, leasing them to this worker"""
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:size]
+        )
+        if emails:
+            OutboundEmail.objects.filter(id__in=[email.id for email in emails]).update(
+                next_attempt_at=now + settings.MAIL_QUEUE_LEASE
+            )
+    return emails
+
+
+def record_failure(email, error):
+    """Count a failed attempt at the message and keep its error"""
+    email.attempts += 1
+    email.last_error = f"{type(error).__name__}: {error}"
+
+
+def deliver(emails, connection):
+    """
+    Send the messages over one open connection. Returns (sent, failed)
+    lists of the emails; failures get their error and attempt count.
+    """
+    sent, failed = [], []
+    for email in emails:
+        try:
+            if not connection.send_messages([to_message(email, connection)]):
+                raise RuntimeError("The mail backend sent nothing")
+        except Exception as error:
+            record_failure(email, error)
+            failed.append(email)
+            # The server may have dropped us; reconnect for the next message
+            # (if that fails too, the next send retries and records it)
+            connection.close()
+            try:
+                connection.open()
+            except Exception:
+                pass
+        else:
+            sent.append(email)
+    return sent, failed
+
+
+def send_batch(size=None, connection=None):
+    """
+    Deliver one batch of due messages. Returns (sent, retried, given up)
+    counts, or None if nothing was due. If the mail server can't be
+    reached, every claimed message counts a failed attempt and backs off.
+    """
+    emails = claim_batch(size or settings.MAIL_QUEUE_BATCH_SIZE)
+    if not emails:
+        return None
+
+    connection = connection or get_connection(settings.MAIL_QUEUE_DELIVERY_BACKEND, fail_silently=False)
+    try:
+        connection.open()
+    except Exception as error:
+        logger.warning("Could not connect to the mail server: %s", error)
+        for email in emails:
+            record_failure(email, error)
+        sent, failed = [], emails
+    else:
+        try:
+            sent, failed = deliver(emails, connection)
+        finally:
+            connection.close()
+
+    now = timezone.now()
+    OutboundEmail.objects.filter(id__in=[email.id for email in sent]).update(
+        status='sent', sent_at=now, attempts=F('attempts') + 1
+    )
+    given_up = 0
+    for email in failed:
+        if email.attempts >= settings.MAIL_QUEUE_MAX_ATTEMPTS:
+            email.status = 'failed'
+            given_up += 1
+            logger.error("Giving up on email %s to %s: %s", email.id, email.to, email.last_error)
+        else:
+            email.next_attempt_at = now + retry_delay(email.attempts)
+    OutboundEmail.objects.bulk_update(failed, ['status', 'attempts', 'last_error', 'next_attempt_at'])
+    return len(sent), len(failed) - given_up, given_up
+
+
+def purge_sent(older_than=None):
+    """Delete messages sent before `older_than` ago (MAIL_QUEUE_KEEP_SENT by default)"""
+    cutoff = timezone.now() - (older_than or settings.MAIL_QUEUE_KEEP_SENT)
+    deleted, _ = OutboundEmail.objects.filter(status='sent', sent_at__lt=cutoff).delete()
+    return deleted
+
+
+# ============ METRICS ============
+
+def queue_stats():
+    """Queue depth: pending (of which due now), failed, and the oldest pending message's age in seconds"""
+    now = timezone.now()
+    stats = OutboundEmail.objects.exclude(status='sent').aggregate(
+        pending=Count('id', filter=Q(status='pending')),
+        due=Count('id', filter=Q(status='pending', next_attempt_at__lte=now)),
+        failed=Count('id', filter=Q(status='failed')),
+        oldest=Min('created_at', filter=Q(status='pending')),
+    )
+    oldest = stats.pop('oldest')
+    stats['oldest_pending_age'] = (now - oldest).total_seconds() if oldest else 0.0
+    return stats
@@ -0,0 +1,81 @@
+import time
+
+from django.conf import settings
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication as UncachedJWTAuthentication
+
+from accounts.authentication import CookieJWTAuthentication, invalidate_cached_user
+from accounts.serializers import TokenObtainPairSerializer
+from accounts.tokens import AccessToken
+from organizers.management.commands._benchmark import create_organizer
+from organizers.models import Speaker
+from organizers.views import SpeakerDirectory
+
+
+class UncachedCookieJWTAuthentication(UncachedJWTAuthentication):
+    """Cookie authentication as it was: one User SELECT per request"""
+    authenticate = CookieJWTAuthentication.authenticate
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec on an authenticated, organizer-only read endpoint "
+        "with per-request user lookups and with the cached user and role claim, "
+        "inside a rolled-back transaction"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--speakers', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            organizer = create_organizer()
+            Speaker.objects.bulk_create([
+                Speaker(name=f'Speaker {i}', title='Engineer', organizer=organizer)
+                for i in range(options['speakers'])
+            ])
+
+            before = SpeakerDirectory.as_view(authentication_classes=[UncachedCookieJWTAuthentication])
+            after = SpeakerDirectory.as_view(authentication_classes=[CookieJWTAuthentication])
+            plain_token = str(AccessToken.for_user(organizer))
+            role_token = str(TokenObtainPairSerializer.get_token(organizer).access_token)
+
+            count = options['requests']
+            self.run("user lookup per request", before, plain_token, count)
+            self.run("cached user + role claim", after, role_token, count)
+
+            invalidate_cached_user(organizer.pk)
+            transaction.set_rollback(True)
+
+    def run(self, label, view, token, count):
+        factory = RequestFactory(HTTP_HOST=settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost')
+
+        def request():
+            req = factory.get('/api/organizer/speakers/directory/')
+            req.COOKIES['access_token'] = token
+            response = view(req)
+            assert response.status_code == 200, response.status_code
+            return response
+
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        request()  # warm up (and fill the user cache)
+        with connection.execute_wrapper(count_queries):
+            started = time.perf_counter()
+            for _ in range(count):
+                request()
+            elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{label:<26} {count / elapsed:8.0f} req/s  "
+            f"{queries / count:4.1f} queries/request"
+        )
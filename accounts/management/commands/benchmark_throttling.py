@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.views import APIView
+
+from accounts.throttling import PolicyThrottle, RateLimit, get_backend, metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request overhead of PolicyThrottle for each algorithm "
+        "and backend, with requests spread over many client IPs"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000)
+        parser.add_argument('--clients', type=int, default=500)
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        requests = [
+            factory.get('/api/events/', REMOTE_ADDR=f'10.0.{i // 256}.{i % 256}')
+            for i in range(options['clients'])
+        ]
+        count = options['requests']
+
+        self.stdout.write(f"shared backend: {type(caches[settings.RATE_LIMIT_CACHE]).__name__}")
+        self.run("no limits", [], requests, count)
+        for algorithm in ('sliding_window', 'token_bucket'):
+            for backend in ('local', 'shared'):
+                # High enough that nothing is throttled; a rejection costs a little more
+                limit = RateLimit('1000000/m', key='ip', algorithm=algorithm, backend=backend, scope=f'benchmark-{algorithm}')
+                self.run(f"{algorithm} / {backend}", [limit], requests, count)
+
+        get_backend('local').clear()
+        metrics.reset()
+
+    def run(self, label, limits, requests, count):
+        view = type('BenchmarkView', (APIView,), {'rate_limits': limits})()
+        throttle = PolicyThrottle()
+        for request in requests:
+            throttle.allow_request(request, view)  # warm up
+
+        started = time.perf_counter()
+        for i in range(count):
+            assert throttle.allow_request(requests[i % len(requests)], view)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"{label:<28} {elapsed / count * 1e6:7.1f} us/request")
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding refresh tokens and their blacklist entries "
+        "in batches, so the token tables stay bounded without long locks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = aware_utcnow()
+        expired = OutstandingToken.objects.filter(expires_at__lte=now)
+
+        outstanding = blacklisted = 0
+        while True:
+            ids = list(expired.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                # Blacklist rows first, so deleting their tokens needs no cascade
+                blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+                outstanding += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {outstanding} expired token(s) and {blacklisted} blacklist entr(ies)"
+        ))
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from accounts.keys import create_signing_key, published_keys, token_backend
+from accounts.models import SigningKey
+
+
+class Command(BaseCommand):
+    help = (
+        "Rotate the JWT signing key once it is older than JWT_KEY_ROTATION_INTERVAL "
+        "and drop keys whose tokens have all expired; meant to run on a schedule"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Rotate regardless of the key's age")
+        parser.add_argument(
+            '--now', action='store_true',
+            help="Sign with the new key right away instead of after JWT_KEY_PUBLISH_AHEAD "
+                 "(services with a cached JWKS will reject its tokens until they refetch)",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        with transaction.atomic():
+            keys = list(published_keys(now))
+            active = [key for key in keys if key.activates_at <= now]
+            pending = [key for key in keys if key.activates_at > now]
+            current = max(active, key=lambda key: key.activates_at, default=None)
+
+            if current is None and not pending:
+                key = create_signing_key()
+                self.stdout.write(f"Created signing key {key.kid}")
+            elif pending and not options['force']:
+                self.stdout.write(f"Key {pending[0].kid} is already scheduled for {pending[0].activates_at:%Y-%m-%d %H:%M}")
+            elif options['force'] or current.activates_at <= now - settings.JWT_KEY_ROTATION_INTERVAL:
+                # A pending key never signed anything; the new one replaces it
+                SigningKey.objects.filter(id__in=[key.id for key in pending]).delete()
+                activates_at = now if options['now'] else now + settings.JWT_KEY_PUBLISH_AHEAD
+                # The keys it replaces verify until the last tokens they sign expire
+                lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+                SigningKey.objects.filter(id__in=[key.id for key in active], expires_at__isnull=True).update(
+                    expires_at=activates_at + lifetime + token_backend.get_leeway()
+                )
+                key = create_signing_key(activates_at=activates_at)
+                self.stdout.write(f"Created signing key {key.kid}, signing from {activates_at:%Y-%m-%d %H:%M}")
+            else:
+                self.stdout.write(f"Signing key {current.kid} is current")
+
+            deleted, _ = SigningKey.objects.filter(expires_at__lte=now).delete()
+        if deleted:
+            self.stdout.write(f"Deleted {deleted} expired key(s)")
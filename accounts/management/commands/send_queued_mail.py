@@ -0,0 +1,61 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.mail import purge_sent, queue_stats, send_batch
+
+logger = logging.getLogger('accounts.mail')
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued emails in batches over one connection per batch; "
+        "with --loop, keep polling the queue (run it under a process supervisor)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep running, polling the queue")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds between polls of an empty queue")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--stats', action='store_true', help="Only print the queue depth")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+
+        while True:
+            totals = [0, 0, 0]
+            try:
+                while (result := send_batch(options['batch_size'])) is not None:
+                    totals = [total + count for total, count in zip(totals, result)]
+                    if not result[0]:
+                        # Nothing got through (the server is likely down); leave
+                        # the rest of the queue until the next poll
+                        break
+            except Exception:
+                if not options['loop']:
+                    raise
+                logger.exception("Delivering queued mail failed")
+
+            if any(totals):
+                self.stdout.write("Sent {}, retrying {}, gave up on {}".format(*totals))
+            stats = queue_stats()
+            logger.info(
+                "mail queue: %(pending)d pending (%(due)d due), %(failed)d failed, "
+                "oldest pending %(oldest_pending_age).0fs", stats,
+            )
+            purge_sent()
+
+            if not options['loop']:
+                self.print_stats(stats)
+                return
+            time.sleep(options['interval'])
+
+    def print_stats(self, stats=None):
+        stats = stats or queue_stats()
+        self.stdout.write(
+            f"{stats['pending']} pending ({stats['due']} due), {stats['failed']} failed, "
+            f"oldest pending {stats['oldest_pending_age']:.0f}s"
+        )
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SigningKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kid', models.CharField(max_length=64, unique=True)),
+                ('algorithm', models.CharField(choices=[('RS256', 'RS256'), ('EdDSA', 'EdDSA')], max_length=10)),
+                ('private_key', models.TextField()),
+                ('public_key', models.TextField()),
+                ('activates_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['activates_at'],
+            },
+        ),
+    ]
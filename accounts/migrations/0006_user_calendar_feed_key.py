@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='calendar_feed_key',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+    ]
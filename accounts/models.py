@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractUser 
 
 class User(AbstractUser):
@@ -11,12 +12,94 @@ class User(AbstractUser):
     last_name = models.CharField(max_length=30)
     email = models.EmailField(unique=True)
     role = models.CharField(choices=ROLES,default="Attendee")
+    # Part of the user's calendar feed token; replacing it revokes the old
+    # subscription URL (see attendee.calendars)
+    calendar_feed_key = models.CharField(max_length=32, blank=True)
 
     USERNAME_FIELD = 'email'
     
     REQUIRED_FIELDS = ['username','first_name',"last_name","role"]
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive email prefix search (organizers.filters.AttendeeFilter)
+            models.Index(Upper('email'), name='user_email_upper_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        # Users from the authentication cache only carry a few fields (see
+        # accounts.authentication); the first deferred one accessed loads
+        # the rest with it
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using, fields, **kwargs)
+
 # Create your models here.
+
+
+class SigningKey(models.Model):
+    """A key pair JWTs are signed with (see accounts.keys)"""
+    ALGORITHMS = (
+        ("RS256", "RS256"),
+        ("EdDSA", "EdDSA"),
+    )
+
+    kid = models.CharField(max_length=64, unique=True)
+    algorithm = models.CharField(max_length=10, choices=ALGORITHMS)
+    # PKCS8 PEM, encrypted with JWT_KEY_PASSWORD
+    private_key = models.TextField()
+    public_key = models.TextField()
+    # Signs from then on, until a newer key activates
+    activates_at = models.DateTimeField()
+    # Published (and accepted) until then; set when a newer key replaces it
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['activates_at']
+
+    def __str__(self):
+        return f"{self.algorithm} {self.kid}"
+
+
+class OutboundEmail(models.Model):
+    """An email waiting for (or done with) delivery by send_queued_mail (see accounts.mail)"""
+    STATUSES = (
+        ("pending", "Pending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    )
+
+    subject = models.TextField()
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list)
+    bcc = models.JSONField(default=list)
+    reply_to = models.JSONField(default=list)
+    headers = models.JSONField(default=dict)
+    # [content, mimetype] pairs, e.g. the HTML version
+    alternatives = models.JSONField(default=list)
+    # [filename, base64 content, mimetype] triples
+    attachments = models.JSONField(default=list)
+
+    status = models.CharField(max_length=10, choices=STATUSES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    # Pending messages are sent from then on; a worker pushes it ahead
+    # while it holds the message
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)}"
@@ -1,6 +1,16 @@
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer
 from djoser.serializers import UserSerializer as BaseUserSerializer
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer as BaseTokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+from rest_framework_simplejwt.serializers import TokenVerifySerializer as BaseTokenVerifySerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from .authentication import get_cached_user
+from .tokens import RefreshToken, UntypedToken
 
 User = get_user_model()
 
@@ -21,4 +31,58 @@ class UserSerializer(BaseUserSerializer):
     class Meta(BaseUserSerializer.Meta):
         model = User
         fields = ['id', 'email', 'username', 'first_name', 'last_name','role']
-        read_only_fields = ['email']
\ No newline at end of file
+        read_only_fields = ['email']
+
+
+class TokenObtainPairSerializer(BaseTokenObtainPairSerializer):
+    """
+    Issues tokens carrying the user's role as a claim, so role checks
+    (e.g. IsOrganizer) don't need the user row.
+    """
+    token_class = RefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['role'] = user.role
+        return token
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    """
+    Rotates like RefreshTokenView: rotate() claims the presented token in
+    the database, so a replayed refresh token is rejected. (The stock
+    validate blacklists with a get_or_create, which never fails.)
+    """
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        with transaction.atomic():
+            refresh = self.token_class(attrs['refresh'])
+
+            user = get_cached_user(refresh.get(api_settings.USER_ID_CLAIM))
+            if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+            if api_settings.ROTATE_REFRESH_TOKENS:
+                refresh.rotate()
+
+            # Refresh tokens outlive role changes; stamp the current role
+            access_token = refresh.access_token
+            access_token['role'] = user.role
+
+        data = {'access': str(access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            data['refresh'] = str(refresh)
+        return data
+
+
+class TokenVerifySerializer(BaseTokenVerifySerializer):
+    """Verifies tokens against the signing keys of accounts.keys"""
+
+    def validate(self, attrs):
+        token = UntypedToken(attrs['token'])
+        if api_settings.BLACKLIST_AFTER_ROTATION:
+            if BlacklistedToken.objects.filter(token__jti=token.get(api_settings.JTI_CLAIM)).exists():
+                raise serializers.ValidationError("Token is blacklisted")
+        return {}
@@ -0,0 +1,17 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    user_id = instance.pk
+    invalidate_cached_user(user_id)
+    # Again on commit, in case a request cached the old row in between
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
@@ -1,3 +1,328 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from accounts.authentication import JWTAuthentication, user_cache_key
+from accounts.keys import KeyRingTokenBackend
+from accounts.mail import send_batch
+from accounts.models import OutboundEmail, User
+from accounts.throttling import PolicyThrottle, RateLimit, get_backend
+from accounts.serializers import TokenRefreshSerializer
+from accounts.tokens import AccessToken, BlacklistCache, RefreshToken, blacklisted_jtis
+from tixly.testing import EndpointBudgetTestCase
+
+
+class AuthBudgetTests(EndpointBudgetTestCase):
+    """Sign-in and token endpoints"""
+    dataset = {'events': 20, 'attendees': 5, 'agendas': 1, 'sessions': 2}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user(
+            email='budget@example.com', username='budget', first_name='Budget', last_name='User',
+            role='attendee', password='a-long-password-1',
+        )
+
+    def test_sign_in(self):
+        # Every request hashes the password, so fewer runs
+        self.assertWithinBudget(
+            '/api/auth/jwt/create/', method='post',
+            data={'email': 'budget@example.com', 'password': 'a-long-password-1'}, runs=5,
+            queries=3, p95_ms=1500,
+        )
+
+    def test_refresh(self):
+        # Refresh tokens rotate, so each request needs a new one: queries only
+        queries, _ = self.count_queries(
+            '/api/auth/jwt/refresh/', method='post', cookies={'refresh_token': str(RefreshToken.for_user(self.user))}
+        )
+        self.assertLessEqual(len(queries), 9, "\n".join(query['sql'] for query in queries))
+
+    def test_current_user(self):
+        self.assertWithinBudget('/api/auth/users/me/', user=self.user, queries=0, p95_ms=10)
+
+    def test_jwks(self):
+        self.assertWithinBudget('/api/auth/jwks.json', queries=1, p95_ms=10)
+
+
+@override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMIT_BACKEND='local')
+class PolicyThrottleTests(SimpleTestCase):
+    def setUp(self):
+        get_backend('local').clear()
+
+    def allowed(self, view, ip='203.0.113.7', **headers):
+        request = RequestFactory().get('/', REMOTE_ADDR=ip, **headers)
+        return PolicyThrottle().allow_request(request, view)
+
+    def test_forwarded_for_does_not_give_a_fresh_bucket(self):
+        view = type('Login', (), {'rate_limits': [RateLimit('2/m')]})()
+        results = [
+            self.allowed(view, HTTP_X_FORWARDED_FOR=f'198.51.100.{n}') for n in range(3)
+        ]
+        self.assertEqual(results, [True, True, False])
+
+    def test_rejections_stay_out_of_the_warning_logs(self):
+        view = type('Login', (), {'rate_limits': [RateLimit('1/m')]})()
+        self.assertTrue(self.allowed(view))
+        with self.assertNoLogs('accounts.throttling', 'INFO'):
+            self.assertFalse(self.allowed(view))
+
+    def test_rejected_request_uses_no_quota(self):
+        view = type('Catalog', (), {'rate_limits': [
+            RateLimit('3/m', scope='wide'),
+            RateLimit('1/m', scope='narrow'),
+        ]})()
+        self.assertTrue(self.allowed(view))
+        # Rejected by the narrow limit; the wide one gets its request back
+        self.assertFalse(self.allowed(view))
+        self.assertFalse(self.allowed(view))
+        narrow_only = type('Catalog', (), {'rate_limits': [RateLimit('3/m', scope='wide')]})()
+        self.assertEqual([self.allowed(narrow_only) for _ in range(3)], [True, True, False])
+
+    def test_token_bucket_refund(self):
+        view = type('Burst', (), {'rate_limits': [
+            RateLimit('2/m', algorithm='token_bucket', scope='bucket'),
+            RateLimit('1/m', scope='gate'),
+        ]})()
+        self.assertTrue(self.allowed(view))
+        self.assertFalse(self.allowed(view))
+        bucket_only = type('Burst', (), {'rate_limits': [
+            RateLimit('2/m', algorithm='token_bucket', scope='bucket'),
+        ]})()
+        self.assertEqual([self.allowed(bucket_only) for _ in range(2)], [True, False])
+
+
+class RejectingBackend(LocmemBackend):
+    """A mail server that refuses every message"""
+
+    def send_messages(self, messages):
+        raise ConnectionRefusedError("Recipient refused")
+
+
+class UnreachableBackend(LocmemBackend):
+    """A mail server that can't be connected to"""
+
+    def open(self):
+        raise ConnectionRefusedError("Connection refused")
+
+
+@override_settings(
+    EMAIL_BACKEND='accounts.mail.QueuedEmailBackend',
+    MAIL_QUEUE_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    MAIL_QUEUE_MAX_ATTEMPTS=2,
+)
+class MailQueueTests(TestCase):
+    def queue(self, count=1):
+        for n in range(count):
+            mail.send_mail(f"Hello {n}", "Body", 'tixly@example.com', [f'user{n}@example.com'])
+
+    def make_due(self):
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+
+    def test_sending_queues_instead_of_delivering(self):
+        self.queue(2)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutboundEmail.objects.filter(status='pending').count(), 2)
+
+    def test_delivery(self):
+        self.queue(2)
+        self.assertEqual(send_batch(), (2, 0, 0))
+        self.assertEqual(sorted(message.subject for message in mail.outbox), ["Hello 0", "Hello 1"])
+        self.assertFalse(OutboundEmail.objects.exclude(status='sent').exists())
+        self.assertIsNone(send_batch())
+
+    @override_settings(MAIL_QUEUE_DELIVERY_BACKEND='accounts.tests.RejectingBackend')
+    def test_retry_then_give_up(self):
+        self.queue()
+        started = timezone.now()
+        self.assertEqual(send_batch(), (0, 1, 0))
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertIn("Recipient refused", email.last_error)
+        self.assertGreaterEqual(email.next_attempt_at, started + timedelta(minutes=1))
+        # Backing off: not due yet
+        self.assertIsNone(send_batch())
+
+        self.make_due()
+        with self.assertLogs('accounts.mail', 'ERROR'):
+            self.assertEqual(send_batch(), (0, 0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+
+    @override_settings(MAIL_QUEUE_DELIVERY_BACKEND='accounts.tests.UnreachableBackend')
+    def test_unreachable_server_counts_an_attempt(self):
+        self.queue(2)
+        with self.assertLogs('accounts.mail', 'WARNING'):
+            self.assertEqual(send_batch(), (0, 2, 0))
+        self.assertEqual(
+            list(OutboundEmail.objects.values_list('status', 'attempts')), [('pending', 1), ('pending', 1)]
+        )
+        self.assertIsNone(send_batch())
+
+    @override_settings(MAIL_QUEUE_DELIVERY_BACKEND='accounts.tests.UnreachableBackend')
+    def test_worker_survives_an_unreachable_server(self):
+        self.queue()
+        with self.assertLogs('accounts.mail', 'WARNING'):
+            call_command('send_queued_mail', stdout=StringIO())
+        self.assertEqual(OutboundEmail.objects.get().attempts, 1)
+
+
+class LegacyTokenTests(SimpleTestCase):
+    """HS256 tokens from before asymmetric signing (no kid)"""
+
+    def decode(self):
+        token = jwt.encode({'user_id': 1, 'token_type': 'access'}, settings.SECRET_KEY, algorithm='HS256')
+        return KeyRingTokenBackend().decode(token, verify=False)
+
+    @override_settings(JWT_ACCEPT_HS256_UNTIL=None)
+    def test_rejected_by_default(self):
+        with self.assertRaises(TokenBackendError):
+            self.decode()
+
+    def test_accepted_until_the_cutoff(self):
+        with override_settings(JWT_ACCEPT_HS256_UNTIL=timezone.now() + timedelta(days=1)):
+            self.assertEqual(self.decode()['user_id'], 1)
+        with override_settings(JWT_ACCEPT_HS256_UNTIL=timezone.now() - timedelta(seconds=1)):
+            with self.assertRaises(TokenBackendError):
+                self.decode()
+
+
+class CachedUserAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='cached@example.com', username='cached', first_name='Cached', last_name='User',
+            role='organizer', password='a-long-password-1',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def authenticate(self):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        return JWTAuthentication().authenticate(request)[0]
+
+    def test_cache_holds_no_password_hash(self):
+        user = self.authenticate()
+        entry = cache.get(user_cache_key(self.user.pk))
+        self.assertEqual(set(entry), {'id', 'is_active', 'is_staff', 'role', 'password_digest'})
+        self.assertEqual(user.password_digest, get_md5_hash_password(self.user.password))
+
+    def test_cached_user_loads_the_other_fields_at_once(self):
+        self.authenticate()
+        with CaptureQueriesContext(connection) as queries:
+            user = self.authenticate()
+            self.assertEqual((user.pk, user.role, user.is_active), (self.user.pk, 'organizer', True))
+        self.assertEqual(len(queries), 0)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual((user.email, user.first_name, user.last_name), ('cached@example.com', 'Cached', 'User'))
+        self.assertEqual(len(queries), 1)
+
+    def test_saving_the_user_drops_the_entry(self):
+        self.authenticate()
+        User.objects.get(pk=self.user.pk).save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+
+class BlacklistCacheTests(SimpleTestCase):
+    def test_hits_and_misses(self):
+        jtis = BlacklistCache(max_size=10)
+        jtis.add('live', time.time() + 60)
+        jtis.add('expired', time.time() - 1)
+        self.assertIn('live', jtis)
+        self.assertNotIn('expired', jtis)
+        self.assertNotIn('unknown', jtis)
+
+    def test_forgets_expired_entries(self):
+        jtis = BlacklistCache(max_size=10)
+        jtis.add('short', time.time() + 60)
+        with mock.patch('accounts.tokens.time.time', return_value=time.time() + 120):
+            self.assertNotIn('short', jtis)
+        self.assertEqual(len(jtis), 0)
+
+    def test_bounded(self):
+        jtis = BlacklistCache(max_size=2)
+        for jti in ('a', 'b', 'c'):
+            jtis.add(jti, time.time() + 60)
+        self.assertEqual(len(jtis), 2)
+        self.assertNotIn('a', jtis)
+        self.assertIn('c', jtis)
+
+
+class TokenRefreshTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='refresh@example.com', username='refresh', first_name='Refresh', last_name='User',
+            role='attendee', password='a-long-password-1',
+        )
+
+    def setUp(self):
+        self.refresh = str(RefreshToken.for_user(self.user))
+        self.addCleanup(blacklisted_jtis.clear)
+
+    def validate(self):
+        return TokenRefreshSerializer().validate({'refresh': self.refresh})
+
+    def test_rotates_and_rejects_replay(self):
+        data = self.validate()
+        self.assertNotEqual(data['refresh'], self.refresh)
+        self.assertEqual(AccessToken(data['access'])['role'], 'attendee')
+        # As in another process, which doesn't know the token is blacklisted
+        blacklisted_jtis.clear()
+        with self.assertRaises(TokenError):
+            self.validate()
+
+    def test_concurrent_refreshes_rotate_once(self):
+        rotate = RefreshToken.rotate
+        other = []
+
+        def refreshed_meanwhile(token):
+            # The other request checks and claims the token after this one
+            # checked it, but before this one claims it
+            if not other:
+                other.append(None)
+                other[0] = self.validate()
+            return rotate(token)
+
+        with mock.patch.object(RefreshToken, 'rotate', autospec=True, side_effect=refreshed_meanwhile):
+            with self.assertRaises(TokenError):
+                self.validate()
+        self.assertIn('refresh', other[0])
+
+
+class PruneTokenBlacklistTests(TestCase):
+    def test_prunes_expired_tokens_only(self):
+        user = User.objects.create_user(
+            email='prune@example.com', username='prune', first_name='Prune', last_name='User',
+            role='attendee', password='a-long-password-1',
+        )
+        now = timezone.now()
+        for jti, expires_at in (('expired-1', now - timedelta(days=1)), ('expired-2', now - timedelta(minutes=1)),
+                                ('live', now + timedelta(days=1))):
+            token = OutstandingToken.objects.create(user=user, jti=jti, token=jti, expires_at=expires_at)
+            if jti != 'expired-2':
+                BlacklistedToken.objects.create(token=token)
+
+        out = StringIO()
+        call_command('prune_token_blacklist', '--batch-size', '1', stdout=out)
+        self.assertIn("Pruned 2 expired token(s) and 1 blacklist entr(ies)", out.getvalue())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertEqual(BlacklistedToken.objects.get().token.jti, 'live')
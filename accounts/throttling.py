@@ -0,0 +1,378 @@
+"""
+Rate limiting for DRF views.
+
+Views declare their limits as `rate_limits`, a list of RateLimit. Each limit
+is counted per key (client IP, user, or any callable of the request) and
+per route (the view class, unless a `scope` is given). It runs either as a
+sliding window (a weighted pair of fixed-window counters) or as a token
+bucket (bursts of `burst`, refilled at the rate).
+
+Counters live in one of two backends:
+
+- 'local': an in-process dict. The fastest, but each worker process
+  counts on its own.
+- 'shared': the Django cache (RATE_LIMIT_CACHE). It is shared between
+  processes only when the cache is (Redis with REDIS_URL); with the
+  default in-memory cache it counts per process like 'local'. Sliding
+  windows only use the cache's atomic incr/add; token buckets take a
+  short cache lock around their read-modify-write.
+
+'ip' keys come from DRF's get_ident, which trusts X-Forwarded-For only
+past NUM_PROXIES proxies.
+
+PolicyThrottle (the default throttle class) applies the limits and records
+checks and rejections in `metrics`; rejections also send `request_throttled`.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.dispatch import Signal
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+# Sent with scope, key and wait (seconds) when a request is throttled
+request_throttled = Signal()
+
+
+def parse_rate(rate):
+    """'10/m', '100/h', '30/5m' -> (requests, period in seconds)"""
+    count, period = rate.split('/')
+    unit = period.lstrip('0123456789')
+    multiplier = period[:len(period) - len(unit)] or '1'
+    return int(count), int(multiplier) * DURATIONS[unit[0]]
+
+
+# ============ BACKENDS ============
+
+class BackendBusy(Exception):
+    """The backend couldn't lock a key in time"""
+
+
+class LocalBackend:
+    """Counters in this process, at most `max_keys` of them (least recently written go first)"""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()  # key -> (value, expires)
+        self._lock = threading.Lock()
+
+    def _value(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= now:
+            return None
+        return entry[0]
+
+    def _store(self, key, value, expires, now):
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while self._entries:
+            oldest, (_, oldest_expires) = next(iter(self._entries.items()))
+            if oldest_expires > now and len(self._entries) <= self.max_keys:
+                break
+            del self._entries[oldest]
+
+    def incr(self, key, delta, ttl):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                value, expires = delta, now + ttl
+            else:
+                # Like a cache incr, this keeps the original expiry
+                value, expires = entry[0] + delta, entry[1]
+            self._store(key, value, expires, now)
+            return value
+
+    def get(self, key):
+        with self._lock:
+            return self._value(key, time.time()) or 0
+
+    def update(self, key, func, ttl):
+        """Replace the key's state with func(state)[0] atomically; returns func(state)[1]"""
+        now = time.time()
+        with self._lock:
+            state, result = func(self._value(key, now))
+            self._store(key, state, now + ttl, now)
+            return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CacheBackend:
+    """Counters in a Django cache"""
+
+    # A token bucket waits at most LOCK_ATTEMPTS * LOCK_WAIT for its key
+    LOCK_ATTEMPTS = 5
+    LOCK_WAIT = 0.002
+    LOCK_TIMEOUT = 1
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def incr(self, key, delta, ttl):
+        cache = self.cache
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            # Missing key; add() is atomic, so only one process creates it
+            if cache.add(key, delta, math.ceil(ttl)):
+                return delta
+            return cache.incr(key, delta)
+
+    def get(self, key):
+        return self.cache.get(key, 0)
+
+    def update(self, key, func, ttl):
+        cache = self.cache
+        lock = f'{key}:lock'
+        for _ in range(self.LOCK_ATTEMPTS):
+            if cache.add(lock, 1, self.LOCK_TIMEOUT):
+                break
+            time.sleep(self.LOCK_WAIT)
+        else:
+            raise BackendBusy(key)
+        try:
+            state, result = func(cache.get(key))
+            cache.set(key, state, math.ceil(ttl))
+        finally:
+            cache.delete(lock)
+        return result
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name):
+    with _backends_lock:
+        if name not in _backends:
+            if name == 'local':
+                _backends[name] = LocalBackend(settings.RATE_LIMIT_LOCAL_MAX_KEYS)
+            elif name == 'shared':
+                _backends[name] = CacheBackend(settings.RATE_LIMIT_CACHE)
+            else:
+                raise ValueError(f"Unknown rate limit backend: {name}")
+        return _backends[name]
+
+
+# ============ ALGORITHMS ============
+
+class SlidingWindow:
+    """
+    At most `limit` requests in any `period`, estimated from the current
+    and previous fixed windows: the previous window's count is weighted
+    by how much of it still overlaps the sliding window.
+    """
+
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.period = period
+
+    def check(self, backend, key, now):
+        """None if the request is allowed, else seconds to wait"""
+        window = int(now // self.period)
+        current_key = f'{key}:{window}'
+        current = backend.incr(current_key, 1, self.period * 2)
+        previous = backend.get(f'{key}:{window - 1}')
+        elapsed = now - window * self.period
+        if previous * (1 - elapsed / self.period) + current <= self.limit:
+            return None
+        # Rejected requests don't count
+        self.refund(backend, key, now)
+        return self._wait(previous, current - 1, elapsed)
+
+    def refund(self, backend, key, now):
+        """Give back a request check() allowed at `now`"""
+        backend.incr(f'{key}:{int(now // self.period)}', -1, self.period * 2)
+
+    def _wait(self, previous, current, elapsed):
+        room = self.limit - current - 1
+        if room >= 0 and previous:
+            # Fits once enough of the previous window has slid out
+            return max(0.0, self.period * (1 - room / previous) - elapsed)
+        # Wait for the next window, where this window's count is the previous one
+        overlap = self.period * (1 - (self.limit - 1) / current) if current else 0.0
+        return self.period - elapsed + max(0.0, overlap)
+
+
+class TokenBucket:
+    """
+    Up to `burst` requests at once (`limit` if not given), refilled at
+    `limit` per `period`.
+    """
+
+    def __init__(self, limit, period, burst=None):
+        self.rate = limit / period
+        self.capacity = burst or limit
+        # An untouched bucket is full again after this long
+        self.ttl = self.capacity / self.rate + 1
+
+    def check(self, backend, key, now):
+        """None if the request is allowed, else seconds to wait"""
+        def take(state):
+            tokens, stamp = state or (self.capacity, now)
+            tokens = min(self.capacity, tokens + max(0.0, now - stamp) * self.rate)
+            if tokens >= 1:
+                return (tokens - 1, now), None
+            return (tokens, now), (1 - tokens) / self.rate
+
+        try:
+            return backend.update(key, take, self.ttl)
+        except BackendBusy:
+            return 1 / self.rate
+
+    def refund(self, backend, key, now):
+        """Give back a request check() allowed"""
+        def give(state):
+            tokens, stamp = state or (self.capacity - 1, now)
+            return (min(self.capacity, tokens + 1), stamp), None
+
+        try:
+            backend.update(key, give, self.ttl)
+        except BackendBusy:
+            logger.warning("Couldn't refund a token to %s", key)
+
+
+# ============ POLICIES ============
+
+def login_identifier(request):
+    """The account a login attempt names, hashed (it may be anything the client sent)"""
+    value = request.data.get(get_user_model().USERNAME_FIELD)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return hashlib.sha1(value.strip().lower().encode()).hexdigest()[:20]
+
+
+class RateLimit:
+    """
+    One limit of a view.
+
+    `rate` is 'N/period' ('10/m', '1000/d', '30/5m'). `key` is 'ip',
+    'user' (authenticated requests only), 'user_or_ip', or a callable
+    taking the request and returning an identifier (None to skip the
+    limit). `methods` restricts the limit to those HTTP methods. `scope`
+    names the counter; by default every view counts on its own.
+    """
+
+    def __init__(self, rate, key='ip', algorithm='sliding_window', burst=None,
+                 backend=None, scope=None, methods=None):
+        limit, period = parse_rate(rate)
+        if algorithm == 'token_bucket':
+            self.algorithm = TokenBucket(limit, period, burst)
+        elif algorithm == 'sliding_window':
+            self.algorithm = SlidingWindow(limit, period)
+        else:
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+        self.rate = rate
+        self.key = key
+        self.key_name = key if isinstance(key, str) else key.__name__
+        self.backend = backend
+        self.scope = scope
+        self.methods = {method.upper() for method in methods} if methods else None
+
+    def identify(self, throttle, request):
+        if callable(self.key):
+            return self.key(request)
+        if self.key == 'ip':
+            return throttle.get_ident(request)
+        user = request.user
+        if user and user.is_authenticated:
+            return f'user-{user.pk}'
+        if self.key == 'user_or_ip':
+            return f'ip-{throttle.get_ident(request)}'
+        return None
+
+
+# ============ METRICS ============
+
+class ThrottleMetrics:
+    """Per-scope counts of checked and throttled requests, and time spent checking"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def record(self, scope, throttled, seconds):
+        with self._lock:
+            self.checks[scope] += 1
+            if throttled:
+                self.throttled[scope] += 1
+            self.seconds += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checks': dict(self.checks),
+                'throttled': dict(self.throttled),
+                'seconds': self.seconds,
+            }
+
+    def reset(self):
+        self.checks = Counter()
+        self.throttled = Counter()
+        self.seconds = 0.0
+
+
+metrics = ThrottleMetrics()
+
+
+# ============ THROTTLE ============
+
+class PolicyThrottle(BaseThrottle):
+    """
+    Applies the view's `rate_limits`. The first limit that rejects stops the
+    checks and the limits that had allowed the request get it back, so a
+    rejected request uses no quota.
+    """
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        limits = getattr(view, 'rate_limits', None)
+        if not limits or not settings.RATE_LIMIT_ENABLED:
+            return True
+
+        now = time.time()
+        allowed = []
+        for limit in limits:
+            if limit.methods and request.method not in limit.methods:
+                continue
+            started = time.perf_counter()
+            ident = limit.identify(self, request)
+            if ident is None:
+                continue
+            scope = limit.scope or type(view).__name__
+            key = f'throttle:{scope}:{limit.key_name}:{ident}'
+            backend = get_backend(limit.backend or settings.RATE_LIMIT_BACKEND)
+            wait = limit.algorithm.check(backend, key, now)
+            metrics.record(scope, wait is not None, time.perf_counter() - started)
+
+            if wait is not None:
+                for allowing, allowing_backend, allowing_key in allowed:
+                    allowing.algorithm.refund(allowing_backend, allowing_key, now)
+                self.retry_after = wait
+                # Rejections are counted in metrics and signalled; a line per
+                # rejection at WARNING would let a flood of requests flood the logs
+                logger.debug("Throttled %s on %s (%s), retry in %.1fs", ident, scope, limit.rate, wait)
+                request_throttled.send(sender=type(view), scope=scope, key=key, wait=wait)
+                return False
+            allowed.append((limit, backend, key))
+        return True
+
+    def wait(self):
+        return self.retry_after
@@ -0,0 +1,152 @@
+"""
+Token classes signed and verified through accounts.keys, and refresh
+tokens with a fast path for blacklist checks.
+
+Every process keeps a bounded in-memory set of JTIs it knows are
+blacklisted. A blacklisted token stays invalid until it expires, so a hit
+in that set is always right and is answered without SQL. A miss is never
+trusted on its own: when refresh tokens rotate, `rotate` claims the
+presented token in the database (the unique blacklist row doubles as the
+membership check, atomically across processes); otherwise the stock SQL
+check runs.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken as BaseAccessToken
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+from rest_framework_simplejwt.tokens import UntypedToken as BaseUntypedToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .keys import token_backend
+
+
+class BlacklistCache:
+    """Bounded, thread-safe set of blacklisted JTIs that forgets expired ones"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # jti -> exp (epoch seconds)
+        self._lock = threading.Lock()
+
+    def add(self, jti, exp):
+        with self._lock:
+            self._entries[jti] = exp
+            self._entries.move_to_end(jti)
+            self._evict(time.time())
+
+    def __contains__(self, jti):
+        with self._lock:
+            exp = self._entries.get(jti)
+            if exp is None:
+                return False
+            if exp <= time.time():
+                del self._entries[jti]
+                return False
+            self._entries.move_to_end(jti)
+            return True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self, now):
+        # Oldest entries go first; expired ones are dropped as they are met
+        while self._entries:
+            jti, exp = next(iter(self._entries.items()))
+            if exp > now and len(self._entries) <= self.max_size:
+                break
+            del self._entries[jti]
+
+
+blacklisted_jtis = BlacklistCache(settings.TOKEN_BLACKLIST_CACHE_SIZE)
+
+
+def rotation_claims_tokens():
+    return api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION
+
+
+class AccessToken(BaseAccessToken):
+
+    def get_token_backend(self):
+        return token_backend
+
+
+class UntypedToken(BaseUntypedToken):
+
+    def get_token_backend(self):
+        return token_backend
+
+
+class RefreshToken(BaseRefreshToken):
+    access_token_class = AccessToken
+
+    def get_token_backend(self):
+        return token_backend
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if jti in blacklisted_jtis:
+            raise TokenError(_("Token is blacklisted"))
+        if rotation_claims_tokens():
+            # Checked (and claimed) by rotate() instead
+            return
+        try:
+            super().check_blacklist()
+        except TokenError:
+            blacklisted_jtis.add(jti, self.payload['exp'])
+            raise
+
+    def _outstanding_token(self, new=False):
+        # Same as the stock blacklist()/outstand(), minus the User lookup
+        fields = {
+            'user_id': self.payload.get(api_settings.USER_ID_CLAIM),
+            'created_at': self.current_time,
+            'token': str(self),
+            'expires_at': datetime_from_epoch(self.payload['exp']),
+        }
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if new:
+            return OutstandingToken.objects.create(jti=jti, **fields)
+        return OutstandingToken.objects.get_or_create(jti=jti, defaults=fields)[0]
+
+    def blacklist(self):
+        result = BlacklistedToken.objects.get_or_create(token=self._outstanding_token())
+        jti, exp = self.payload[api_settings.JTI_CLAIM], self.payload['exp']
+        if result[1]:
+            # Only remember it once the blacklist row is committed
+            transaction.on_commit(lambda: blacklisted_jtis.add(jti, exp))
+        else:
+            blacklisted_jtis.add(jti, exp)
+        return result
+
+    def outstand(self):
+        return self._outstanding_token()
+
+    def rotate(self):
+        """
+        Turn this token into a new one (new jti, exp and iat), blacklisting
+        the old one first if BLACKLIST_AFTER_ROTATION. Raises TokenError if
+        the old one was already blacklisted, i.e. it is being replayed.
+        Call inside a transaction.
+        """
+        if api_settings.BLACKLIST_AFTER_ROTATION:
+            _blacklisted, created = self.blacklist()
+            if not created:
+                raise TokenError(_("Token is blacklisted"))
+
+        self.set_jti()
+        self.set_exp()
+        self.set_iat()
+        # The jti was just generated, nothing to look up
+        self._outstanding_token(new=True)
@@ -6,4 +6,5 @@ urlpatterns = [
     path('jwt/create/', views.CustomTokenObtainPairView.as_view()),
     path('jwt/refresh/', views.RefreshTokenView.as_view()),
     path('logout/', views.Logout.as_view()),
+    path('jwks.json', views.JWKSView.as_view(), name='jwks'),
 ]
\ No newline at end of file
@@ -2,10 +2,18 @@
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.generics import GenericAPIView
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken, AccessToken, TokenError
+from rest_framework_simplejwt.tokens import AccessToken, TokenError
 from rest_framework import status
 from django.conf import settings
 from rest_framework.permissions import AllowAny
+from rest_framework_simplejwt.settings import api_settings
+from django.db import transaction
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+from .authentication import get_cached_user
+from .keys import key_ring
+from .throttling import RateLimit, login_identifier
+from .tokens import RefreshToken
 
 import logging
 
@@ -18,6 +26,13 @@ logger = logging.getLogger(__name__)
 #     client_class = OAuth2Client
 
 class CustomTokenObtainPairView(TokenObtainPairView):
+    rate_limits = [
+        # Bursts from one client (every attempt hashes a password)
+        RateLimit('20/m', key='ip', algorithm='token_bucket', burst=10, methods=['POST']),
+        # Credential stuffing against one account from many clients
+        RateLimit('10/15m', key=login_identifier, methods=['POST']),
+    ]
+
     def post(self, request, *args, **kwargs):
         response = super().post(request, *args, **kwargs)
         
@@ -72,6 +87,7 @@ class RefreshTokenView(GenericAPIView):
     """View to refresh access token using refresh token from cookie"""
     permission_classes = [AllowAny]
     authentication_classes = []
+    rate_limits = [RateLimit('30/m', key='ip', methods=['POST'])]
 
     def post(self, request):
         try:
@@ -84,7 +100,25 @@ class RefreshTokenView(GenericAPIView):
                 }, status=status.HTTP_401_UNAUTHORIZED)
 
             try:
-                refresh = RefreshToken(refresh_token)
+                with transaction.atomic():
+                    # Blacklist checks go through accounts.tokens: known
+                    # blacklisted JTIs are rejected from memory, the rest are
+                    # claimed in the database by rotate()
+                    refresh = RefreshToken(refresh_token)
+
+                    user = get_cached_user(refresh.get(api_settings.USER_ID_CLAIM))
+                    if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+                        return Response({
+                            'error': 'No active account found for the given token',
+                            'message': 'Please login again'
+                        }, status=status.HTTP_401_UNAUTHORIZED)
+
+                    if api_settings.ROTATE_REFRESH_TOKENS:
+                        refresh.rotate()
+
+                    # Refresh tokens outlive role changes; stamp the current role
+                    access_token = refresh.access_token
+                    access_token['role'] = user.role
                 
                 # Create new access token
                 response = Response({
@@ -93,7 +127,7 @@ class RefreshTokenView(GenericAPIView):
 
                 response.set_cookie(
                     key='access_token',
-                    value=str(refresh.access_token),
+                    value=str(access_token),
                     httponly=True,
                     secure=settings.DEBUG is False,
                     samesite='Strict',
@@ -101,6 +135,17 @@ class RefreshTokenView(GenericAPIView):
                     path='/'
                 )
 
+                if api_settings.ROTATE_REFRESH_TOKENS:
+                    response.set_cookie(
+                        key='refresh_token',
+                        value=str(refresh),
+                        httponly=True,
+                        secure=settings.DEBUG is False,
+                        samesite='Lax',
+                        max_age=int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()),
+                        path='/'
+                    )
+
                 return response
 
             except TokenError as e:
@@ -117,3 +162,27 @@ class RefreshTokenView(GenericAPIView):
                 'detail': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+
+class JWKSView(GenericAPIView):
+    """
+    Public keys tokens are signed with, as a JSON Web Key Set, so other
+    services can verify tokens without calling this API. Keys are
+    published before they start signing, so a cached copy stays usable
+    for JWKS_MAX_AGE.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    rate_limits = [RateLimit('120/m', key='ip')]
+
+    def get(self, request):
+        document, etag = key_ring.jwks()
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and etag in parse_etags(if_none_match):
+            response = HttpResponseNotModified()
+        else:
+            response = Response(document)
+        response['ETag'] = etag
+        response['Cache-Control'] = f'public, max-age={settings.JWKS_MAX_AGE}'
+        return response
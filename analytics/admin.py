@@ -0,0 +1,7 @@
+from django.contrib import admin
+from .models import MinuteSalesRollup, HourlySalesRollup, DailySalesRollup, RevenueLedger
+
+admin.site.register(MinuteSalesRollup)
+admin.site.register(HourlySalesRollup)
+admin.site.register(DailySalesRollup)
+admin.site.register(RevenueLedger)
@@ -0,0 +1,59 @@
+"""
+Single-statement increments of counter rows (rollups, ledger).
+
+`increment` adds to the counters of a row, creating it first if need be,
+in one INSERT ... ON CONFLICT DO UPDATE, so concurrent writers neither
+race on creating the row nor pay a separate read. bulk_create's
+update_conflicts can only overwrite columns, not add to them, and can't
+target the partial unique constraints the NULL ticket_tier rows rely on.
+"""
+from django.db import connections, router
+from django.utils import timezone
+
+
+def increment(model, key, deltas):
+    """
+    Add `deltas` ({field name: amount}) to the row of `model` identified by
+    `key` ({field name: value}). Key fields that are None select the
+    model's partial unique constraint on the others (`... WHERE field IS
+    NULL`); the rest of the key must be covered by a unique constraint.
+    """
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    fields = {field.name: field for field in model._meta.concrete_fields}
+
+    columns, values = [], []
+    for name, field in fields.items():
+        if field.primary_key:
+            continue
+        if name in key:
+            value = key[name]
+        elif name in deltas:
+            value = deltas[name]
+        elif getattr(field, 'auto_now', False):
+            value = timezone.now()
+        else:
+            value = field.get_default()
+        columns.append(quote(field.column))
+        values.append(field.get_db_prep_save(value, connection))
+
+    target = [quote(fields[name].column) for name, value in key.items() if value is not None]
+    null_keys = [quote(fields[name].column) for name, value in key.items() if value is None]
+    table = quote(model._meta.db_table)
+    updates = [
+        f'{quote(fields[name].column)} = {table}.{quote(fields[name].column)} + EXCLUDED.{quote(fields[name].column)}'
+        for name in deltas
+    ]
+    updates += [
+        f'{quote(field.column)} = EXCLUDED.{quote(field.column)}'
+        for field in fields.values() if getattr(field, 'auto_now', False)
+    ]
+
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(values))}) "
+        f"ON CONFLICT ({', '.join(target)})"
+        + (f" WHERE {' AND '.join(f'{column} IS NULL' for column in null_keys)}" if null_keys else '')
+        + f" DO UPDATE SET {', '.join(updates)}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, values)
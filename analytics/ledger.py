@@ -0,0 +1,196 @@
+"""
+Incremental maintenance and verification of the per-event revenue ledger.
+
+An order contributes to gross/discount once it has been paid (it is paid now
+or has a refunded_at), and to refunded when it was paid and no longer is.
+`compute_event_ledger` applies exactly that rule to the source tables, so
+the incremental path and the verification path agree.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Prefetch, Q
+
+from attendee.models import Order, Ticket
+from organizers.models import TicketTier
+from .counters import increment
+from .models import RevenueLedger
+
+
+CENT = Decimal('0.01')
+
+AMOUNT_FIELDS = ('gross_amount', 'discount_amount', 'refunded_amount')
+COUNT_FIELDS = ('orders_count', 'tickets_count', 'refunded_orders_count', 'refunded_tickets_count')
+LEDGER_FIELDS = AMOUNT_FIELDS + COUNT_FIELDS
+
+
+def allocate(total_amount, tier_counts, prices):
+    """
+    Split an order across its ticket tiers.
+
+    Returns {ticket_tier_id: (gross, discount, tickets)}. Orders without
+    tickets are allocated to the event-level key None at face value. The
+    rounding remainder of the discount goes to the last tier so the shares
+    always add up to list price - total_amount.
+    """
+    if not tier_counts:
+        return {None: (total_amount, Decimal('0.00'), 0)}
+
+    tiers = sorted(tier_counts)
+    gross = {tier_id: prices[tier_id] * tier_counts[tier_id] for tier_id in tiers}
+    list_total = sum(gross.values())
+    discount_total = list_total - total_amount
+
+    shares = {}
+    remaining = discount_total
+    for index, tier_id in enumerate(tiers):
+        if index == len(tiers) - 1:
+            discount = remaining
+        elif list_total:
+            discount = (discount_total * gross[tier_id] / list_total).quantize(CENT)
+        else:
+            discount = (discount_total * tier_counts[tier_id] / sum(tier_counts.values())).quantize(CENT)
+        remaining -= discount
+        shares[tier_id] = (gross[tier_id], discount, tier_counts[tier_id])
+    return shares
+
+
+def order_deltas(allocation, refunded=False, sign=1):
+    """
+    Ledger deltas per tier (and for the event-level row) for one order,
+    either as sold (gross/discount) or as refunded.
+    """
+    deltas = defaultdict(Counter)
+    for tier_id, (gross, discount, tickets) in allocation.items():
+        keys = [None] if tier_id is None else [tier_id, None]
+        for key in keys:
+            row = deltas[key]
+            if refunded:
+                row['refunded_amount'] += sign * (gross - discount)
+                row['refunded_tickets_count'] += sign * tickets
+            else:
+                row['gross_amount'] += sign * gross
+                row['discount_amount'] += sign * discount
+                row['tickets_count'] += sign * tickets
+
+    for row in deltas.values():
+        row['refunded_orders_count' if refunded else 'orders_count'] += sign
+    return deltas
+
+
+def merge(total, deltas):
+    for key, row in deltas.items():
+        total[key].update(row)
+    return total
+
+
+def apply(event_id, deltas):
+    """Add deltas to the ledger rows of an event, one upsert per row"""
+    for tier_id, row in deltas.items():
+        row = {field: value for field, value in row.items() if value}
+        if row:
+            increment(RevenueLedger, {'event': event_id, 'ticket_tier': tier_id}, row)
+
+
+def _order_allocation(order, exclude_ticket_id=None):
+    tickets = Ticket.objects.filter(order=order)
+    if exclude_ticket_id is not None:
+        tickets = tickets.exclude(id=exclude_ticket_id)
+    tier_counts = Counter(tickets.values_list('ticket_tier_id', flat=True))
+    prices = dict(TicketTier.objects.filter(id__in=tier_counts).values_list('id', 'price'))
+    return allocate(order.total_amount, tier_counts, prices)
+
+
+# ============ TRANSITION HANDLERS ============
+
+def apply_order_transition(order, previous_status):
+    was_paid = previous_status == 'paid'
+    is_paid = order.status == 'paid'
+    if was_paid == is_paid:
+        return
+
+    allocation = _order_allocation(order)
+    if is_paid and order.refunded_at:
+        # Paid again after a refund: the sale is already in gross
+        deltas = order_deltas(allocation, refunded=True, sign=-1)
+    elif is_paid:
+        deltas = order_deltas(allocation)
+    else:
+        deltas = order_deltas(allocation, refunded=True)
+    apply(order.event_id, deltas)
+
+
+def apply_ticket_issued(ticket):
+    """Re-split a paid order's revenue when a ticket is added to it"""
+    if not ticket.is_paid:
+        return
+
+    order = ticket.order
+    before = _order_allocation(order, exclude_ticket_id=ticket.id)
+    after = _order_allocation(order)
+
+    deltas = merge(defaultdict(Counter), order_deltas(after))
+    merge(deltas, order_deltas(before, sign=-1))
+    apply(order.event_id, deltas)
+
+
+# ============ VERIFICATION ============
+
+def compute_event_ledger(event_id, chunk_size=500):
+    """
+    Recompute the ledger of an event from orders and tickets, streaming the
+    orders in chunks. Returns {ticket_tier_id: Counter of LEDGER_FIELDS}.
+    """
+    prices = dict(TicketTier.objects.filter(event_id=event_id).values_list('id', 'price'))
+    orders = (
+        Order.objects
+        .filter(Q(status='paid') | Q(refunded_at__isnull=False), event_id=event_id)
+        .only('id', 'event_id', 'total_amount', 'status', 'refunded_at')
+        .prefetch_related(
+            Prefetch('order', queryset=Ticket.objects.only('id', 'order_id', 'ticket_tier_id'))
+        )
+        .order_by('id')
+    )
+
+    totals = defaultdict(Counter)
+    for order in orders.iterator(chunk_size=chunk_size):
+        tier_counts = Counter(ticket.ticket_tier_id for ticket in order.order.all())
+        allocation = allocate(order.total_amount, tier_counts, prices)
+        merge(totals, order_deltas(allocation))
+        if order.status != 'paid':
+            merge(totals, order_deltas(allocation, refunded=True))
+    return totals
+
+
+def find_drift(event_id, chunk_size=500):
+    """
+    Compare the stored ledger with the recomputed one.
+    Returns [(ticket_tier_id, field, stored, expected)] for every mismatch.
+    """
+    expected = compute_event_ledger(event_id, chunk_size)
+    stored = {
+        row['ticket_tier_id']: row
+        for row in RevenueLedger.objects.filter(event_id=event_id).values('ticket_tier_id', *LEDGER_FIELDS)
+    }
+
+    drift = []
+    for tier_id in sorted(set(expected) | set(stored), key=lambda key: (key is not None, key or 0)):
+        for field in LEDGER_FIELDS:
+            stored_value = stored.get(tier_id, {}).get(field, 0)
+            expected_value = expected.get(tier_id, {}).get(field, 0)
+            if stored_value != expected_value:
+                drift.append((tier_id, field, stored_value, expected_value))
+    return drift
+
+
+def rebuild_event_ledger(event_id, chunk_size=500):
+    expected = compute_event_ledger(event_id, chunk_size)
+    with transaction.atomic():
+        RevenueLedger.objects.filter(event_id=event_id).delete()
+        RevenueLedger.objects.bulk_create([
+            RevenueLedger(event_id=event_id, ticket_tier_id=tier_id, **{
+                field: row.get(field, 0) for field in LEDGER_FIELDS
+            })
+            for tier_id, row in expected.items()
+        ])
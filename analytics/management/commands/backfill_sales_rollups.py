@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from organizers.models import Event
+from analytics.rollups import rebuild_event_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the hourly and daily sales rollups from orders, tickets and saves"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'event_ids', nargs='*', type=int,
+            help="Only rebuild these events (default: all events)",
+        )
+
+    def handle(self, *args, **options):
+        events = Event.objects.order_by('id')
+        if options['event_ids']:
+            events = events.filter(id__in=options['event_ids'])
+
+        count = 0
+        for event_id in events.values_list('id', flat=True).iterator():
+            rebuild_event_rollups(event_id)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt sales rollups for {count} event(s)"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import prune_minute_rollups
+
+
+class Command(BaseCommand):
+    help = "Delete per-minute sales rollups older than SALES_MINUTE_ROLLUP_RETENTION"
+
+    def handle(self, *args, **options):
+        deleted = prune_minute_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} minute rollup row(s)"))
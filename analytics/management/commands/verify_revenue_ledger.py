@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from organizers.models import Event
+from analytics.ledger import find_drift, rebuild_event_ledger
+
+
+class Command(BaseCommand):
+    help = "Recompute the revenue ledger from orders in chunks and report any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'event_ids', nargs='*', type=int,
+            help="Only verify these events (default: all events)",
+        )
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument(
+            '--fix', action='store_true',
+            help="Rewrite the ledger of drifted events from source",
+        )
+
+    def handle(self, *args, **options):
+        events = Event.objects.order_by('id')
+        if options['event_ids']:
+            events = events.filter(id__in=options['event_ids'])
+
+        checked = drifted = 0
+        for event_id in events.values_list('id', flat=True).iterator():
+            checked += 1
+            drift = find_drift(event_id, options['chunk_size'])
+            if not drift:
+                continue
+
+            drifted += 1
+            for tier_id, field, stored, expected in drift:
+                tier = tier_id or 'all'
+                self.stdout.write(self.style.WARNING(
+                    f"event {event_id} tier {tier}: {field} is {stored}, expected {expected}"
+                ))
+            if options['fix']:
+                rebuild_event_ledger(event_id, options['chunk_size'])
+                self.stdout.write(f"event {event_id}: ledger rebuilt")
+
+        summary = f"Checked {checked} event(s), {drifted} with drift"
+        if drifted and not options['fix']:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
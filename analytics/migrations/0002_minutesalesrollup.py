@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('organizers', '0010_tickettier_short_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MinuteSalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Start of the bucket (UTC)')),
+                ('tickets_sold', models.IntegerField(default=0)),
+                ('gross_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('check_ins', models.IntegerField(default=0)),
+                ('saves', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='organizers.event')),
+                ('ticket_tier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='organizers.tickettier')),
+            ],
+            options={
+                'ordering': ['bucket'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('event', 'ticket_tier', 'bucket'), name='minute_rollup_unique_tier_bucket'), models.UniqueConstraint(condition=models.Q(('ticket_tier__isnull', True)), fields=('event', 'bucket'), name='minute_rollup_unique_event_bucket')],
+            },
+        ),
+    ]
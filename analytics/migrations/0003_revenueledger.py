@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_minutesalesrollup'),
+        ('organizers', '0010_tickettier_short_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gross_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refunded_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('orders_count', models.IntegerField(default=0)),
+                ('tickets_count', models.IntegerField(default=0)),
+                ('refunded_orders_count', models.IntegerField(default=0)),
+                ('refunded_tickets_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='organizers.event')),
+                ('ticket_tier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='organizers.tickettier')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('event', 'ticket_tier'), name='revenue_ledger_unique_tier'), models.UniqueConstraint(condition=models.Q(('ticket_tier__isnull', True)), fields=('event',), name='revenue_ledger_unique_event')],
+            },
+        ),
+    ]
@@ -0,0 +1,139 @@
+from django.db import models
+from django.db.models import Q
+from organizers.models import Event, TicketTier
+
+
+class SalesRollup(models.Model):
+    """
+    Pre-aggregated sales counters for one event (and optionally one ticket tier)
+    over one time bucket.
+
+    Rows with a ticket_tier carry the per-tier counters (tickets_sold,
+    check_ins). Orders and saves are event-scoped, so gross_revenue and saves
+    are accumulated on the event-level row where ticket_tier is NULL.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='+')
+    ticket_tier = models.ForeignKey(
+        TicketTier,
+        on_delete=models.CASCADE,
+        related_name='+',
+        null=True,
+        blank=True,
+    )
+    bucket = models.DateTimeField(help_text="Start of the bucket (UTC)")
+
+    tickets_sold = models.IntegerField(default=0)
+    gross_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    check_ins = models.IntegerField(default=0)
+    saves = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+        ordering = ['bucket']
+
+    def __str__(self):
+        tier = self.ticket_tier_id or 'all'
+        return f"Event {self.event_id} / tier {tier} @ {self.bucket.isoformat()}"
+
+
+class MinuteSalesRollup(SalesRollup):
+    """
+    Short-lived per-minute buckets for sales velocity around launches.
+    Rows older than settings.SALES_MINUTE_ROLLUP_RETENTION are pruned; the
+    hourly and daily tables keep the downsampled history.
+    """
+    class Meta(SalesRollup.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=['event', 'ticket_tier', 'bucket'],
+                name='minute_rollup_unique_tier_bucket',
+            ),
+            models.UniqueConstraint(
+                fields=['event', 'bucket'],
+                condition=Q(ticket_tier__isnull=True),
+                name='minute_rollup_unique_event_bucket',
+            ),
+        ]
+
+
+class HourlySalesRollup(SalesRollup):
+    class Meta(SalesRollup.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=['event', 'ticket_tier', 'bucket'],
+                name='hourly_rollup_unique_tier_bucket',
+            ),
+            models.UniqueConstraint(
+                fields=['event', 'bucket'],
+                condition=Q(ticket_tier__isnull=True),
+                name='hourly_rollup_unique_event_bucket',
+            ),
+        ]
+
+
+class DailySalesRollup(SalesRollup):
+    class Meta(SalesRollup.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=['event', 'ticket_tier', 'bucket'],
+                name='daily_rollup_unique_tier_bucket',
+            ),
+            models.UniqueConstraint(
+                fields=['event', 'bucket'],
+                condition=Q(ticket_tier__isnull=True),
+                name='daily_rollup_unique_event_bucket',
+            ),
+        ]
+
+
+class RevenueLedger(models.Model):
+    """
+    Running revenue totals for one event and ticket tier, updated in the same
+    transaction as every Order status change.
+
+    The row with ticket_tier NULL holds the event-wide totals (including
+    orders that have no tickets yet); tier rows hold each tier's share.
+    Discounts are the difference between list price and Order.total_amount,
+    spread across tiers in proportion to their list price.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='+')
+    ticket_tier = models.ForeignKey(
+        TicketTier,
+        on_delete=models.CASCADE,
+        related_name='+',
+        null=True,
+        blank=True,
+    )
+
+    gross_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    refunded_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders_count = models.IntegerField(default=0)
+    tickets_count = models.IntegerField(default=0)
+    refunded_orders_count = models.IntegerField(default=0)
+    refunded_tickets_count = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['event', 'ticket_tier'],
+                name='revenue_ledger_unique_tier',
+            ),
+            models.UniqueConstraint(
+                fields=['event'],
+                condition=Q(ticket_tier__isnull=True),
+                name='revenue_ledger_unique_event',
+            ),
+        ]
+
+    def __str__(self):
+        tier = self.ticket_tier_id or 'all'
+        return f"Revenue ledger for event {self.event_id} / tier {tier}"
+
+    @property
+    def net_amount(self):
+        return self.gross_amount - self.discount_amount - self.refunded_amount
@@ -0,0 +1,182 @@
+"""
+Incremental maintenance of the sales rollup tables.
+
+Every counter is bucketed on the timestamp of the row it comes from
+(Order.created_at, Ticket.created_at, Ticket.used_at, SavedEvent.created_at),
+so applying the transitions incrementally and rebuilding from source with
+`rebuild_event_rollups` produce the same rows.
+
+Minute rows are only kept for settings.SALES_MINUTE_ROLLUP_RETENTION; older
+activity is only visible at hourly and daily resolution.
+"""
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncHour, TruncMinute
+from django.utils import timezone
+
+from attendee.models import Order, SavedEvent, Ticket
+from .counters import increment
+from .models import DailySalesRollup, HourlySalesRollup, MinuteSalesRollup
+
+
+def minute_bucket(value):
+    value = (value or timezone.now()).astimezone(dt_timezone.utc)
+    return value.replace(second=0, microsecond=0)
+
+
+def hour_bucket(value):
+    return minute_bucket(value).replace(minute=0)
+
+
+def day_bucket(value):
+    return hour_bucket(value).replace(hour=0)
+
+
+# model -> (python bucketing, database truncation)
+ROLLUP_MODELS = {
+    MinuteSalesRollup: (minute_bucket, TruncMinute),
+    HourlySalesRollup: (hour_bucket, TruncHour),
+    DailySalesRollup: (day_bucket, TruncDay),
+}
+
+
+def minute_retention_cutoff():
+    return minute_bucket(timezone.now() - settings.SALES_MINUTE_ROLLUP_RETENTION)
+
+
+def record(event_id, ticket_tier_id, timestamp, **deltas):
+    """
+    Add the given counter deltas to the rollup rows that contain `timestamp`,
+    one upsert per table.
+    """
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    for model, (bucket_for, _) in ROLLUP_MODELS.items():
+        bucket = bucket_for(timestamp)
+        if model is MinuteSalesRollup and bucket < minute_retention_cutoff():
+            continue
+        increment(model, {'event': event_id, 'ticket_tier': ticket_tier_id, 'bucket': bucket}, deltas)
+
+
+# ============ TRANSITION HANDLERS ============
+
+def apply_order_transition(order, previous_status):
+    """Move an order's revenue and tickets in or out of the rollups."""
+    was_paid = previous_status == 'paid'
+    is_paid = order.status == 'paid'
+    if was_paid == is_paid:
+        return
+
+    sign = 1 if is_paid else -1
+    record(
+        order.event_id, None, order.created_at,
+        gross_revenue=sign * order.total_amount,
+    )
+
+    # Tickets issued before the order was paid count in the buckets they
+    # were created in, as the rebuild from source counts them
+    tickets = Ticket.objects.filter(order=order).values_list(
+        'ticket_tier_id', 'created_at'
+    )
+    for ticket_tier_id, created_at in tickets:
+        record(order.event_id, ticket_tier_id, created_at, tickets_sold=sign)
+
+
+def apply_ticket_transition(ticket, previous_status):
+    """Count newly issued tickets of paid orders and check-in changes."""
+    if previous_status is None and ticket.is_paid:
+        record(ticket.event_id, ticket.ticket_tier_id, ticket.created_at, tickets_sold=1)
+
+    checked_in = ticket.status == 'used'
+    was_checked_in = previous_status == 'used'
+    if checked_in != was_checked_in:
+        record(
+            ticket.event_id, ticket.ticket_tier_id,
+            ticket.used_at or ticket.updated_at,
+            check_ins=1 if checked_in else -1,
+        )
+
+
+def apply_save(saved_event, delta):
+    record(saved_event.event_id, None, saved_event.created_at, saves=delta)
+
+
+# ============ BACKFILL ============
+
+def _source_counters(event_id, trunc):
+    """
+    Yield (ticket_tier_id, bucket, field, value) for every counter of an event
+    computed directly from the source tables.
+    """
+    utc = dt_timezone.utc
+
+    tickets = (
+        Ticket.objects
+        .filter(event_id=event_id, is_paid=True)
+        .annotate(bucket=trunc('created_at', tzinfo=utc))
+        .values('ticket_tier_id', 'bucket')
+        .annotate(value=Count('id'))
+    )
+    for row in tickets:
+        yield row['ticket_tier_id'], row['bucket'], 'tickets_sold', row['value']
+
+    check_ins = (
+        Ticket.objects
+        .filter(event_id=event_id, status='used')
+        .annotate(bucket=trunc(Coalesce('used_at', 'updated_at'), tzinfo=utc))
+        .values('ticket_tier_id', 'bucket')
+        .annotate(value=Count('id'))
+    )
+    for row in check_ins:
+        yield row['ticket_tier_id'], row['bucket'], 'check_ins', row['value']
+
+    revenue = (
+        Order.objects
+        .filter(event_id=event_id, status='paid')
+        .annotate(bucket=trunc('created_at', tzinfo=utc))
+        .values('bucket')
+        .annotate(value=Sum('total_amount'))
+    )
+    for row in revenue:
+        yield None, row['bucket'], 'gross_revenue', row['value']
+
+    saves = (
+        SavedEvent.objects
+        .filter(event_id=event_id)
+        .annotate(bucket=trunc('created_at', tzinfo=utc))
+        .values('bucket')
+        .annotate(value=Count('id'))
+    )
+    for row in saves:
+        yield None, row['bucket'], 'saves', row['value']
+
+
+def rebuild_event_rollups(event_id):
+    """Replace all rollup rows of an event with values computed from source."""
+    with transaction.atomic():
+        for model, (_, trunc) in ROLLUP_MODELS.items():
+            since = minute_retention_cutoff() if model is MinuteSalesRollup else None
+            rows = {}
+            for ticket_tier_id, bucket, field, value in _source_counters(event_id, trunc):
+                if since and bucket < since:
+                    continue
+                key = (ticket_tier_id, bucket)
+                if key not in rows:
+                    rows[key] = model(
+                        event_id=event_id, ticket_tier_id=ticket_tier_id, bucket=bucket
+                    )
+                setattr(rows[key], field, value)
+
+            model.objects.filter(event_id=event_id).delete()
+            model.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+def prune_minute_rollups():
+    """Delete minute rows that have aged out of the retention window."""
+    deleted, _ = MinuteSalesRollup.objects.filter(bucket__lt=minute_retention_cutoff()).delete()
+    return deleted
@@ -0,0 +1,39 @@
+from rest_framework import serializers
+from .models import RevenueLedger
+
+
+class SalesTotalsSerializer(serializers.Serializer):
+    tickets_sold = serializers.IntegerField(source='total_tickets_sold')
+    gross_revenue = serializers.DecimalField(max_digits=12, decimal_places=2, source='total_gross_revenue')
+    check_ins = serializers.IntegerField(source='total_check_ins')
+    saves = serializers.IntegerField(source='total_saves')
+
+
+class EventSalesSummarySerializer(SalesTotalsSerializer):
+    event_id = serializers.IntegerField()
+    event_title = serializers.CharField()
+
+
+class SalesRollupSerializer(serializers.Serializer):
+    tickets_sold = serializers.IntegerField()
+    gross_revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
+    check_ins = serializers.IntegerField()
+    saves = serializers.IntegerField()
+    bucket = serializers.DateTimeField()
+    ticket_tier = serializers.IntegerField(source='ticket_tier_id', allow_null=True)
+    ticket_tier_name = serializers.CharField(allow_null=True)
+
+
+class RevenueLedgerSerializer(serializers.ModelSerializer):
+    ticket_tier_name = serializers.CharField(source='ticket_tier.name', read_only=True, default=None)
+    event_title = serializers.CharField(source='event.title', read_only=True)
+    net_amount = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = RevenueLedger
+        fields = [
+            'event', 'event_title', 'ticket_tier', 'ticket_tier_name',
+            'gross_amount', 'discount_amount', 'refunded_amount', 'net_amount',
+            'orders_count', 'tickets_count', 'refunded_orders_count', 'refunded_tickets_count',
+            'updated_at',
+        ]
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from attendee.models import SavedEvent
+from attendee.signals import order_status_changed, ticket_status_changed
+from . import ledger, rollups
+
+
+@receiver(order_status_changed)
+def update_rollups_for_order(sender, order, previous_status, **kwargs):
+    rollups.apply_order_transition(order, previous_status)
+
+
+@receiver(order_status_changed)
+def update_ledger_for_order(sender, order, previous_status, **kwargs):
+    ledger.apply_order_transition(order, previous_status)
+
+
+@receiver(ticket_status_changed)
+def update_rollups_for_ticket(sender, ticket, previous_status, **kwargs):
+    rollups.apply_ticket_transition(ticket, previous_status)
+
+
+@receiver(ticket_status_changed)
+def update_ledger_for_ticket(sender, ticket, previous_status, **kwargs):
+    if previous_status is None:
+        ledger.apply_ticket_issued(ticket)
+
+
+@receiver(post_save, sender=SavedEvent)
+def count_saved_event(sender, instance, created, **kwargs):
+    if created:
+        rollups.apply_save(instance, 1)
+
+
+@receiver(post_delete, sender=SavedEvent)
+def uncount_saved_event(sender, instance, **kwargs):
+    rollups.apply_save(instance, -1)
@@ -0,0 +1,191 @@
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.test import TestCase
+from django.utils import timezone
+
+from analytics.ledger import find_drift, rebuild_event_ledger
+from analytics.models import DailySalesRollup, HourlySalesRollup, MinuteSalesRollup, RevenueLedger
+from analytics.rollups import day_bucket, rebuild_event_rollups
+from attendee.models import Order, Ticket
+from organizers.management.commands._benchmark import create_event, create_organizer
+from organizers.models import Event, TicketTier
+from tixly.testing import EndpointBudgetTestCase
+
+
+class AnalyticsBudgetTests(EndpointBudgetTestCase):
+    """Sales and revenue rollups"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.busy_event = Event.objects.annotate(sold=Count('tickets')).order_by('-sold').first()
+        # The seed bulk-creates its orders, which skips the signals that keep
+        # rollups and the ledger current
+        for event_id in Event.objects.filter(organizer=cls.busy_event.organizer).values_list('id', flat=True):
+            rebuild_event_rollups(event_id)
+            rebuild_event_ledger(event_id)
+
+    def test_sales_summary(self):
+        self.assertWithinBudget('/api/organizer/analytics/events/', user=self.busy_event.organizer, queries=2, p95_ms=25)
+
+    def test_event_sales(self):
+        self.assertWithinBudget(
+            f'/api/organizer/analytics/events/{self.busy_event.id}/sales/', user=self.busy_event.organizer,
+            queries=4, p95_ms=25,
+        )
+
+    def test_event_sales_velocity(self):
+        self.assertWithinBudget(
+            f'/api/organizer/analytics/events/{self.busy_event.id}/velocity/', user=self.busy_event.organizer,
+            queries=4, p95_ms=25,
+        )
+
+    def test_revenue(self):
+        self.assertWithinBudget('/api/organizer/analytics/revenue/', user=self.busy_event.organizer, queries=2, p95_ms=25)
+
+    def test_event_revenue(self):
+        self.assertWithinBudget(
+            f'/api/organizer/analytics/events/{self.busy_event.id}/revenue/', user=self.busy_event.organizer,
+            queries=3, p95_ms=25,
+        )
+
+
+class OrderTestCase(TestCase):
+    """An event with two ticket tiers, and helpers to sell tickets for it"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = create_organizer()
+        cls.buyer = create_organizer()
+        cls.event = create_event(cls.organizer, 'Launch')
+        now = timezone.now()
+        cls.regular, cls.vip = (
+            TicketTier.objects.create(
+                name=name, short_description=name, price=Decimal(price), event=cls.event, total_tickets=100,
+                available_tickets=100, salesStart=now - timedelta(days=30), saleEnd=now + timedelta(days=30),
+            )
+            for name, price in (('Regular', '20.00'), ('VIP', '50.00'))
+        )
+
+    def order(self, total_amount, *tiers, status='pending'):
+        """An order with a ticket per tier, issued while it is pending, then set to `status`"""
+        order = Order.objects.create(
+            order_id=uuid.uuid4(), user=self.buyer, event=self.event, total_amount=Decimal(total_amount)
+        )
+        for tier in tiers:
+            Ticket.objects.create(order=order, event=self.event, user=self.buyer, ticket_tier=tier, qr_code=uuid.uuid4())
+        if status != 'pending':
+            self.set_status(order, status)
+        return order
+
+    def set_status(self, order, status):
+        order = Order.objects.get(pk=order.pk)
+        order.status = status
+        order.save()
+        return order
+
+
+class SalesRollupTests(OrderTestCase):
+    def counters(self, model=DailySalesRollup):
+        """{(tier id, bucket): (tickets sold, gross revenue, check-ins)} of the event's non-empty rows"""
+        return {
+            (row.ticket_tier_id, row.bucket): (row.tickets_sold, row.gross_revenue, row.check_ins)
+            for row in model.objects.filter(event=self.event)
+            if row.tickets_sold or row.gross_revenue or row.check_ins
+        }
+
+    def test_paying_counts_revenue_and_tickets(self):
+        order = self.order('70.00', self.regular, self.vip)
+        self.assertEqual(self.counters(), {})
+
+        self.set_status(order, 'paid')
+        today = day_bucket(timezone.now())
+        self.assertEqual(self.counters(), {
+            (None, today): (0, Decimal('70.00'), 0),
+            (self.regular.id, today): (1, 0, 0),
+            (self.vip.id, today): (1, 0, 0),
+        })
+        for model in (MinuteSalesRollup, HourlySalesRollup):
+            self.assertCountEqual(self.counters(model).values(), self.counters().values())
+
+    def test_tickets_count_in_the_bucket_they_were_issued_in(self):
+        order = self.order('20.00', self.regular)
+        issued = timezone.now() - timedelta(days=3)
+        Ticket.objects.filter(order=order).update(created_at=issued)
+
+        self.set_status(order, 'paid')
+        self.assertEqual(self.counters()[(self.regular.id, day_bucket(issued))], (1, 0, 0))
+
+    def test_refund_takes_the_sale_back_out(self):
+        order = self.order('70.00', self.regular, self.vip, status='paid')
+        self.set_status(order, 'cancelled')
+        self.assertEqual(self.counters(), {})
+
+    def test_check_ins(self):
+        order = self.order('20.00', self.regular, status='paid')
+        ticket = Ticket.objects.get(order=order)
+        ticket.status, ticket.used_at = 'used', timezone.now()
+        ticket.save()
+        self.assertEqual(self.counters()[(self.regular.id, day_bucket(ticket.used_at))], (1, 0, 1))
+
+    def test_backfill_matches_the_incremental_rollups(self):
+        self.order('70.00', self.regular, self.vip, status='paid')
+        refunded = self.order('20.00', self.regular, status='paid')
+        self.set_status(refunded, 'cancelled')
+        self.order('50.00', self.vip)
+        incremental = {model: self.counters(model) for model in (MinuteSalesRollup, HourlySalesRollup, DailySalesRollup)}
+
+        DailySalesRollup.objects.filter(event=self.event).update(tickets_sold=0, gross_revenue=0)
+        call_command('backfill_sales_rollups', self.event.id, stdout=StringIO())
+        self.assertEqual({model: self.counters(model) for model in incremental}, incremental)
+
+
+class RevenueLedgerTests(OrderTestCase):
+    def ledger(self, tier=None):
+        row = RevenueLedger.objects.get(event=self.event, ticket_tier=tier)
+        return (
+            row.gross_amount, row.discount_amount, row.refunded_amount,
+            row.orders_count, row.tickets_count, row.refunded_orders_count, row.refunded_tickets_count,
+        )
+
+    def test_paid_order_is_split_across_its_tiers(self):
+        # 70.00 list price sold for 63.00: the 7.00 discount goes 2.00 / 5.00
+        self.order('63.00', self.regular, self.vip, status='paid')
+        self.assertEqual(self.ledger(), (70, 7, 0, 1, 2, 0, 0))
+        self.assertEqual(self.ledger(self.regular), (20, 2, 0, 1, 1, 0, 0))
+        self.assertEqual(self.ledger(self.vip), (50, 5, 0, 1, 1, 0, 0))
+
+    def test_refund_and_repayment(self):
+        order = self.order('63.00', self.regular, self.vip, status='paid')
+        order = self.set_status(order, 'cancelled')
+        self.assertEqual(self.ledger(), (70, 7, 63, 1, 2, 1, 2))
+        self.assertEqual(self.ledger(self.vip), (50, 5, 45, 1, 1, 1, 1))
+
+        # Paid again: the refund is taken back, the sale isn't counted twice
+        self.set_status(order, 'paid')
+        self.assertEqual(self.ledger(), (70, 7, 0, 1, 2, 0, 0))
+        self.assertEqual(find_drift(self.event.id), [])
+
+    def test_unpaid_orders_stay_out(self):
+        self.order('20.00', self.regular)
+        self.order('20.00', self.regular, status='expired')
+        self.assertFalse(RevenueLedger.objects.filter(event=self.event).exists())
+
+    def test_verify_reports_and_fixes_drift(self):
+        self.order('63.00', self.regular, self.vip, status='paid')
+        self.set_status(self.order('20.00', self.regular, status='paid'), 'cancelled')
+        expected = {tier: self.ledger(tier) for tier in (None, self.regular, self.vip)}
+        RevenueLedger.objects.filter(event=self.event, ticket_tier=self.vip).update(gross_amount=0)
+
+        with self.assertRaises(CommandError):
+            call_command('verify_revenue_ledger', self.event.id, stdout=StringIO())
+        out = StringIO()
+        call_command('verify_revenue_ledger', self.event.id, '--fix', stdout=out)
+        self.assertIn(f"tier {self.vip.id}: gross_amount is 0.00, expected 50.00", out.getvalue())
+        self.assertEqual({tier: self.ledger(tier) for tier in expected}, expected)
+        call_command('verify_revenue_ledger', self.event.id, stdout=StringIO())
@@ -0,0 +1,10 @@
+from django.urls import path
+from .views import OrganizerSalesSummary, EventSalesRollups, EventSalesVelocity, OrganizerRevenue, EventRevenue
+
+urlpatterns = [
+    path("events/", OrganizerSalesSummary.as_view(), name="sales-summary"),
+    path("events/<int:pk>/sales/", EventSalesRollups.as_view(), name="event-sales"),
+    path("events/<int:pk>/velocity/", EventSalesVelocity.as_view(), name="event-sales-velocity"),
+    path("revenue/", OrganizerRevenue.as_view(), name="revenue"),
+    path("events/<int:pk>/revenue/", EventRevenue.as_view(), name="event-revenue"),
+]
@@ -0,0 +1,71 @@
+"""
+Sales velocity series built from the rollup tables.
+
+Series for every requested tier are aligned on the same zero-filled bucket
+axis, so moving averages, cumulative totals and sell-out projections are all
+single linear passes over plain lists.
+"""
+from datetime import timedelta
+from itertools import accumulate
+
+from .models import DailySalesRollup, HourlySalesRollup, MinuteSalesRollup
+from .rollups import day_bucket, hour_bucket, minute_bucket
+
+
+# granularity -> (rollup model, bucket function, bucket width, default span)
+GRANULARITIES = {
+    'minute': (MinuteSalesRollup, minute_bucket, timedelta(minutes=1), timedelta(hours=2)),
+    'hour': (HourlySalesRollup, hour_bucket, timedelta(hours=1), timedelta(days=2)),
+    'day': (DailySalesRollup, day_bucket, timedelta(days=1), timedelta(days=30)),
+}
+
+MAX_BUCKETS = 2000
+
+
+def bucket_axis(start, end, step):
+    """Bucket starts from the bucket containing `start` up to `end` (exclusive)"""
+    buckets = []
+    current = start
+    while current < end:
+        buckets.append(current)
+        current += step
+    return buckets
+
+
+def align(rows, tier_ids, buckets):
+    """
+    Spread (ticket_tier_id, bucket, tickets_sold) rows onto the shared axis,
+    returning {ticket_tier_id: [count per bucket]}.
+    """
+    position = {bucket: index for index, bucket in enumerate(buckets)}
+    series = {tier_id: [0] * len(buckets) for tier_id in tier_ids}
+    for tier_id, bucket, value in rows:
+        index = position.get(bucket)
+        if index is not None:
+            series[tier_id][index] += value
+    return series
+
+
+def cumulative(values):
+    return list(accumulate(values))
+
+
+def moving_average(values, window):
+    """Trailing moving average using prefix sums (O(n) for any window)"""
+    sums = [0, *accumulate(values)]
+    return [
+        round((sums[i + 1] - sums[max(0, i + 1 - window)]) / min(window, i + 1), 3)
+        for i in range(len(values))
+    ]
+
+
+def project_sell_out(remaining, rate, axis_end, step):
+    """
+    Time at which `remaining` tickets run out at `rate` tickets per bucket,
+    or None when nothing is selling.
+    """
+    if remaining <= 0:
+        return axis_end
+    if rate <= 0:
+        return None
+    return axis_end + step * (remaining / rate)
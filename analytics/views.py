@@ -0,0 +1,231 @@
+from decimal import Decimal
+
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_datetime
+from rest_framework import generics, status
+from rest_framework.response import Response
+
+from organizers.models import Event, TicketTier
+from organizers.permissions import IsEventOrganizer, IsOrganizer
+from .models import DailySalesRollup, HourlySalesRollup, RevenueLedger
+from .serializers import (
+    EventSalesSummarySerializer, SalesRollupSerializer, SalesTotalsSerializer,
+    RevenueLedgerSerializer
+)
+from . import velocity
+
+
+ROLLUPS_BY_GRANULARITY = {
+    'hour': HourlySalesRollup,
+    'day': DailySalesRollup,
+}
+
+
+def _totals():
+    # Prefixed aliases: annotations may not shadow the rollup's own fields
+    return {
+        'total_tickets_sold': Coalesce(Sum('tickets_sold'), 0),
+        'total_gross_revenue': Coalesce(Sum('gross_revenue'), Value(Decimal('0.00'))),
+        'total_check_ins': Coalesce(Sum('check_ins'), 0),
+        'total_saves': Coalesce(Sum('saves'), 0),
+    }
+
+
+class OrganizerSalesSummary(generics.ListAPIView):
+    """Sales totals for each of the organizer's events, read from the daily rollups"""
+    serializer_class = EventSalesSummarySerializer
+    permission_classes = [IsOrganizer]
+
+    def get_queryset(self):
+        return (
+            DailySalesRollup.objects
+            .filter(event__organizer=self.request.user)
+            .values('event_id')
+            .annotate(event_title=F('event__title'), **_totals())
+            .order_by('-total_gross_revenue', 'event_id')
+        )
+
+
+class EventSalesRollups(generics.GenericAPIView):
+    """
+    Hourly or daily sales series for one event, broken down by ticket tier.
+
+    Query params: granularity (hour|day, default day), start, end (ISO datetimes).
+    """
+    serializer_class = SalesRollupSerializer
+    permission_classes = [IsOrganizer, IsEventOrganizer]
+
+    def get(self, request, pk):
+        event = get_object_or_404(Event.objects.only('id', 'organizer_id'), pk=pk)
+        self.check_object_permissions(request, event)
+
+        granularity = request.query_params.get('granularity', 'day')
+        model = ROLLUPS_BY_GRANULARITY.get(granularity)
+        if model is None:
+            return Response(
+                {'error': 'granularity must be one of: hour, day'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rollups = model.objects.filter(event_id=event.id)
+        for param, lookup in (('start', 'bucket__gte'), ('end', 'bucket__lt')):
+            value = request.query_params.get(param)
+            if value:
+                parsed = parse_datetime(value)
+                if parsed is None:
+                    return Response(
+                        {'error': f'{param} must be an ISO 8601 datetime'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                rollups = rollups.filter(**{lookup: parsed})
+
+        totals = rollups.aggregate(**_totals())
+        series = rollups.annotate(
+            ticket_tier_name=F('ticket_tier__name')
+        ).order_by('bucket', 'ticket_tier_id')
+
+        return Response({
+            'event_id': event.id,
+            'granularity': granularity,
+            'totals': SalesTotalsSerializer(totals).data,
+            'series': self.get_serializer(series, many=True).data,
+        })
+
+
+class EventSalesVelocity(generics.GenericAPIView):
+    """
+    Aligned per-tier sales series for one event with moving averages and a
+    projected sell-out time for each tier.
+
+    Query params: granularity (minute|hour|day, default hour), tiers
+    (comma-separated ids, default all), start, end (ISO datetimes) and
+    window (moving average width in buckets, default 5).
+    """
+    permission_classes = [IsOrganizer, IsEventOrganizer]
+
+    def get(self, request, pk):
+        event = get_object_or_404(Event.objects.only('id', 'organizer_id'), pk=pk)
+        self.check_object_permissions(request, event)
+
+        granularity = request.query_params.get('granularity', 'hour')
+        if granularity not in velocity.GRANULARITIES:
+            return Response(
+                {'error': f"granularity must be one of: {', '.join(velocity.GRANULARITIES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        model, bucket_for, step, default_span = velocity.GRANULARITIES[granularity]
+
+        try:
+            window = int(request.query_params.get('window', 5))
+            if window < 1:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {'error': 'window must be a positive integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        bounds = {}
+        for param in ('start', 'end'):
+            value = request.query_params.get(param)
+            if value:
+                bounds[param] = parse_datetime(value)
+                if bounds[param] is None:
+                    return Response(
+                        {'error': f'{param} must be an ISO 8601 datetime'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+        end = bucket_for(bounds.get('end')) + step
+        start = bucket_for(bounds.get('start') or end - default_span)
+        if start >= end or (end - start) / step > velocity.MAX_BUCKETS:
+            return Response(
+                {'error': f'start must be before end and span at most {velocity.MAX_BUCKETS} buckets'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        tiers = TicketTier.objects.filter(event_id=event.id).order_by('id')
+        tier_param = request.query_params.get('tiers')
+        if tier_param:
+            try:
+                tier_ids = {int(tier_id) for tier_id in tier_param.split(',') if tier_id}
+            except ValueError:
+                return Response(
+                    {'error': 'tiers must be a comma-separated list of ids'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            tiers = tiers.filter(id__in=tier_ids)
+        tiers = list(tiers.only('id', 'name', 'available_tickets'))
+
+        rows = model.objects.filter(
+            event_id=event.id,
+            ticket_tier_id__in=[tier.id for tier in tiers],
+            bucket__gte=start,
+            bucket__lt=end,
+        ).values_list('ticket_tier_id', 'bucket', 'tickets_sold')
+
+        buckets = velocity.bucket_axis(start, end, step)
+        series = velocity.align(rows, [tier.id for tier in tiers], buckets)
+
+        results = []
+        for tier in tiers:
+            sold = series[tier.id]
+            averages = velocity.moving_average(sold, window)
+            sell_out = velocity.project_sell_out(
+                tier.available_tickets, averages[-1] if averages else 0, end, step
+            )
+            results.append({
+                'ticket_tier': tier.id,
+                'name': tier.name,
+                'remaining': tier.available_tickets,
+                'sold': sold,
+                'cumulative': velocity.cumulative(sold),
+                'moving_average': averages,
+                'projected_sell_out': sell_out.isoformat() if sell_out else None,
+            })
+
+        return Response({
+            'event_id': event.id,
+            'granularity': granularity,
+            'window': window,
+            'buckets': [bucket.isoformat() for bucket in buckets],
+            'tiers': results,
+        })
+
+
+class OrganizerRevenue(generics.ListAPIView):
+    """Event-level revenue ledger rows for each of the organizer's events"""
+    serializer_class = RevenueLedgerSerializer
+    permission_classes = [IsOrganizer]
+
+    def get_queryset(self):
+        return RevenueLedger.objects.filter(
+            event__organizer=self.request.user,
+            ticket_tier__isnull=True,
+        ).select_related('event').order_by('-gross_amount', 'event_id')
+
+
+class EventRevenue(generics.GenericAPIView):
+    """Revenue totals for one event and each of its ticket tiers"""
+    serializer_class = RevenueLedgerSerializer
+    permission_classes = [IsOrganizer, IsEventOrganizer]
+
+    def get(self, request, pk):
+        event = get_object_or_404(Event.objects.only('id', 'title', 'organizer_id'), pk=pk)
+        self.check_object_permissions(request, event)
+
+        rows = RevenueLedger.objects.filter(event_id=event.id).select_related('event', 'ticket_tier')
+        totals = None
+        tiers = []
+        for row in rows:
+            if row.ticket_tier_id is None:
+                totals = row
+            else:
+                tiers.append(row)
+
+        return Response({
+            'event_id': event.id,
+            'totals': self.get_serializer(totals).data if totals else None,
+            'tiers': self.get_serializer(sorted(tiers, key=lambda row: row.ticket_tier_id), many=True).data,
+        })
@@ -0,0 +1,217 @@
+"""
+iCalendar (RFC 5545) feeds for event agendas and attendees' ticketed events.
+
+Feeds are rendered as a stream of chunks. Calendar clients poll them
+often, so every feed has a version-derived ETag (a matching If-None-Match
+gets a 304 without rendering anything) and the rendered body is cached
+under that version, so a client without the ETag still skips rendering.
+"""
+import hashlib
+import secrets
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import parse_etags
+
+CALENDAR_CONTENT_TYPE = 'text/calendar; charset=utf-8'
+
+# Cache keys change with the feed version, so this only bounds how long a
+# superseded body stays around
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Components are buffered into chunks of this size before being yielded
+EVENTS_PER_CHUNK = 50
+
+PRODID = '-//Tixly//Tixly Calendar//EN'
+UID_DOMAIN = 'tixly'
+
+FEED_TOKEN_SALT = 'attendee.calendars.feed'
+
+
+# ============ FORMATTING ============
+
+def escape_text(value):
+    """Escape a TEXT property value"""
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Fold a content line at 75 octets, never splitting a UTF-8 character"""
+    parts = []
+    current, size, limit = [], 0, 75
+    for char in line:
+        width = len(char.encode('utf-8'))
+        if size + width > limit:
+            parts.append(''.join(current))
+            # Continuation lines start with a space that counts towards the limit
+            current, size, limit = [], 0, 74
+        current.append(char)
+        size += width
+    parts.append(''.join(current))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_datetime(value):
+    """A datetime as a UTC DATE-TIME value"""
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event(uid, stamp, start, end, summary, location='', description=''):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{format_datetime(stamp)}',
+        f'DTSTART:{format_datetime(start)}',
+        f'DTEND:{format_datetime(end)}',
+        f'SUMMARY:{escape_text(summary)}',
+    ]
+    if location:
+        lines.append(f'LOCATION:{escape_text(location)}')
+    if description:
+        lines.append(f'DESCRIPTION:{escape_text(description)}')
+    lines.append('END:VEVENT')
+    return ''.join(fold(line) for line in lines)
+
+
+def _calendar(name, components):
+    yield fold('BEGIN:VCALENDAR') + fold('VERSION:2.0') + fold(f'PRODID:{PRODID}') \
+        + fold('CALSCALE:GREGORIAN') + fold(f'X-WR-CALNAME:{escape_text(name)}')
+
+    buffer = []
+    for component in components:
+        buffer.append(component)
+        if len(buffer) >= EVENTS_PER_CHUNK:
+            yield ''.join(buffer)
+            buffer = []
+    buffer.append(fold('END:VCALENDAR'))
+    yield ''.join(buffer)
+
+
+# ============ FEEDS ============
+
+def _session_datetime(date, time):
+    return timezone.make_aware(datetime.combine(
+        datetime.strptime(date, '%Y-%m-%d').date(),
+        datetime.strptime(time, '%H:%M:%S').time(),
+    ))
+
+
+def agenda_calendar(event, agenda):
+    """Stream an event's agenda (an organizers.agenda.Agenda), one VEVENT per session"""
+    def components():
+        for date, sessions in agenda.sessions_by_date().items():
+            for session in sessions:
+                speakers = ', '.join(speaker['name'] for speaker in session['speakers'])
+                description = '\n\n'.join(
+                    part for part in (session['description'], speakers and f'Speakers: {speakers}') if part
+                )
+                yield _event(
+                    uid=f"session-{session['id']}@{UID_DOMAIN}",
+                    stamp=event.updated_at,
+                    start=_session_datetime(date, session['start_time']),
+                    end=_session_datetime(date, session['end_time']),
+                    summary=session['title'],
+                    location=', '.join(part for part in (session['room'], event.location) if part),
+                    description=description,
+                )
+
+    return _calendar(event.title, components())
+
+
+def events_calendar(name, events):
+    """Stream one VEVENT per event, e.g. the events an attendee holds tickets for"""
+    def components():
+        for event in events:
+            # Undated events can't be placed on a calendar
+            if event.startDateTime is None or event.endDateTime is None:
+                continue
+            yield _event(
+                uid=f'event-{event.id}@{UID_DOMAIN}',
+                stamp=event.updated_at,
+                start=event.startDateTime,
+                end=event.endDateTime,
+                summary=event.title,
+                location=event.location,
+                description=event.short_description,
+            )
+
+    return _calendar(name, components())
+
+
+# ============ VERSIONING & RESPONSES ============
+
+def feed_token(user):
+    """
+    Signed token identifying a user's ticket feed, for calendar subscription
+    URLs. It stays valid until rotate_feed_token replaces the user's key.
+    """
+    return signing.dumps([user.pk, user.calendar_feed_key], salt=FEED_TOKEN_SALT)
+
+
+def rotate_feed_token(user):
+    """Revoke the user's feed token; returns the new one"""
+    user.calendar_feed_key = secrets.token_hex(16)
+    user.save(update_fields=['calendar_feed_key'])
+    return feed_token(user)
+
+
+def feed_user_id(token):
+    """The user id a feed token was issued for, or None if it is invalid or revoked"""
+    try:
+        payload = signing.loads(token, salt=FEED_TOKEN_SALT)
+    except signing.BadSignature:
+        return None
+    # Tokens from before feed keys carry only the user id
+    user_id, key = payload if isinstance(payload, list) else (payload, '')
+    if not get_user_model().objects.filter(pk=user_id, calendar_feed_key=key).exists():
+        return None
+    return user_id
+
+
+def _caching(chunks, cache_key):
+    rendered = []
+    for chunk in chunks:
+        rendered.append(chunk)
+        yield chunk
+    # Only a fully streamed body is cached
+    cache.set(cache_key, ''.join(rendered), FEED_CACHE_TIMEOUT)
+
+
+def calendar_response(request, scope, version, render, filename, cache_control='public, max-age=300'):
+    """
+    Respond with a calendar feed. `version` is a tuple of values that change
+    whenever the feed's content does; it yields the ETag and the cache key.
+    `render` is only called when the client doesn't already hold this
+    version and it isn't cached yet.
+    """
+    digest = hashlib.sha1(':'.join(str(part) for part in version).encode()).hexdigest()
+    etag = f'"{digest}"'
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+        response = HttpResponseNotModified()
+    else:
+        cache_key = f'calendar:{scope}:{digest}'
+        body = cache.get(cache_key)
+        if body is None:
+            response = StreamingHttpResponse(_caching(render(), cache_key), content_type=CALENDAR_CONTENT_TYPE)
+        else:
+            response = HttpResponse(body, content_type=CALENDAR_CONTENT_TYPE)
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendee', '0002_ticket_event'),
+        ('organizers', '0010_tickettier_short_description'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ticket',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='tickets', to='organizers.event'),
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order', to='attendee.order'),
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='ticket_tier',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ticket_tier', to='organizers.tickettier'),
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
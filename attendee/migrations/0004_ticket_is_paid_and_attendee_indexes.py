@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:06
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+def populate_is_paid(apps, schema_editor):
+    Ticket = apps.get_model('attendee', 'Ticket')
+    Ticket.objects.filter(order__status='paid').update(is_paid=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendee', '0003_alter_ticket_related_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='is_paid',
+            field=models.BooleanField(default=False, help_text="Denormalized from order.status == 'paid'"),
+        ),
+        migrations.RunPython(populate_is_paid, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('is_paid', True)), fields=['event', 'created_at'], name='ticket_paid_event_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('is_paid', True)), fields=['event', 'status', 'created_at'], name='ticket_paid_event_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('is_paid', True)), fields=['ticket_tier', 'created_at'], name='ticket_paid_tier_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(models.F('event'), django.db.models.functions.text.Upper('attendee_name'), condition=models.Q(('is_paid', True)), name='ticket_paid_event_name_idx'),
+        ),
+    ]
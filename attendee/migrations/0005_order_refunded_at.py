@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendee', '0004_ticket_is_paid_and_attendee_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='refunded_at',
+            field=models.DateTimeField(blank=True, help_text='Last time the order left the paid status', null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendee', '0005_order_refunded_at'),
+        ('organizers', '0017_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'status'], name='order_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savedevent',
+            index=models.Index(fields=['user', 'created_at'], name='savedevent_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['user', 'event'], name='ticket_user_event_idx'),
+        ),
+    ]
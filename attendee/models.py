@@ -1,5 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Upper
+from django.utils import timezone
 from organizers.models import Event,TicketTier
+from .signals import order_status_changed, ticket_status_changed
 from django.contrib.auth import get_user_model
 user = get_user_model()
 
@@ -20,12 +24,46 @@ class Order(models.Model):
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     transaction_id = models.CharField(max_length=100, unique=True, null=True, blank=True) # Paystack/Stripe Ref
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    refunded_at = models.DateTimeField(null=True, blank=True, help_text="Last time the order left the paid status")
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Status the row had in the database when it was loaded, used to detect
+    # transitions on save. None for orders that have not been saved yet.
+    _loaded_status = None
+
     def __str__(self):
         return f"Order #{self.id} - {self.status}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        previous_status = self._loaded_status
+        if previous_status == 'paid' and self.status != 'paid':
+            self.refunded_at = timezone.now()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'refunded_at'}
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if previous_status != self.status:
+                if (previous_status == 'paid') != (self.status == 'paid'):
+                    Ticket.objects.filter(order=self).update(is_paid=self.status == 'paid')
+                order_status_changed.send(
+                    sender=Order, order=self, previous_status=previous_status
+                )
+        self._loaded_status = self.status
+
+    class Meta:
+        indexes = [
+            # A user's orders, by status (recommendations, order history)
+            models.Index(fields=['user', 'status'], name='order_user_status_idx'),
+        ]
+
 
 class Ticket(models.Model):
     STATUS_CHOICES = (
@@ -42,16 +80,65 @@ class Ticket(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='unused')
     used_at = models.DateTimeField(null=True, blank=True)
     attendee_name = models.CharField(max_length=100, null=True, blank=True)
+    is_paid = models.BooleanField(default=False, help_text="Denormalized from order.status == 'paid'")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Status the row had in the database when it was loaded, used to detect
+    # transitions on save. None for tickets that have not been saved yet.
+    _loaded_status = None
+
     def __str__(self):
         return f"Ticket #{self.id} - {self.status}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.is_paid = self.order.status == 'paid'
+
+        previous_status = self._loaded_status
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if previous_status != self.status:
+                ticket_status_changed.send(
+                    sender=Ticket, ticket=self, previous_status=previous_status
+                )
+        self._loaded_status = self.status
     
 
     class Meta:
         indexes = [
-            models.Index(fields=['event']),
+            # Organizer attendee listings only ever read paid tickets, so the
+            # indexes are partial on is_paid and stay ordered by created_at
+            models.Index(
+                fields=['event', 'created_at'],
+                condition=Q(is_paid=True),
+                name='ticket_paid_event_created_idx',
+            ),
+            models.Index(
+                fields=['event', 'status', 'created_at'],
+                condition=Q(is_paid=True),
+                name='ticket_paid_event_status_idx',
+            ),
+            models.Index(
+                fields=['ticket_tier', 'created_at'],
+                condition=Q(is_paid=True),
+                name='ticket_paid_tier_created_idx',
+            ),
+            # Case-insensitive attendee name prefix search within an event
+            models.Index(
+                F('event'), Upper('attendee_name'),
+                condition=Q(is_paid=True),
+                name='ticket_paid_event_name_idx',
+            ),
+            # The events a user holds tickets for (AttendeeEvents,
+            # UpcomingEvents, calendar feeds)
+            models.Index(fields=['user', 'event'], name='ticket_user_event_idx'),
         ]
 
 
@@ -62,6 +149,10 @@ class SavedEvent(models.Model):
 
     class Meta:
         unique_together = ('user', 'event')
+        indexes = [
+            # A user's saved events, most recently saved first
+            models.Index(fields=['user', 'created_at'], name='savedevent_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} saved {self.event.title}"    
@@ -0,0 +1,10 @@
+from django.dispatch import Signal
+
+
+# Sent after an Order is saved with a status different from the one it was
+# loaded with (previous_status is None for newly created orders).
+order_status_changed = Signal()
+
+# Sent after a Ticket is saved with a status different from the one it was
+# loaded with (previous_status is None for newly issued tickets).
+ticket_status_changed = Signal()
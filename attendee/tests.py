@@ -1,3 +1,128 @@
-from django.test import TestCase
+import uuid
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase, modify_settings, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from attendee.calendars import feed_token, rotate_feed_token
+from attendee.models import Order, Ticket
+from organizers.management.commands._benchmark import create_event, create_organizer
+from organizers.models import TicketTier
+from tixly.testing import EndpointBudgetTestCase
+
+
+class CatalogBudgetTests(EndpointBudgetTestCase):
+    """Public catalog reads"""
+
+    def test_list_events(self):
+        self.assertWithinBudget('/api/events/', queries=3, p95_ms=100)
+
+    def test_list_events_query_count_is_independent_of_the_page(self):
+        self.assertConstantQueries(
+            '/api/events/', '/api/events/?page=2', '/api/events/?category=music', '/api/events/?min_price=40',
+        )
+
+    def test_new_events(self):
+        self.assertWithinBudget('/api/events/new/', queries=3, p95_ms=100)
+
+    def test_trending_events(self):
+        self.assertWithinBudget('/api/events/trending/', queries=2, p95_ms=100)
+
+    def test_event_details(self):
+        self.assertWithinBudget(f"/api/event/{self.data['event'].id}/", queries=3, p95_ms=50)
+
+    def test_event_details_with_agenda(self):
+        self.assertWithinBudget(
+            f"/api/event/{self.data['agenda_event'].id}/", user=self.data['attendee'], queries=3, p95_ms=50
+        )
+
+    def test_event_ticket_tiers(self):
+        self.assertWithinBudget(
+            f"/api/event/{self.data['event'].id}/ticket-tiers/", user=self.data['attendee'], queries=2, p95_ms=25
+        )
+
+    def test_agenda_calendar(self):
+        self.assertWithinBudget(f"/api/event/{self.data['agenda_event'].id}/agenda.ics", queries=2, p95_ms=25)
+
+
+class AttendeeBudgetTests(EndpointBudgetTestCase):
+    """The signed-in attendee's own events, tickets and saves"""
+
+    def test_upcoming_events(self):
+        self.assertWithinBudget('/api/events/upcoming/', user=self.data['attendee'], queries=2, p95_ms=25)
+
+    def test_attendee_events(self):
+        self.assertWithinBudget('/api/attendee/events/', user=self.data['attendee'], queries=4, p95_ms=50)
+
+    def test_saved_events(self):
+        self.assertWithinBudget('/api/events/saved/', user=self.data['attendee'], queries=2, p95_ms=50)
+
+    def test_recommended_events(self):
+        self.assertWithinBudget('/api/events/recommended/', user=self.data['attendee'], queries=5, p95_ms=100)
+
+    def test_event_ticket(self):
+        ticket = self.data['attendee'].user.first()
+        self.assertWithinBudget(
+            f'/api/event/{ticket.event_id}/ticket/', user=self.data['attendee'], queries=3, p95_ms=50
+        )
+
+    def test_calendar_link(self):
+        self.assertWithinBudget('/api/attendee/events/calendar/', user=self.data['attendee'], queries=0, p95_ms=25)
+
+    def test_events_calendar_feed(self):
+        path = reverse('attendee-events-calendar', kwargs={'token': feed_token(self.data['attendee'])})
+        self.assertWithinBudget(path, queries=3, p95_ms=25)
+
+
+# Silk patches the SQL compiler for the rest of the process once it has
+# seen a request, which would throw off the query budgets of later suites
+@override_settings(ALLOWED_HOSTS=['testserver'], AGENDA_BUILD_ASYNC=False, RATE_LIMIT_ENABLED=False)
+@modify_settings(MIDDLEWARE={'remove': ['silk.middleware.SilkyMiddleware']})
+class EventsCalendarFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        organizer = create_organizer()
+        cls.attendee = create_organizer()
+        cls.dated = create_event(organizer, 'Dated event')
+        cls.undated = create_event(organizer, 'Undated event')
+        cls.undated.startDateTime = cls.undated.endDateTime = None
+        cls.undated.save()
+        for event in (cls.dated, cls.undated):
+            tier = TicketTier.objects.create(
+                name='Regular', short_description='Regular', price=Decimal('10.00'), event=event,
+                total_tickets=10, available_tickets=9, salesStart=timezone.now() - timedelta(days=1),
+                saleEnd=timezone.now() + timedelta(days=1),
+            )
+            order = Order.objects.create(
+                order_id=uuid.uuid4(), user=cls.attendee, event=event, total_amount=tier.price, status='paid'
+            )
+            Ticket.objects.create(order=order, event=event, user=cls.attendee, ticket_tier=tier, qr_code=uuid.uuid4())
+
+    def feed(self, token):
+        response = APIClient().get(reverse('attendee-events-calendar', kwargs={'token': token}))
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, body.decode()
+
+    def test_feed_lists_dated_events_only(self):
+        status_code, body = self.feed(feed_token(self.attendee))
+        self.assertEqual(status_code, 200)
+        self.assertIn('SUMMARY:Dated event', body)
+        self.assertNotIn('Undated event', body)
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+
+    def test_rotating_the_token_revokes_the_old_one(self):
+        old = feed_token(self.attendee)
+        new = rotate_feed_token(self.attendee)
+        self.assertEqual(self.feed(old)[0], 404)
+        self.assertEqual(self.feed(new)[0], 200)
+
+    def test_link_endpoint_rotates_on_post(self):
+        client = APIClient()
+        client.force_authenticate(self.attendee)
+        before = client.get('/api/attendee/events/calendar/').data['url']
+        after = client.post('/api/attendee/events/calendar/').data['url']
+        self.assertNotEqual(before, after)
+        self.assertEqual(self.feed(before.rstrip('/').split('/')[-2])[0], 404)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import ListEvents,EventDetails,EventTicketTiers,  UpcomingEvents,NewEvents,AttendeeEvents,EventTicket, SavedEventsList,RecommendedEvents,TrendingEvents
+from .views import ListEvents,EventDetails,EventTicketTiers,  UpcomingEvents,NewEvents,AttendeeEvents,EventTicket, SavedEventsList,RecommendedEvents,TrendingEvents,EventAgendaCalendar,AttendeeCalendarLink,AttendeeEventsCalendar
 
 
 urlpatterns = [
@@ -11,6 +11,9 @@ urlpatterns = [
     path("event/<int:pk>/",EventDetails.as_view()),
     path("event/<int:pk>/ticket-tiers/",EventTicketTiers.as_view()),
     path("attendee/events/",AttendeeEvents.as_view()),
+    path("event/<int:pk>/agenda.ics",EventAgendaCalendar.as_view(),name="event-agenda-calendar"),
+    path("attendee/events/calendar/",AttendeeCalendarLink.as_view(),name="attendee-calendar-link"),
+    path("attendee/calendar/<str:token>/events.ics",AttendeeEventsCalendar.as_view(),name="attendee-events-calendar"),
     path("events/saved/", SavedEventsList.as_view(), name="saved-events"),
     path("event/<int:pk>/ticket/",EventTicket.as_view())
 ]
\ No newline at end of file
@@ -2,7 +2,7 @@ from django.shortcuts import render
 from rest_framework import generics
 from rest_framework.response import Response
 from organizers.serializers import EventListSerializer,TicketTierSerializer,EventDetailSerializer
-from rest_framework import generics, filters
+from rest_framework import generics, filters, status
 from rest_framework.permissions import AllowAny,IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 
@@ -11,13 +11,25 @@ from .models import Event,TicketTier,Ticket,Order, SavedEvent
 from .filters import EventFilter
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Count, Q, F, Prefetch, Exists, OuterRef
+from django.db.models import Count, Q, F, Max, Prefetch, Exists, OuterRef
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from organizers.models import Schedule,EventDay
+from organizers.agenda import get_agenda
+from accounts.throttling import RateLimit
+from tixly.db import ReplicaReadMixin
+from .calendars import (
+    agenda_calendar, calendar_response, events_calendar, feed_token, feed_user_id, rotate_feed_token,
+)
 
+# Public catalog reads, per client and endpoint: bursts of 60, 300 a minute
+CATALOG_RATE_LIMITS = [RateLimit('300/m', key='user_or_ip', algorithm='token_bucket', burst=60)]
 
+# Calendar apps poll feeds; anything faster than this is a misbehaving client
+FEED_RATE_LIMITS = [RateLimit('60/m', key='ip')]
 
 
-class ListEvents(generics.ListAPIView):
+class ListEvents(ReplicaReadMixin, generics.ListAPIView):
     queryset = Event.objects.filter(status='published').select_related(
         'organizer'
     ).prefetch_related(
@@ -26,6 +38,7 @@ class ListEvents(generics.ListAPIView):
     
     serializer_class = EventListSerializer
     permission_classes = [AllowAny]
+    rate_limits = CATALOG_RATE_LIMITS
     
     # Enable filtering backends
     filter_backends = [
@@ -113,12 +126,13 @@ class UpcomingEvents(generics.GenericAPIView):
   
 
 
-class NewEvents(generics.ListAPIView):
+class NewEvents(ReplicaReadMixin, generics.ListAPIView):
     """
     Get newly created events (created in the last 7 days)
     """
     serializer_class = EventListSerializer
     permission_classes = [AllowAny]
+    rate_limits = CATALOG_RATE_LIMITS
     
     def get_queryset(self):
         seven_days_ago = timezone.now() - timedelta(days=20)
@@ -133,13 +147,14 @@ class NewEvents(generics.ListAPIView):
             'ticket_tiers'
         ).order_by('-created_at')
 
-class TrendingEvents(generics.ListAPIView):
+class TrendingEvents(ReplicaReadMixin, generics.ListAPIView):
     """
     Get trending events based on sales and user engagement (saves) in the last 72 hours.
     Algorithm: Score = (Recent Sales * 2) + Recent Saves
     """
     serializer_class = EventListSerializer
     permission_classes = [AllowAny]
+    rate_limits = CATALOG_RATE_LIMITS
     pagination_class = None
     
     def get_queryset(self):
@@ -163,41 +178,30 @@ class TrendingEvents(generics.ListAPIView):
             trending_score=F('recent_sales') * 2 + F('recent_saves')
         ).filter(
             trending_score__gte=5  # Minimum score to be considered trending
+        ).select_related(
+            'organizer'
+        ).prefetch_related(
+            'ticket_tiers'
         ).order_by('-trending_score', 'startDateTime')
         
         return queryset[:10]  # Return top 10 trending events
 
 
-class EventDetails(generics.RetrieveAPIView):
+class EventDetails(ReplicaReadMixin, generics.RetrieveAPIView):
   
  
     serializer_class = EventDetailSerializer
     permission_classes = [AllowAny]
+    rate_limits = CATALOG_RATE_LIMITS
     lookup_field = 'pk'
 
 
     def get_queryset(self):
-        return Event.objects.select_related(
+        # Days, sessions and speakers come from the event's agenda document
+        queryset = Event.objects.select_related(
             'organizer'
         ).prefetch_related(
-            'ticket_tiers',
-            Prefetch(
-                'schedules',
-                queryset=Schedule.objects.select_related(
-                    'event_day'
-                ).prefetch_related(
-                    'speakers'
-                ).order_by('date', 'start_time', 'order')
-            ),
-            Prefetch(
-                'event_days',
-                queryset=EventDay.objects.prefetch_related(
-                    Prefetch(
-                        'schedules',
-                        queryset=Schedule.objects.prefetch_related('speakers')
-                    )
-                ).order_by('date', 'startTime')
-            )
+            'ticket_tiers'
         )
         
         user = self.request.user
@@ -231,7 +235,8 @@ class EventTicketTiers(generics.ListAPIView):
 
     def get_queryset(self):
         event_id = self.kwargs.get("pk")
-        return TicketTier.objects.filter(event__id = event_id)
+        # Cheapest first, off the (event, price) index
+        return TicketTier.objects.filter(event__id = event_id).order_by('price', 'id')
 
 class AttendeeEvents(generics.GenericAPIView):
     serializer_class = EventListSerializer
@@ -271,12 +276,83 @@ class EventTicket(generics.ListAPIView):
     def get_queryset(self):
         pk = self.kwargs.get("pk")
         user = self.request.user
-        ticket = Ticket.objects.filter(event__id = pk,user =user ).select_related('event','event__organizer','ticket_tier').prefetch_related('event__ticket_tiers')
+        ticket = Ticket.objects.filter(event__id = pk,user =user ).select_related('event','event__organizer','ticket_tier').prefetch_related('event__ticket_tiers').order_by('id')
         return ticket
 
 
 
 
+# ============ CALENDAR FEEDS ============
+
+class EventAgendaCalendar(generics.GenericAPIView):
+    """An event's agenda as an iCalendar feed, one entry per session"""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    rate_limits = FEED_RATE_LIMITS
+
+    def get(self, request, pk):
+        event = get_object_or_404(
+            Event.objects.only('id', 'title', 'location', 'updated_at')
+            .annotate(agenda_version=F('agenda__version')),
+            pk=pk
+        )
+        return calendar_response(
+            request, 'agenda',
+            version=(event.id, event.agenda_version, event.updated_at.isoformat()),
+            render=lambda: agenda_calendar(event, get_agenda(event.id)),
+            filename=f'event-{event.id}-agenda.ics',
+        )
+
+
+class AttendeeCalendarLink(generics.GenericAPIView):
+    """
+    Subscription URL of the user's ticketed-events calendar feed. POST
+    replaces it, revoking the previous URL.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return self.link(request, feed_token(request.user))
+
+    def post(self, request):
+        return self.link(request, rotate_feed_token(request.user))
+
+    def link(self, request, token):
+        url = reverse('attendee-events-calendar', kwargs={'token': token})
+        return Response({'url': request.build_absolute_uri(url)})
+
+
+class AttendeeEventsCalendar(generics.GenericAPIView):
+    """
+    The events a user holds tickets for (as in AttendeeEvents) as an
+    iCalendar feed. Calendar apps can't log in, so the user is identified by
+    the signed token from AttendeeCalendarLink.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    rate_limits = FEED_RATE_LIMITS
+
+    def get(self, request, token):
+        user_id = feed_user_id(token)
+        if user_id is None:
+            return Response({'error': 'Invalid calendar feed'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Changes whenever a ticket of the user or one of their events changes
+        state = Ticket.objects.filter(user_id=user_id).aggregate(
+            count=Count('id'), tickets=Max('updated_at'), events=Max('event__updated_at')
+        )
+        events = Event.objects.filter(
+            tickets__user_id=user_id, startDateTime__isnull=False, endDateTime__isnull=False
+        ).distinct().order_by('startDateTime')
+        return calendar_response(
+            request, 'tickets',
+            version=(user_id, state['count'], state['tickets'], state['events']),
+            render=lambda: events_calendar('My Tixly events', events.iterator()),
+            filename='my-events.ics',
+            cache_control='private, max-age=300',
+        )
+
+
 # ============ SAVED EVENTS ============
 
 class SavedEventsList(generics.GenericAPIView):
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Event,EventDay,TicketTier,Coupon,Speaker,Schedule 
+from .models import Event,EventDay,TicketTier,Coupon,Speaker,Schedule,EventAgenda
 
 admin.site.register(Event)
 admin.site.register(EventDay)
@@ -7,4 +7,5 @@ admin.site.register(Speaker)
 admin.site.register(Schedule)
 admin.site.register(TicketTier)
 admin.site.register(Coupon)
+admin.site.register(EventAgenda)
 # Register your models here.
@@ -0,0 +1,312 @@
+"""
+Materialized per-event agenda documents.
+
+Each event has one EventAgenda row holding its days, sessions and
+deduplicated speakers as pre-rendered JSON. Changes to EventDay, Schedule or
+Speaker rows (see organizers.signals) call `request_rebuild`, which bumps
+the agenda version when the transaction commits and rebuilds the document
+on a background thread. The schedule endpoints read and slice the stored
+document instead of querying the schedule tables. A read that finds the
+document missing or stale, with no build queued within
+AGENDA_BUILD_TIMEOUT, queues one again, so a failed or lost build recovers.
+"""
+import logging
+import threading
+from collections import defaultdict
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.http import Http404
+from django.utils import timezone
+
+from .models import Event, EventAgenda, EventDay, Schedule
+from .serializers import AgendaDaySerializer, AgendaSessionSerializer, SpeakerSerializer
+
+logger = logging.getLogger(__name__)
+
+
+# ============ BUILDING ============
+
+def load_agenda(event_id):
+    """
+    Load the days, sessions and speakers of an event in three queries: the
+    days, the sessions, and the schedule/speaker link rows joined to their
+    speaker. Links are grouped in memory, so every speaker row is read once
+    however many sessions it appears in.
+
+    Returns (days, schedules, speakers). Each schedule gets `agenda_speakers`,
+    its speakers ordered by name; speakers are unique, in order of first
+    appearance across the sessions.
+    """
+    days = list(EventDay.objects.filter(event_id=event_id).order_by('date', 'startTime'))
+    days_by_id = {day.id: day for day in days}
+    schedules = list(
+        Schedule.objects
+        .filter(event_id=event_id)
+        .order_by('date', 'start_time', 'order')
+    )
+    links = (
+        Schedule.speakers.through.objects
+        .filter(schedule__event_id=event_id)
+        .select_related('speaker')
+        .order_by('speaker__name')
+    )
+
+    speakers_by_schedule = defaultdict(list)
+    for link in links:
+        speakers_by_schedule[link.schedule_id].append(link.speaker)
+
+    speakers = {}
+    for schedule in schedules:
+        # Sessions always point at a day of their own event; reuse those rows
+        # instead of joining the day again for every session
+        if schedule.event_day_id in days_by_id:
+            schedule.event_day = days_by_id[schedule.event_day_id]
+        schedule.agenda_speakers = speakers_by_schedule.get(schedule.id, [])
+        for speaker in schedule.agenda_speakers:
+            speakers.setdefault(speaker.id, speaker)
+
+    return days, schedules, list(speakers.values())
+
+
+def render_document(event_id):
+    """Render the agenda document of an event from the schedule tables"""
+    days, schedules, speakers = load_agenda(event_id)
+
+    sessions = AgendaSessionSerializer(schedules, many=True).data
+    by_date = {}
+    by_day = {str(day.id): [] for day in days}
+    for index, schedule in enumerate(schedules):
+        by_date.setdefault(schedule.date.isoformat(), []).append(index)
+        if str(schedule.event_day_id) in by_day:
+            by_day[str(schedule.event_day_id)].append(index)
+
+    # Within a day sessions are listed by start time, then order
+    for indexes in by_day.values():
+        indexes.sort(key=lambda index: (schedules[index].start_time, schedules[index].order))
+
+    return {
+        'speakers': SpeakerSerializer(speakers, many=True).data,
+        'sessions': sessions,
+        'by_date': by_date,
+        'days': [
+            {**AgendaDaySerializer(day).data, 'schedules': by_day[str(day.id)]}
+            for day in days
+        ],
+    }
+
+
+def build_agenda(event_id):
+    """
+    Build and store the agenda document of an event. A build never replaces
+    a document built for a newer version.
+    """
+    agenda, _ = EventAgenda.objects.get_or_create(event_id=event_id)
+    version = agenda.requested_version
+    document = render_document(event_id)
+
+    updated = EventAgenda.objects.filter(event_id=event_id, version__lte=version).update(
+        document=document, version=version, built_at=timezone.now()
+    )
+    if updated:
+        agenda.document, agenda.version = document, version
+    else:
+        agenda.refresh_from_db()
+    return agenda
+
+
+# ============ INVALIDATION ============
+
+_executor = None
+_executor_lock = threading.Lock()
+_inline = threading.local()
+
+
+def _run_build(event_id):
+    close_old_connections()
+    try:
+        if Event.objects.filter(id=event_id).exists():
+            build_agenda(event_id)
+    except Exception:
+        logger.exception("Agenda rebuild failed for event %s", event_id)
+    finally:
+        close_old_connections()
+
+
+def _submit(event_id):
+    global _executor
+    if not settings.AGENDA_BUILD_ASYNC or getattr(_inline, 'active', False):
+        _run_build(event_id)
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='agenda')
+    _executor.submit(_run_build, event_id)
+
+
+def _flush(event_ids):
+    for event_id in event_ids:
+        bumped = EventAgenda.objects.filter(event_id=event_id).update(
+            requested_version=F('requested_version') + 1, queued_at=timezone.now()
+        )
+        if not bumped:
+            if not Event.objects.filter(id=event_id).exists():
+                continue
+            EventAgenda.objects.get_or_create(
+                event_id=event_id, defaults={'requested_version': 1, 'queued_at': timezone.now()}
+            )
+        _submit(event_id)
+
+
+def _requeue(agenda):
+    """
+    Queue the build of a missing or stale document again if none was queued
+    within AGENDA_BUILD_TIMEOUT. Claimed with a conditional update, so
+    concurrent readers queue it once.
+    """
+    now = timezone.now()
+    overdue = Q(queued_at__isnull=True) | Q(queued_at__lt=now - settings.AGENDA_BUILD_TIMEOUT)
+    if EventAgenda.objects.filter(overdue, pk=agenda.pk).update(queued_at=now):
+        logger.warning("Requeueing the overdue agenda build of event %s", agenda.event_id)
+        transaction.on_commit(partial(_submit, agenda.event_id))
+
+
+@contextmanager
+def inline_builds():
+    """
+    Rebuild the agendas requested inside the block in the calling thread
+    (for commands: on SQLite, background writes would hit a locked database)
+    """
+    previous = getattr(_inline, 'active', False)
+    _inline.active = True
+    try:
+        yield
+    finally:
+        _inline.active = previous
+
+
+def request_rebuild(*event_ids):
+    """
+    Mark the agendas of these events as changed. The version bump and the
+    rebuild happen once per event when the current transaction commits,
+    and not at all if it (or the savepoint it was requested in) rolls back.
+    """
+    event_ids = {event_id for event_id in event_ids if event_id}
+    if not event_ids:
+        return
+    connection = transaction.get_connection()
+    if connection.in_atomic_block and connection.run_on_commit:
+        # Add to the flush this transaction registered last, if it belongs
+        # to the same savepoint, so a batch of changes flushes once
+        savepoint_ids, callback, _ = connection.run_on_commit[-1]
+        if getattr(callback, 'func', None) is _flush and savepoint_ids == set(connection.savepoint_ids):
+            callback.args[0].update(event_ids)
+            return
+    transaction.on_commit(partial(_flush, event_ids))
+
+
+def bump_agenda(event_id):
+    """
+    Like request_rebuild for one event, but bump the version right away, in
+    the current transaction, and return it. The agenda row stays locked
+    until the transaction ends, so the build queued on commit (and any
+    later version) includes the transaction's changes.
+    """
+    EventAgenda.objects.get_or_create(event_id=event_id)
+    EventAgenda.objects.filter(event_id=event_id).update(
+        requested_version=F('requested_version') + 1, queued_at=timezone.now()
+    )
+    transaction.on_commit(partial(_submit, event_id))
+    return EventAgenda.objects.filter(event_id=event_id).values_list('requested_version', flat=True).get()
+
+
+# ============ READING ============
+
+class _Sessions(Sequence):
+    """
+    Sessions picked by index from a document, expanded (speakers inlined)
+    only when accessed, so paginating a long agenda renders one page.
+    """
+
+    def __init__(self, agenda, indexes):
+        self._agenda = agenda
+        self._indexes = indexes
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._agenda._session(index) for index in self._indexes[item]]
+        return self._agenda._session(self._indexes[item])
+
+
+EMPTY_DOCUMENT = {'speakers': [], 'sessions': [], 'by_date': {}, 'days': []}
+
+
+class Agenda:
+    """
+    Read-only view over a stored agenda document. Without one (`agenda`
+    None) it is empty and `pending`: the document is still being built.
+    """
+
+    def __init__(self, agenda=None):
+        self.pending = agenda is None
+        self.version = agenda.version if agenda is not None else None
+        self.document = agenda.document if agenda is not None else EMPTY_DOCUMENT
+        self._speakers = {speaker['id']: speaker for speaker in self.document['speakers']}
+
+    def _session(self, index):
+        session = dict(self.document['sessions'][index])
+        session['speakers'] = [self._speakers[speaker_id] for speaker_id in session['speakers']]
+        return session
+
+    def sessions(self):
+        return _Sessions(self, range(len(self.document['sessions'])))
+
+    def sessions_by_date(self):
+        return {
+            date: list(_Sessions(self, indexes))
+            for date, indexes in self.document['by_date'].items()
+        }
+
+    def day_sessions(self, day_id):
+        for day in self.document['days']:
+            if day['id'] == str(day_id):
+                return _Sessions(self, day['schedules'])
+        return []
+
+    def days(self):
+        return [
+            {**day, 'schedules': list(_Sessions(self, day['schedules']))}
+            for day in self.document['days']
+        ]
+
+    def speakers(self):
+        return self.document['speakers']
+
+
+def get_agenda(event_id):
+    """
+    The agenda of an event. Serves the stored document even while a rebuild
+    is pending. An event without a document yet gets a build queued (never
+    run on the read path) and a pending, empty agenda meanwhile. Builds of
+    missing or stale documents that are overdue are queued again.
+    """
+    agenda = EventAgenda.objects.filter(event_id=event_id).first()
+    if agenda is not None and agenda.document is not None:
+        if agenda.is_stale:
+            _requeue(agenda)
+        return Agenda(agenda)
+    if not Event.objects.filter(id=event_id).exists():
+        raise Http404("Event not found")
+    if agenda is None:
+        request_rebuild(event_id)
+    else:
+        _requeue(agenda)
+    return Agenda()
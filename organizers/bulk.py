@@ -0,0 +1,245 @@
+"""
+Set-wise validation and writes for bulk schedule imports and edits.
+
+A batch is validated with a fixed number of queries (event days, speakers
+and the sessions it could conflict with are loaded once) and written with one bulk_create for the
+schedules and one for the speaker links, instead of a full_clean() and
+INSERT per item. Bulk reorders/reschedules are likewise validated
+together and written with a single bulk_update.
+
+Validate a batch and write it in one transaction: validation locks the
+event row, as single schedule writes do, so concurrent writes to the
+event's schedule can't slip in between the checks and the write.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .agenda import bump_agenda, request_rebuild
+from .conflicts import batch_conflicts, move_conflicts
+from .models import Event, EventDay, Schedule, Speaker
+from .serializers import BulkScheduleItemSerializer, ScheduleChangeSerializer
+
+
+ATOMIC = 'atomic'
+BEST_EFFORT = 'best_effort'
+BULK_MODES = (ATOMIC, BEST_EFFORT)
+
+
+def _lock_event(event):
+    """Lock the event row until the transaction ends (see check_schedule_conflicts)"""
+    Event.objects.select_for_update().filter(id=event.id).values_list('id', flat=True).first()
+
+
+def validate_schedule_batch(event, items):
+    """
+    Validate a list of schedule payloads for an event. Call it in the
+    transaction that creates them.
+
+    Returns (valid, errors) where valid is a list of (index, validated_data)
+    and errors a list of {'index': ..., 'errors': ...} in input order.
+    """
+    _lock_event(event)
+    valid = []
+    errors = []
+
+    for index, item in enumerate(items):
+        serializer = BulkScheduleItemSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+
+    event_days = {day.id: day for day in EventDay.objects.filter(event=event)}
+    days_by_date = {day.date: day for day in event_days.values()}
+
+    requested_speakers = {
+        speaker_id
+        for _, data in valid
+        for speaker_id in data.get('speaker_ids', [])
+    }
+    known_speakers = set(
+        Speaker.objects.filter(
+            organizer_id=event.organizer_id, id__in=requested_speakers
+        ).values_list('id', flat=True)
+    ) if requested_speakers else set()
+
+    event_start = event.startDateTime.date() if event.startDateTime else None
+    event_end = event.endDateTime.date() if event.endDateTime else None
+
+    checked = []
+    for index, data in valid:
+        item_errors = {}
+
+        if event_start and event_end and not (event_start <= data['date'] <= event_end):
+            item_errors['date'] = [
+                f'Schedule date must be between event dates ({event_start} to {event_end})'
+            ]
+
+        event_day_id = data.get('event_day')
+        if event_day_id:
+            event_day = event_days.get(event_day_id)
+            if event_day is None:
+                item_errors['event_day'] = ['Event day does not belong to this event']
+            elif event_day.date != data['date']:
+                item_errors['event_day'] = [f'Event day is on {event_day.date}, not {data["date"]}']
+        else:
+            # Link to the event day for that date when the client didn't
+            event_day = days_by_date.get(data['date'])
+        data['event_day'] = event_day
+
+        unknown = [str(speaker_id) for speaker_id in data.get('speaker_ids', []) if speaker_id not in known_speakers]
+        if unknown:
+            item_errors['speaker_ids'] = [f'Unknown speakers: {", ".join(unknown)}']
+
+        if item_errors:
+            errors.append({'index': index, 'errors': item_errors})
+        else:
+            checked.append((index, data))
+
+    # Room and speaker overlaps, within the batch and against existing sessions
+    conflicts = batch_conflicts(event, checked) if checked else {}
+    if conflicts:
+        errors.extend(
+            {'index': index, 'errors': {'conflicts': conflicts[index]}}
+            for index, _ in checked if index in conflicts
+        )
+        checked = [(index, data) for index, data in checked if index not in conflicts]
+
+    errors.sort(key=lambda error: error['index'])
+    return checked, errors
+
+
+def create_schedules(event, valid):
+    """
+    Insert validated schedule payloads with one bulk_create for the
+    schedules and one for their speaker links. Returns the schedules in
+    input order.
+    """
+    SpeakerLink = Schedule.speakers.through
+    schedules = []
+    links = []
+
+    for _, data in valid:
+        data = dict(data)
+        speaker_ids = dict.fromkeys(data.pop('speaker_ids', []))
+        schedule = Schedule(event=event, **data)
+        schedules.append(schedule)
+        links.extend(
+            SpeakerLink(schedule_id=schedule.id, speaker_id=speaker_id)
+            for speaker_id in speaker_ids
+        )
+
+    with transaction.atomic():
+        Schedule.objects.bulk_create(schedules, batch_size=500)
+        SpeakerLink.objects.bulk_create(links, batch_size=1000)
+        # bulk_create sends no signals
+        request_rebuild(event.id)
+
+    return schedules
+
+
+def validate_schedule_changes(event, items):
+    """
+    Validate a list of {id, order, start_time, end_time, date, event_day}
+    changes to existing schedules of an event, as a whole: the resulting
+    agenda is checked, not each change against the current one. Call it in
+    the transaction that writes them.
+
+    Returns (schedules, errors) where schedules are the changed, unsaved
+    Schedule instances and errors a list of {'index': ..., 'errors': ...}.
+    """
+    _lock_event(event)
+    errors = []
+    changes = []
+    seen = set()
+    for index, item in enumerate(items):
+        serializer = ScheduleChangeSerializer(data=item)
+        if not serializer.is_valid():
+            errors.append({'index': index, 'errors': serializer.errors})
+        elif serializer.validated_data['id'] in seen:
+            errors.append({'index': index, 'errors': {'id': ['Schedule is changed more than once']}})
+        else:
+            seen.add(serializer.validated_data['id'])
+            changes.append((index, serializer.validated_data))
+
+    schedules = Schedule.objects.filter(event=event).in_bulk([data['id'] for _, data in changes])
+    event_days = {day.id: day for day in EventDay.objects.filter(event=event)}
+    days_by_date = {day.date: day for day in event_days.values()}
+
+    event_start = event.startDateTime.date() if event.startDateTime else None
+    event_end = event.endDateTime.date() if event.endDateTime else None
+
+    changed = {}
+    moves = {}
+    for index, data in changes:
+        schedule = schedules.get(data['id'])
+        if schedule is None:
+            errors.append({'index': index, 'errors': {'id': ['Schedule not found for this event']}})
+            continue
+
+        item_errors = {}
+        date = data.get('date', schedule.date)
+        start_time = data.get('start_time', schedule.start_time)
+        end_time = data.get('end_time', schedule.end_time)
+
+        if end_time <= start_time:
+            item_errors['end_time'] = ['End time must be after start time']
+        if event_start and event_end and not (event_start <= date <= event_end):
+            item_errors['date'] = [
+                f'Schedule date must be between event dates ({event_start} to {event_end})'
+            ]
+
+        if 'event_day' in data:
+            event_day_id = data['event_day']
+            event_day = event_days.get(event_day_id) if event_day_id else None
+            if event_day_id and event_day is None:
+                item_errors['event_day'] = ['Event day does not belong to this event']
+            elif event_day is not None and event_day.date != date:
+                item_errors['event_day'] = [f'Event day is on {event_day.date}, not {date}']
+        elif date != schedule.date:
+            # Follow the session to the event day of its new date
+            event_day = days_by_date.get(date)
+            event_day_id = event_day.id if event_day else None
+        else:
+            event_day_id = schedule.event_day_id
+
+        if item_errors:
+            errors.append({'index': index, 'errors': item_errors})
+            continue
+
+        if (date, start_time, end_time) != (schedule.date, schedule.start_time, schedule.end_time):
+            moves[schedule.id] = (date, start_time, end_time)
+        schedule.date, schedule.start_time, schedule.end_time = date, start_time, end_time
+        schedule.event_day_id = event_day_id
+        schedule.order = data.get('order', schedule.order)
+        changed[schedule.id] = (index, schedule)
+
+    # Room and speaker overlaps of the sessions that moved in time
+    conflicts = move_conflicts(event, moves) if moves and not errors else {}
+    errors.extend(
+        {'index': index, 'errors': {'conflicts': conflicts[schedule_id]}}
+        for schedule_id, (index, _) in changed.items() if schedule_id in conflicts
+    )
+
+    errors.sort(key=lambda error: error['index'])
+    return [schedule for _, schedule in changed.values()], errors
+
+
+def update_schedules(event, schedules):
+    """
+    Write validated schedule changes with one bulk_update and return the
+    agenda version that includes them (agenda documents of that version or
+    later are built after the changes commit).
+    """
+    now = timezone.now()
+    for schedule in schedules:
+        schedule.updated_at = now
+
+    with transaction.atomic():
+        Schedule.objects.bulk_update(
+            schedules,
+            ['order', 'start_time', 'end_time', 'date', 'event_day', 'updated_at'],
+            batch_size=500,
+        )
+        # bulk_update sends no signals
+        return bump_agenda(event.id)
@@ -0,0 +1,220 @@
+"""
+Schedule conflict detection.
+
+Two kinds of conflicts are reported:
+  * room: two sessions of the same event overlap in the same (non-blank) room
+  * speaker: a speaker is booked on overlapping sessions, across all events
+
+Single writes are checked with indexed range queries (start < end and
+end > start on one date), so a create or update costs O(log n). Audits
+group intervals per date (and room or speaker), sort them and sweep once,
+which is O(n log n + k) for k reported conflicts.
+"""
+import heapq
+from collections import defaultdict
+
+from django.db.models import Q
+from django.db.models.functions import Lower, Trim
+
+from .models import Schedule
+
+
+SpeakerLink = Schedule.speakers.through
+
+
+def overlapping_pairs(intervals):
+    """
+    Yield (a, b) key pairs of overlapping [start, end) intervals.
+    `intervals` is an iterable of (start, end, key).
+    """
+    active = []  # heap of (end, tiebreak, key) for intervals still open
+    for counter, (start, end, key) in enumerate(sorted(intervals, key=lambda item: item[:2])):
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        for _, _, other in active:
+            yield other, key
+        heapq.heappush(active, (end, counter, key))
+
+
+def _conflict(kind, value, date, first, second):
+    return {
+        'type': kind,
+        kind: value,
+        'date': date.isoformat(),
+        'schedule': str(first),
+        'conflicts_with': str(second),
+    }
+
+
+def audit(sessions, links, only=None):
+    """
+    Find every conflict among `sessions`.
+
+    sessions: {key: (date, start_time, end_time, room, event_id)}
+    links: iterable of (speaker_id, session key)
+    only: if given, only report conflicts involving one of these keys
+    """
+    # (kind, label, date, scope) -> [(start, end, key)]
+    groups = defaultdict(list)
+    for key, (date, start, end, room, event_id) in sessions.items():
+        if room:
+            groups[('room', room.strip().lower(), date, event_id)].append((start, end, key))
+    for speaker_id, key in links:
+        date, start, end, _, _ = sessions[key]
+        groups[('speaker', str(speaker_id), date, None)].append((start, end, key))
+
+    conflicts = []
+    for (kind, label, date, _), intervals in groups.items():
+        for first, second in overlapping_pairs(intervals):
+            if only is not None and first not in only and second not in only:
+                continue
+            conflicts.append(_conflict(kind, label, date, first, second))
+    return conflicts
+
+
+def find_conflicts(event_id, date, start_time, end_time, room='', speaker_ids=(), exclude_id=None):
+    """
+    Conflicts for one session about to be written, using indexed range
+    queries. Returns a list of conflict dicts (empty when it fits).
+    """
+    overlapping = Schedule.objects.filter(
+        date=date, start_time__lt=end_time, end_time__gt=start_time
+    )
+    if exclude_id is not None:
+        overlapping = overlapping.exclude(id=exclude_id)
+
+    conflicts = []
+    if room and room.strip():
+        # Rooms are compared trimmed and case-insensitively, as in audit()
+        same_room = overlapping.filter(event_id=event_id).alias(
+            room_key=Lower(Trim('room'))
+        ).filter(room_key=room.strip().lower())
+        for schedule_id in same_room.values_list('id', flat=True):
+            conflicts.append(_conflict('room', room.strip(), date, exclude_id or 'new', schedule_id))
+
+    if speaker_ids:
+        booked = SpeakerLink.objects.filter(
+            speaker_id__in=speaker_ids,
+            schedule__in=overlapping,
+        ).values_list('speaker_id', 'schedule_id')
+        for speaker_id, schedule_id in booked:
+            conflicts.append(_conflict('speaker', str(speaker_id), date, exclude_id or 'new', schedule_id))
+
+    return conflicts
+
+
+def _load_sessions(schedules):
+    return {
+        schedule_id: (date, start, end, room, event_id)
+        for schedule_id, date, start, end, room, event_id in schedules.values_list(
+            'id', 'date', 'start_time', 'end_time', 'room', 'event_id'
+        )
+    }
+
+
+def event_conflicts(event):
+    """
+    Every room and speaker conflict involving the sessions of an event,
+    including speaker double-bookings against the organizer's other events.
+    """
+    event_speakers = SpeakerLink.objects.filter(schedule__event=event).values('speaker_id')
+    links = list(
+        SpeakerLink.objects
+        .filter(speaker_id__in=event_speakers)
+        .values_list('speaker_id', 'schedule_id')
+    )
+    other_sessions = {schedule_id for _, schedule_id in links}
+
+    sessions = _load_sessions(Schedule.objects.filter(event=event))
+    missing = other_sessions - sessions.keys()
+    if missing:
+        sessions.update(_load_sessions(Schedule.objects.filter(id__in=missing)))
+
+    own = {key for key, session in sessions.items() if session[4] == event.id}
+    return audit(sessions, links, only=own)
+
+
+def batch_conflicts(event, items):
+    """
+    Conflicts introduced by a batch of validated schedule payloads, against
+    each other and against existing sessions on the same dates.
+
+    items: list of (index, validated_data). Returns {index: [conflicts]}.
+    """
+    dates = {data['date'] for _, data in items}
+    speaker_ids = {speaker_id for _, data in items for speaker_id in data.get('speaker_ids', [])}
+
+    sessions = _load_sessions(Schedule.objects.filter(event=event, date__in=dates))
+    links = []
+    if speaker_ids:
+        existing_links = list(
+            SpeakerLink.objects
+            .filter(speaker_id__in=speaker_ids, schedule__date__in=dates)
+            .values_list('speaker_id', 'schedule_id')
+        )
+        missing = {schedule_id for _, schedule_id in existing_links} - sessions.keys()
+        if missing:
+            sessions.update(_load_sessions(Schedule.objects.filter(id__in=missing)))
+        links.extend(existing_links)
+
+    new_keys = {}
+    for index, data in items:
+        key = f'new:{index}'
+        new_keys[key] = index
+        sessions[key] = (data['date'], data['start_time'], data['end_time'], data.get('room', ''), event.id)
+        links.extend((speaker_id, key) for speaker_id in dict.fromkeys(data.get('speaker_ids', [])))
+
+    by_index = defaultdict(list)
+    for conflict in audit(sessions, links, only=new_keys.keys()):
+        for side, other in (('schedule', 'conflicts_with'), ('conflicts_with', 'schedule')):
+            if conflict[side] in new_keys:
+                by_index[new_keys[conflict[side]]].append({
+                    **conflict,
+                    'schedule': f'item {new_keys[conflict[side]]}',
+                    'conflicts_with': (
+                        f'item {new_keys[conflict[other]]}' if conflict[other] in new_keys
+                        else conflict[other]
+                    ),
+                })
+    return by_index
+
+
+def move_conflicts(event, moves):
+    """
+    Conflicts caused by moving existing sessions of an event, against each
+    other and against the sessions staying where they are.
+
+    moves: {schedule_id: (date, start_time, end_time)}. The moved sessions
+    keep their room and speakers. Returns {schedule_id: [conflicts]}.
+    """
+    moved_links = list(
+        SpeakerLink.objects.filter(schedule_id__in=moves).values_list('speaker_id', 'schedule_id')
+    )
+    speaker_ids = {speaker_id for speaker_id, _ in moved_links}
+    dates = {date for date, _, _ in moves.values()}
+
+    sessions = _load_sessions(Schedule.objects.filter(Q(event=event, date__in=dates) | Q(id__in=moves)))
+    links = []
+    if speaker_ids:
+        links = list(
+            SpeakerLink.objects
+            .filter(speaker_id__in=speaker_ids, schedule__date__in=dates)
+            .exclude(schedule_id__in=moves)
+            .values_list('speaker_id', 'schedule_id')
+        )
+        missing = {schedule_id for _, schedule_id in links} - sessions.keys()
+        if missing:
+            sessions.update(_load_sessions(Schedule.objects.filter(id__in=missing)))
+    links.extend(moved_links)
+
+    for schedule_id, (date, start, end) in moves.items():
+        _, _, _, room, event_id = sessions[schedule_id]
+        sessions[schedule_id] = (date, start, end, room, event_id)
+
+    moved = {str(schedule_id): schedule_id for schedule_id in moves}
+    by_schedule = defaultdict(list)
+    for conflict in audit(sessions, links, only=moves.keys()):
+        for side in ('schedule', 'conflicts_with'):
+            if conflict[side] in moved:
+                by_schedule[moved[conflict[side]]].append(conflict)
+    return by_schedule
@@ -0,0 +1,98 @@
+"""
+Generation and reconciliation of an event's EventDay rows.
+
+An event has one EventDay per calendar date between startDateTime and
+endDateTime. The days are generated with one bulk_create when the event is
+created, and reconciled in bulk whenever its dates change: missing dates
+are added, days outside the range are removed, the rest are renumbered in
+date order and sessions are re-linked to the day of their date.
+"""
+from datetime import time, timedelta
+
+from django.db import transaction
+from django.db.models import Case, When
+
+from .agenda import request_rebuild
+from .models import EventDay, Schedule
+
+
+def event_dates(event):
+    """Every date the event covers, in order"""
+    start, end = event.date_range() or (None, None)
+    if start is None:
+        return []
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def _day_hours(event, date, dates):
+    """Opening hours of a generated day"""
+    start, end = event.startDateTime.time(), event.endDateTime.time()
+    if len(dates) == 1:
+        return start, end
+    if start < end:
+        # e.g. a conference running 09:00-17:00 every day
+        return start, end
+    first = start if date == dates[0] else time.min
+    last = end if date == dates[-1] else time(23, 59)
+    return first, last
+
+
+def reconcile_event_days(event):
+    """
+    Bring the event's days in line with its dates. Days that stay keep their
+    id, hours, title and sessions (auto-generated "Day N" titles follow
+    their new number).
+    """
+    dates = event_dates(event)
+    with transaction.atomic():
+        existing = sorted(EventDay.objects.filter(event=event), key=lambda day: (day.date, day.dayNumber))
+
+        kept = {}
+        stale = []
+        for day in existing:
+            if day.date in dates and day.date not in kept:
+                kept[day.date] = day
+            else:
+                stale.append(day)
+
+        if stale:
+            # Detach sessions first, deleting a day would cascade to them
+            Schedule.objects.filter(event_day__in=stale).update(event_day=None)
+            EventDay.objects.filter(id__in=[day.id for day in stale]).delete()
+
+        # Park the kept days on negative numbers so the new numbering can't
+        # collide with (event, dayNumber) on the way
+        numbers = {date: number for number, date in enumerate(dates, start=1)}
+        renumbered = [day for date, day in kept.items() if day.dayNumber != numbers[date]]
+        for day in renumbered:
+            if day.title == f'Day {day.dayNumber}':
+                day.title = f'Day {numbers[day.date]}'
+            day.dayNumber = -numbers[day.date]
+        if renumbered:
+            EventDay.objects.bulk_update(renumbered, ['dayNumber', 'title'])
+
+        created = EventDay.objects.bulk_create([
+            EventDay(
+                event=event, dayNumber=numbers[date], date=date,
+                startTime=_day_hours(event, date, dates)[0],
+                endTime=_day_hours(event, date, dates)[1],
+                title=f'Day {numbers[date]}',
+            )
+            for date in dates if date not in kept
+        ])
+
+        for day in renumbered:
+            day.dayNumber = -day.dayNumber
+        if renumbered:
+            EventDay.objects.bulk_update(renumbered, ['dayNumber'])
+
+        if stale or created:
+            days = {**kept, **{day.date: day for day in created}}
+            Schedule.objects.filter(event=event).update(event_day=Case(
+                *(When(date=date, then=day.id) for date, day in days.items()),
+                default=None,
+            ))
+            # bulk_create/bulk_update/update send no signals
+            request_rebuild(event.id)
+
+    return sorted([*kept.values(), *created], key=lambda day: day.date)
@@ -0,0 +1,91 @@
+import sys
+
+from django.db.models import Q
+from django.db.models.functions import Upper
+from django_filters import rest_framework as django_filters
+from attendee.models import Ticket
+from .models import Speaker
+
+
+class AttendeeFilter(django_filters.FilterSet):
+    """
+    Prefix search and exact filters for an event's attendee list, backed by
+    the partial (is_paid) indexes on Ticket. The name prefix is matched as a
+    range on UPPER(attendee_name), like SpeakerFilter's search, to seek the
+    (event, UPPER(attendee_name)) index; the email prefix as a range on
+    UPPER(email), to seek the users' UPPER(email) index.
+    """
+    name = django_filters.CharFilter(method='filter_name')
+    email = django_filters.CharFilter(method='filter_email')
+    ticket_tier = django_filters.NumberFilter(field_name='ticket_tier_id')
+    status = django_filters.ChoiceFilter(choices=Ticket.STATUS_CHOICES)
+
+    class Meta:
+        model = Ticket
+        fields = ['name', 'email', 'ticket_tier', 'status']
+
+    def filter_name(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return queryset.alias(name_key=Upper('attendee_name')).filter(_prefix_q('attendee_name', 'name_key', value))
+
+    def filter_email(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return queryset.alias(email_key=Upper('user__email')).filter(_prefix_q('user__email', 'email_key', value))
+
+
+def _prefix_bounds(prefix):
+    """
+    [lower, upper) bounds of the upper-cased strings starting with prefix;
+    upper is None if nothing sorts after all of them
+    """
+    lower = prefix.upper()
+    stem = lower.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return lower, None
+    following = ord(stem[-1]) + 1
+    if 0xD800 <= following <= 0xDFFF:
+        # Surrogates can't be stored; the next storable character follows them
+        following = 0xE000
+    return lower, stem[:-1] + chr(following)
+
+
+def _prefix_q(field, key, prefix):
+    """
+    Q for rows whose `field` starts with `prefix`, case-insensitively, as a
+    range on `key` (an Upper(field) alias) that can seek an index. SQLite's
+    UPPER only folds ASCII, so other prefixes use istartswith (no index).
+    """
+    if not prefix.isascii():
+        return Q(**{f'{field}__istartswith': prefix})
+    lower, upper = _prefix_bounds(prefix)
+    q = Q(**{f'{key}__gte': lower, f'{key}__startswith': lower})
+    if upper is not None:
+        q &= Q(**{f'{key}__lt': upper})
+    return q
+
+
+class SpeakerFilter(django_filters.FilterSet):
+    """
+    Case-insensitive prefix search on speaker name or title.
+
+    The prefix is matched as a range on UPPER(name) / UPPER(title) so it can
+    seek the (organizer, UPPER(...)) indexes; LIKE / ILIKE on the column
+    can't use a plain index on every backend.
+    """
+    search = django_filters.CharFilter(method='filter_search')
+
+    class Meta:
+        model = Speaker
+        fields = ['search']
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return queryset.alias(
+            name_key=Upper('name'), title_key=Upper('title')
+        ).filter(_prefix_q('name', 'name_key', value) | _prefix_q('title', 'title_key', value))
@@ -0,0 +1,90 @@
+"""
+Precomputed Cloudinary delivery URLs for event and speaker images.
+
+Each image has a set of variants (thumbnail, card, hero), transformed by
+Cloudinary on first request and delivered in the best format the client
+accepts (f_auto, q_auto), at 1x and 2x. The URLs are built locally, with
+no API call, and stored next to the image by ImageVariantsField whenever
+the row is saved. Serializers then only read a dict. Run
+refresh_image_variants after changing VARIANTS.
+"""
+import cloudinary
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import models
+
+# Added to every variant: automatic format and quality, served over HTTPS
+DELIVERY = {'fetch_format': 'auto', 'quality': 'auto', 'secure': True}
+
+VARIANTS = {
+    'event': {
+        'thumbnail': {'width': 320, 'height': 180, 'crop': 'fill', 'gravity': 'auto'},
+        'card': {'width': 640, 'height': 360, 'crop': 'fill', 'gravity': 'auto'},
+        'hero': {'width': 1600, 'height': 900, 'crop': 'fill', 'gravity': 'auto'},
+    },
+    'speaker': {
+        'thumbnail': {'width': 96, 'height': 96, 'crop': 'thumb', 'gravity': 'face'},
+        'card': {'width': 320, 'height': 320, 'crop': 'thumb', 'gravity': 'face'},
+        'hero': {'width': 800, 'height': 800, 'crop': 'fill', 'gravity': 'face'},
+    },
+}
+
+
+def image_variants(resource, kind):
+    """
+    {'original': {'url'}, variant: {'url', 'url_2x', 'width', 'height'}, ...}
+    for a CloudinaryResource; {} without an (uploaded) image or without a
+    configured Cloudinary account.
+    """
+    if not resource or isinstance(resource, UploadedFile) or not cloudinary.config().cloud_name:
+        return {}
+
+    variants = {'original': {'url': resource.build_url(secure=True)}}
+    for name, transformation in VARIANTS[kind].items():
+        variants[name] = {
+            'url': resource.build_url(**transformation, **DELIVERY),
+            'url_2x': resource.build_url(**transformation, dpr='2.0', **DELIVERY),
+            'width': transformation['width'],
+            'height': transformation['height'],
+        }
+    return variants
+
+
+class ImageVariantsField(models.JSONField):
+    """
+    The variants of another CloudinaryField of the model, recomputed on
+    every save. Declare it after the image field: fields are prepared in
+    order, so an uploaded file has become a resource by then.
+    """
+
+    def __init__(self, *args, image_field, kind, **kwargs):
+        self.image_field = image_field
+        self.kind = kind
+        kwargs.setdefault('default', dict)
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['image_field'] = self.image_field
+        kwargs['kind'] = self.kind
+        return name, path, args, kwargs
+
+    def variants_for(self, instance):
+        field = instance._meta.get_field(self.image_field)
+        value = getattr(instance, field.attname)
+        if isinstance(value, str):
+            value = field.to_python(value) if value else None
+        return image_variants(value, self.kind)
+
+    def pre_save(self, model_instance, add):
+        variants = self.variants_for(model_instance)
+        setattr(model_instance, self.attname, variants)
+        return variants
+
+
+def staging_storage():
+    """Local storage new uploads wait in (see organizers.uploads)"""
+    return FileSystemStorage(location=settings.IMAGE_STAGING_ROOT)
@@ -0,0 +1,160 @@
+"""
+Shared helpers for the benchmark_* commands. Everything they create is meant
+to be rolled back by the calling command.
+"""
+import time
+import tracemalloc
+import uuid
+from datetime import time as clock_time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from attendee.models import Order, SavedEvent, Ticket
+from organizers.models import Coupon, Event, Schedule, Speaker, TicketTier
+
+User = get_user_model()
+
+
+def create_organizer():
+    suffix = uuid.uuid4().hex
+    return User.objects.create(
+        email=f'bench-{suffix}@example.com', username=f'bench-{suffix}',
+        first_name='Bench', last_name='Organizer', role='organizer', password='!',
+    )
+
+
+def create_event(organizer, title, days=1, available_tickets=1000):
+    start = (timezone.now() + timedelta(days=30)).replace(hour=9, minute=0, second=0, microsecond=0)
+    return Event.objects.create(
+        image='benchmark', category='conference', title=title,
+        short_description='benchmark', description='benchmark',
+        startDateTime=start, endDateTime=start + timedelta(days=days - 1, hours=9),
+        location='Benchmark', available_tickets=available_tickets, organizer=organizer,
+        status='published',
+    )
+
+
+def measure(func, trace_memory=False):
+    """
+    Run func() and return (result, seconds, query count, peak MiB or None).
+    """
+    if trace_memory:
+        tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    return result, elapsed, len(queries), peak
+
+
+def seed_catalog(events=2000, attendees=300, tickets_per_attendee=4, saves_per_attendee=5, agendas=40, sessions=20):
+    """
+    A catalog-sized dataset: organizers with published, draft and past
+    events, ticket tiers, coupons, attendees with paid orders, tickets and
+    saved events, and multi-day events with agendas. Returns a dict of the
+    rows endpoints are looked at with.
+    """
+    now = timezone.now().replace(minute=0, second=0, microsecond=0)
+    organizers = [create_organizer() for _ in range(5)]
+    categories = [choice for choice, _ in Event.CATEGORY_CHOICES]
+    event_rows = Event.objects.bulk_create([
+        Event(
+            image='benchmark', category=categories[i % len(categories)], title=f'Event {i:05d}',
+            short_description='benchmark', description='benchmark', location=f'City {i % 50}',
+            startDateTime=now + timedelta(days=i % 400 - 60, hours=i % 12),
+            endDateTime=now + timedelta(days=i % 400 - 60, hours=i % 12 + 3),
+            available_tickets=500, organizer=organizers[i % len(organizers)],
+            # Mostly published; some drafts and cancellations
+            status='published' if i % 10 < 8 else ('draft' if i % 10 == 8 else 'cancelled'),
+        )
+        for i in range(events)
+    ], batch_size=1000)
+    # created_at is auto_now_add; spread it so "new" is a small slice
+    for i, event in enumerate(event_rows):
+        event.created_at = now - timedelta(days=i % 90)
+    Event.objects.bulk_update(event_rows, ['created_at'], batch_size=1000)
+
+    tiers = TicketTier.objects.bulk_create([
+        TicketTier(
+            name=name, short_description=name, price=Decimal(price) + i % 20, event=event,
+            total_tickets=250, available_tickets=200, salesStart=now - timedelta(days=30),
+            saleEnd=event.startDateTime,
+        )
+        for i, event in enumerate(event_rows)
+        for name, price in (('Regular', '25.00'), ('VIP', '100.00'))
+    ], batch_size=1000)
+    Coupon.objects.bulk_create([
+        Coupon(event=event, code=f'SAVE{i % 100:02d}', discount_percentage=10,
+               valid_from=now - timedelta(days=10), valid_to=now + timedelta(days=60))
+        for i, event in enumerate(event_rows[::4])
+    ], batch_size=1000)
+
+    users = User.objects.bulk_create([
+        User(
+            email=f'bench-attendee-{i}-{uuid.uuid4().hex[:8]}@example.com',
+            username=f'bench-attendee-{i}-{uuid.uuid4().hex[:8]}',
+            first_name='Bench', last_name=str(i), password='!',
+        )
+        for i in range(attendees)
+    ], batch_size=1000)
+    published = [event for event in event_rows if event.status == 'published']
+    picks = [
+        # Spread over the catalog, so attendees hold both past and upcoming events
+        (user, published[(u * 37 + k * 97) % len(published)])
+        for u, user in enumerate(users)
+        for k in range(tickets_per_attendee)
+    ]
+    orders = Order.objects.bulk_create([
+        Order(order_id=uuid.uuid4(), user=user, event=event, total_amount=Decimal('25.00'),
+              status='paid' if k % 5 else 'pending')
+        for k, (user, event) in enumerate(picks)
+    ], batch_size=1000)
+    tiers_by_event = {tier.event_id: tier for tier in tiers}
+    Ticket.objects.bulk_create([
+        Ticket(
+            order=order, event=order.event, user=order.user, ticket_tier=tiers_by_event[order.event_id],
+            qr_code=uuid.uuid4(), attendee_name=f'Attendee {k}', is_paid=order.status == 'paid',
+        )
+        for k, order in enumerate(orders)
+    ], batch_size=1000)
+    SavedEvent.objects.bulk_create([
+        SavedEvent(user=user, event=published[(u * 53 + k * 7 + 1) % len(published)])
+        for u, user in enumerate(users)
+        for k in range(saves_per_attendee)
+    ], batch_size=1000, ignore_conflicts=True)
+
+    # Multi-day events with agendas (their days are created with them)
+    agenda_events = [
+        create_event(organizers[0], f'Agenda event {i}', days=2) for i in range(agendas)
+    ]
+    speakers = Speaker.objects.bulk_create([
+        Speaker(name=f'Speaker {i:03d}', title='Engineer', organizer=organizers[0]) for i in range(50)
+    ])
+    schedules = Schedule.objects.bulk_create([
+        Schedule(
+            event=event, event_day=day, date=day.date, title=f'Session {i}', room=f'Room {i % 5}',
+            start_time=clock_time(8 + i % 10), end_time=clock_time(9 + i % 10), order=i,
+        )
+        for event in agenda_events
+        for day in event.event_days.all()
+        for i in range(sessions // 2)
+    ], batch_size=1000)
+    Schedule.speakers.through.objects.bulk_create([
+        Schedule.speakers.through(schedule_id=schedule.id, speaker_id=speakers[i % len(speakers)].id)
+        for i, schedule in enumerate(schedules)
+    ], batch_size=1000)
+
+    return {
+        'organizer': organizers[0],
+        'attendee': users[0],
+        'event': published[len(published) // 2],
+        'agenda_event': agenda_events[0],
+    }
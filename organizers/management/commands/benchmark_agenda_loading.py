@@ -0,0 +1,106 @@
+import statistics
+from datetime import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+
+from organizers.agenda import build_agenda, get_agenda, render_document
+from organizers.models import Event, EventDay, Schedule, Speaker
+from organizers.serializers import EventDayWithScheduleSerializer, SpeakerSerializer
+from ._benchmark import create_event, create_organizer, measure
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare loading an event's days, sessions and speakers through the "
+        "nested prefetches EventDetails used to run with the single-pass agenda "
+        "loader and the stored agenda document, inside a rolled-back transaction"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=200)
+        parser.add_argument('--days', type=int, default=3)
+        parser.add_argument('--speakers', type=int, default=60)
+        parser.add_argument('--speakers-per-session', type=int, default=2)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            event = self.seed(
+                options['sessions'], options['days'],
+                options['speakers'], options['speakers_per_session'],
+            )
+            # Build the stored document up front so the last run only reads it
+            build_agenda(event.id)
+
+            repeat = options['repeat']
+            self.run("nested prefetch", lambda: self.nested_prefetch(event.id), repeat)
+            self.run("single-pass loader", lambda: render_document(event.id), repeat)
+            self.run("stored document", lambda: self.stored_document(event.id), repeat)
+            transaction.set_rollback(True)
+
+    def seed(self, session_count, day_count, speaker_count, per_session):
+        organizer = create_organizer()
+        event = create_event(organizer, 'Agenda loading benchmark', days=day_count)
+        # Creating the event generated its days
+        days = list(event.event_days.order_by('dayNumber'))
+        speakers = Speaker.objects.bulk_create([
+            Speaker(name=f'Speaker {i:04d}', title='Engineer', organizer=organizer)
+            for i in range(speaker_count)
+        ])
+        schedules = Schedule.objects.bulk_create([
+            Schedule(
+                event=event, event_day=days[i % day_count], date=days[i % day_count].date,
+                title=f'Session {i}', room=f'Room {i % 10}',
+                start_time=time(8 + (i // day_count) % 10), end_time=time(9 + (i // day_count) % 10),
+                order=i,
+            )
+            for i in range(session_count)
+        ])
+        Through = Schedule.speakers.through
+        Through.objects.bulk_create([
+            Through(schedule_id=schedule.id, speaker_id=speakers[(i + offset) % speaker_count].id)
+            for i, schedule in enumerate(schedules)
+            for offset in range(per_session)
+        ])
+        return event
+
+    def nested_prefetch(self, event_id):
+        """What EventDetails ran before the agenda document existed"""
+        event = Event.objects.prefetch_related(
+            Prefetch(
+                'schedules',
+                queryset=Schedule.objects.select_related('event_day')
+                .prefetch_related('speakers').order_by('date', 'start_time', 'order')
+            ),
+            Prefetch(
+                'event_days',
+                queryset=EventDay.objects.prefetch_related(
+                    Prefetch('schedules', queryset=Schedule.objects.prefetch_related('speakers'))
+                ).order_by('date', 'startTime')
+            ),
+        ).get(id=event_id)
+
+        unique_speakers = {}
+        for schedule in event.schedules.all():
+            for speaker in schedule.speakers.all():
+                unique_speakers.setdefault(speaker.id, speaker)
+        return {
+            'event_days': EventDayWithScheduleSerializer(event.event_days.all(), many=True).data,
+            'speakers': SpeakerSerializer(unique_speakers.values(), many=True).data,
+        }
+
+    def stored_document(self, event_id):
+        agenda = get_agenda(event_id)
+        return {'event_days': agenda.days(), 'speakers': agenda.speakers()}
+
+    def run(self, label, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            _, elapsed, queries, _ = measure(func)
+            timings.append(elapsed * 1000)
+        self.stdout.write(
+            f"{label:<20} {queries:4d} queries  "
+            f"median {statistics.median(timings):8.1f} ms  best {min(timings):8.1f} ms"
+        )
@@ -0,0 +1,97 @@
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from attendee.models import Order, Ticket
+from organizers.exports import EXPORT_FORMATS, DEFAULT_ATTENDEE_EXPORT_COLUMNS
+from organizers.models import TicketTier
+from ._benchmark import create_event, create_organizer, measure
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large event inside a transaction, time the streaming attendee "
+        "export against materializing the list, then roll everything back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=40000)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            event = self.seed(options['tickets'])
+            self.report(event, options['chunk_size'])
+            transaction.set_rollback(True)
+
+    def seed(self, ticket_count):
+        now = timezone.now()
+        event = create_event(
+            create_organizer(), 'Export benchmark', days=2, available_tickets=ticket_count
+        )
+        tiers = TicketTier.objects.bulk_create([
+            TicketTier(
+                name=name, short_description=name, price=price, event=event,
+                total_tickets=ticket_count, available_tickets=0,
+                salesStart=now, saleEnd=now + timedelta(days=29),
+            )
+            for name, price in (('Regular', Decimal('25.00')), ('VIP', Decimal('100.00')))
+        ])
+
+        # Each attendee buys a handful of tickets in one paid order
+        per_user = 4
+        users = User.objects.bulk_create([
+            User(
+                email=f'bench-attendee-{i}-{uuid.uuid4().hex[:8]}@example.com',
+                username=f'bench-attendee-{i}-{uuid.uuid4().hex[:8]}',
+                first_name='Bench', last_name=str(i), password='!',
+            )
+            for i in range((ticket_count + per_user - 1) // per_user)
+        ], batch_size=1000)
+        orders = Order.objects.bulk_create([
+            Order(order_id=uuid.uuid4(), user=user, event=event,
+                  total_amount=Decimal('100.00'), status='paid')
+            for user in users
+        ], batch_size=1000)
+        Ticket.objects.bulk_create([
+            Ticket(
+                order=orders[i // per_user], event=event, user=users[i // per_user],
+                ticket_tier=tiers[i % 2], qr_code=uuid.uuid4(),
+                attendee_name=f'Attendee {i}', is_paid=True,
+            )
+            for i in range(ticket_count)
+        ], batch_size=1000)
+        return event
+
+    def queryset(self, event):
+        return (
+            Ticket.objects
+            .filter(event=event, is_paid=True)
+            .select_related("user", "ticket_tier", "order")
+            .order_by("-created_at")
+        )
+
+    def measure(self, label, func):
+        size, elapsed, _, peak = measure(func, trace_memory=True)
+        self.stdout.write(
+            f"{label:<28} {elapsed:8.2f}s  peak {peak:8.1f} MiB  {size / 1024 / 1024:8.1f} MiB out"
+        )
+
+    def report(self, event, chunk_size):
+        for export_format, (stream, _) in EXPORT_FORMATS.items():
+            def run(stream=stream):
+                tickets = self.queryset(event).iterator(chunk_size=chunk_size)
+                return sum(len(chunk) for chunk in stream(tickets, DEFAULT_ATTENDEE_EXPORT_COLUMNS))
+            self.measure(f"stream {export_format}", run)
+
+        def materialized():
+            tickets = list(self.queryset(event))
+            return sum(len(chunk) for chunk in EXPORT_FORMATS['csv'][0](tickets, DEFAULT_ATTENDEE_EXPORT_COLUMNS))
+        self.measure("materialized csv", materialized)
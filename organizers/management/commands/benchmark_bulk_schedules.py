@@ -0,0 +1,77 @@
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from organizers.bulk import create_schedules, validate_schedule_batch
+from organizers.models import Speaker
+from organizers.serializers import ScheduleSerializer
+from ._benchmark import create_event, create_organizer, measure
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare importing an agenda item by item (serializer + full_clean + "
+        "INSERT per row) with the bulk path, inside a rolled-back transaction"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=500)
+        parser.add_argument('--days', type=int, default=3)
+        parser.add_argument('--speakers', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            event, payloads = self.seed(options['items'], options['days'], options['speakers'])
+            self.run("per-item serializer", lambda: self.per_item(event, payloads))
+            self.run("bulk import", lambda: self.bulk(event, payloads))
+            transaction.set_rollback(True)
+
+    def seed(self, item_count, day_count, speaker_count):
+        organizer = create_organizer()
+        event = create_event(organizer, 'Agenda benchmark', days=day_count)
+        # Creating the event generated its days
+        days = list(event.event_days.order_by('dayNumber'))
+        speakers = Speaker.objects.bulk_create([
+            Speaker(name=f'Speaker {i}', title='Engineer', organizer=organizer)
+            for i in range(speaker_count)
+        ])
+
+        # Spread items over the days in ten parallel tracks of 30 minute slots
+        payloads = []
+        for i in range(item_count):
+            day = days[i % day_count]
+            slot = (i // day_count) // 10
+            start_minutes = 8 * 60 + (slot % 20) * 30
+            payloads.append({
+                'title': f'Session {i}',
+                'session_type': 'talk',
+                'date': day.date.isoformat(),
+                'start_time': f'{start_minutes // 60:02d}:{start_minutes % 60:02d}',
+                'end_time': f'{(start_minutes + 25) // 60:02d}:{(start_minutes + 25) % 60:02d}',
+                'event_day': str(day.id),
+                'order': i,
+                'speaker_ids': [str(speakers[i % speaker_count].id), str(speakers[(i + 1) % speaker_count].id)],
+            })
+        return event, payloads
+
+    def per_item(self, event, payloads):
+        created = 0
+        for payload in payloads:
+            payload = dict(payload)
+            speaker_ids = payload.pop('speaker_ids')
+            serializer = ScheduleSerializer(data=payload)
+            if serializer.is_valid():
+                schedule = serializer.save(event=event)
+                schedule.speakers.set(speaker_ids)
+                created += 1
+        return created
+
+    def bulk(self, event, payloads):
+        valid, errors = validate_schedule_batch(event, payloads)
+        return len(create_schedules(event, valid))
+
+    def run(self, label, func):
+        savepoint = transaction.savepoint()
+        created, elapsed, queries, _ = measure(func)
+        transaction.savepoint_rollback(savepoint)
+        self.stdout.write(f"{label:<22} {created:5d} created  {elapsed * 1000:9.1f} ms  {queries:6d} queries")
@@ -0,0 +1,137 @@
+import json
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+from rest_framework.test import force_authenticate
+
+from ._benchmark import seed_catalog
+
+# SQLite: "SCAN attendee_ticket" is a full scan; "SCAN t USING INDEX i" and
+# "SEARCH ..." are not
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (\w+)(?! USING)')
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN every query the main read endpoints run against a seeded "
+        "catalog (inside a rolled-back transaction) and fail if any of them "
+        "scans a whole table"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=2000)
+        parser.add_argument('--attendees', type=int, default=300)
+        parser.add_argument('--allow', action='append', default=[], metavar='TABLE',
+                            help="Table a full scan is acceptable on (repeatable)")
+        parser.add_argument('--verbose-plans', action='store_true', help="Print every plan")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f"Query plans can't be checked on {connection.vendor}")
+
+        failures = []
+        with transaction.atomic():
+            data = seed_catalog(events=options['events'], attendees=options['attendees'])
+            # Give the planner statistics of the seeded data
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            with override_settings(ALLOWED_HOSTS=['testserver'], AGENDA_BUILD_ASYNC=False, RATE_LIMIT_ENABLED=False):
+                for label, path, user in self.endpoints(data):
+                    queries = self.capture(path, user)
+                    scans = []
+                    for sql, params in queries:
+                        plan = self.explain(sql, params)
+                        if options['verbose_plans']:
+                            self.stdout.write(f"{sql}\n  " + "\n  ".join(plan))
+                        scans += [
+                            table for table in self.full_scans(plan) if table not in options['allow']
+                        ]
+                    if scans:
+                        failures.append(label)
+                        self.stdout.write(self.style.ERROR(
+                            f"{label:<24} {len(queries):3d} queries  full scan of {', '.join(sorted(set(scans)))}"
+                        ))
+                    else:
+                        self.stdout.write(f"{label:<24} {len(queries):3d} queries  ok")
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"Full table scans in: {', '.join(failures)}")
+
+    def endpoints(self, data):
+        """(label, path, user) of the endpoints to check"""
+        event, agenda_event = data['event'].id, data['agenda_event'].id
+        attendee, organizer = data['attendee'], data['organizer']
+        return [
+            ("ListEvents", '/api/events/', None),
+            ("ListEvents by category", '/api/events/?category=music', None),
+            ("NewEvents", '/api/events/new/', None),
+            ("TrendingEvents", '/api/events/trending/', None),
+            ("EventDetails", f'/api/event/{event}/', attendee),
+            ("EventTicketTiers", f'/api/event/{event}/ticket-tiers/', attendee),
+            ("UpcomingEvents", '/api/events/upcoming/', attendee),
+            ("AttendeeEvents", '/api/attendee/events/', attendee),
+            ("SavedEventsList", '/api/events/saved/', attendee),
+            ("RecommendedEvents", '/api/events/recommended/', attendee),
+            ("EventTicket", f'/api/event/{event}/ticket/', attendee),
+            ("OrganizerEvents", '/api/organizer/events/', organizer),
+            ("EventAttendees", f'/api/organizer/events/{event}/attendees/', organizer),
+            ("EventAttendees by name", f'/api/organizer/events/{event}/attendees/?name=att', organizer),
+            ("EventAttendees by email", f'/api/organizer/events/{event}/attendees/?email=bench-att', organizer),
+            ("SpeakerDirectory", '/api/organizer/speakers/directory/?search=spe', organizer),
+            ("ListEventSchedules", f'/api/organizer/events/{agenda_event}/schedules/', organizer),
+            ("ListEventDays", f'/api/organizer/events/{agenda_event}/days/', organizer),
+        ]
+
+    def capture(self, path, user):
+        """(sql, params) of the distinct reads a GET of the path runs"""
+        queries = {}
+
+        def record(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                queries.setdefault(sql, params)
+            return execute(sql, params, many, context)
+
+        request = RequestFactory().get(path)
+        if user is not None:
+            force_authenticate(request, user=user)
+        match = resolve(request.path_info)
+        with connection.execute_wrapper(record):
+            response = match.func(request, *match.args, **match.kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        if response.status_code >= 400:
+            raise CommandError(f"GET {path} returned {response.status_code}")
+        return list(queries.items())
+
+    def explain(self, sql, params):
+        """The plan as lines of text"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            return [json.dumps(plan if not isinstance(plan, str) else json.loads(plan))]
+
+    def full_scans(self, plan):
+        """Tables the plan reads in full"""
+        if connection.vendor == 'sqlite':
+            return [match.group(1) for line in plan if (match := SQLITE_FULL_SCAN.match(line.strip()))]
+
+        tables = []
+
+        def walk(node):
+            if node.get('Node Type') == 'Seq Scan':
+                tables.append(node['Relation Name'])
+            for child in node.get('Plans', []):
+                walk(child)
+
+        for line in plan:
+            for entry in json.loads(line):
+                walk(entry['Plan'])
+        return tables
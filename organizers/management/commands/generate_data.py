@@ -0,0 +1,370 @@
+import random
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, time as clock_time, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from analytics.ledger import rebuild_event_ledger
+from analytics.rollups import rebuild_event_rollups
+from attendee.models import Order, SavedEvent, Ticket
+from organizers.agenda import build_agenda
+from organizers.days import event_dates
+from organizers.models import Event, EventDay, Schedule, Speaker, TicketTier
+
+User = get_user_model()
+
+# Generated users' emails end with this; load_test signs in as them
+SYNTHETIC_EMAIL_DOMAIN = 'synthetic.tixly.test'
+DEFAULT_PASSWORD = 'tixly-synthetic'
+
+CITIES = ['Lagos', 'Abuja', 'Accra', 'Nairobi', 'Cape Town', 'Kigali', 'London', 'Berlin', 'Toronto', 'Austin']
+TIERS = [
+    ('General', Decimal('15.00')), ('Early bird', Decimal('10.00')),
+    ('VIP', Decimal('80.00')), ('Backstage', Decimal('150.00')),
+]
+TIER_SIZES = [100, 250, 500, 1000, 2500]
+SPEAKER_TITLES = ['Engineer', 'Founder', 'Designer', 'Product Manager', 'Researcher', 'Artist']
+SESSION_TYPES = ['talk', 'talk', 'talk', 'panel', 'workshop']
+# (status, weight) of generated orders
+ORDER_STATUSES = [('paid', 85), ('pending', 7), ('cancelled', 5), ('expired', 3)]
+TICKETS_PER_ORDER = [1, 1, 1, 2, 2, 3, 4]
+# Shape of the popularity distribution: about 20% of events sell 80% of tickets
+POPULARITY = 1.16
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Keep the created/updated timestamps bulk inserts are given (auto_now/auto_now_add would overwrite them)"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic dataset with bulk inserts: organizers, attendees, "
+        "events with ticket tiers, days, sessions and speakers, orders, "
+        "tickets and saved events (e.g. --tickets 1000000). Sales follow a "
+        "skewed popularity curve over the events' sale windows. Rollups, the "
+        "revenue ledger and agendas are rebuilt afterwards unless "
+        "--skip-derived is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organizers', type=int, default=20)
+        parser.add_argument('--attendees', type=int, default=5000)
+        parser.add_argument('--events', type=int, default=2000)
+        parser.add_argument('--tickets', type=int, default=100000)
+        parser.add_argument('--saves', type=int, default=20000)
+        parser.add_argument('--multi-day', type=float, default=0.1,
+                            help="Share of events that run over several days, with an agenda")
+        parser.add_argument('--sessions-per-day', type=int, default=8)
+        parser.add_argument('--speakers-per-organizer', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, help="Random seed, for the same volumes and distributions (ids still differ)")
+        parser.add_argument('--password', default=DEFAULT_PASSWORD, help="Password of every generated user")
+        parser.add_argument('--skip-derived', action='store_true',
+                            help="Don't rebuild sales rollups, revenue ledgers and agendas")
+
+    def handle(self, *args, **options):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError(f"{connection.vendor} doesn't return ids from bulk inserts")
+        if options['organizers'] < 1 or options['attendees'] < 1 or options['events'] < 1:
+            raise CommandError("Generate at least one organizer, attendee and event")
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now().replace(second=0, microsecond=0)
+        # Emails are unique, so each run (even with the same seed) gets its own
+        tag = uuid.uuid4().hex[:8]
+        password = make_password(options['password'])
+        started = time.perf_counter()
+
+        with explicit_timestamps(Event, EventDay, Speaker, Schedule, TicketTier, Order, Ticket, SavedEvent):
+            organizers = self.stage("organizers", lambda: self.create_users('organizer', options['organizers'], tag, password))
+            attendees = self.stage("attendees", lambda: self.create_users('attendee', options['attendees'], tag, password))
+            events = self.stage("events", lambda: self.create_events(organizers, options['events'], options['multi_day']))
+            tiers = self.stage("ticket tiers", lambda: self.create_tiers(events))
+            speakers = self.stage("speakers", lambda: self.create_speakers(organizers, options['speakers_per_organizer']))
+            self.stage("sessions", lambda: self.create_agendas(events, speakers, options['sessions_per_day']))
+
+            # Only events on sale sell; the popular ones sell most
+            on_sale = [event for event in events if event.status in ('published', 'completed')]
+            if not on_sale:
+                raise CommandError("No generated event is on sale; generate more events")
+            weights = list(accumulate(self.rng.paretovariate(POPULARITY) for _ in on_sale))
+            sold, ordered = Counter(), set()
+            self.stage("tickets", lambda: self.create_sales(
+                on_sale, weights, tiers, attendees, options['tickets'], sold, ordered
+            ))
+            self.stage("saved events", lambda: self.create_saves(on_sale, weights, attendees, options['saves']))
+            self.update_availability(events, tiers, sold)
+
+        if not options['skip_derived']:
+            self.stage("analytics", lambda: self.rebuild_analytics(sorted(ordered)), unit='events')
+            self.stage("agendas", lambda: self.rebuild_agendas(events), unit='events')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {sum(sold.values()):,d} paid tickets in {time.perf_counter() - started:.0f}s. "
+            f"Users are *-{tag}@{SYNTHETIC_EMAIL_DOMAIN}, password {options['password']!r}"
+        ))
+
+    def stage(self, label, func, unit='rows'):
+        """Run one generation step and report its count and rate"""
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        if isinstance(result, dict):
+            count = sum(len(rows) for rows in result.values())
+        else:
+            count = result if isinstance(result, int) else len(result)
+        self.stdout.write(
+            f"{label:<14} {count:>10,d} {unit:<6}  {elapsed:7.1f}s  {count / max(elapsed, 1e-6):>10,.0f} {unit}/s"
+        )
+        return result
+
+    def insert(self, model, rows, **kwargs):
+        """bulk_create the rows one batch per transaction; returns the created count"""
+        count = 0
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, **kwargs)
+            count += len(batch)
+        return count
+
+    def create_users(self, role, count, tag, password):
+        """Ids of the created users"""
+        ids = []
+        users = (
+            User(
+                email=f'{role}-{i}-{tag}@{SYNTHETIC_EMAIL_DOMAIN}', username=f'{role}-{i}-{tag}',
+                first_name='Synthetic', last_name=f'{role.title()} {i}', role=role, password=password,
+            )
+            for i in range(count)
+        )
+        for batch in batched(users, self.batch_size):
+            User.objects.bulk_create(batch)
+            ids += [user.id for user in batch]
+        return ids
+
+    def create_events(self, organizers, count, multi_day_share):
+        rng, now = self.rng, self.now
+        categories = [choice for choice, _ in Event.CATEGORY_CHOICES]
+        events = []
+        for i in range(count):
+            category, city = rng.choice(categories), rng.choice(CITIES)
+            day = (now + timedelta(days=rng.randint(-180, 365))).date()
+            if rng.random() < multi_day_share:
+                start = timezone.make_aware(datetime.combine(day, clock_time(9)))
+                end = timezone.make_aware(datetime.combine(day + timedelta(days=rng.randint(1, 3)), clock_time(17)))
+            else:
+                start = timezone.make_aware(datetime.combine(day, clock_time(rng.choice([10, 14, 18, 19]))))
+                end = start + timedelta(hours=rng.choice([2, 3, 4]))
+            created = min(now, start - timedelta(days=rng.randint(14, 120), minutes=rng.randint(0, 1439)))
+            if start < now:
+                status = 'completed' if rng.random() < 0.7 else 'published'
+            else:
+                status = rng.choices(['published', 'draft', 'cancelled'], [85, 10, 5])[0]
+            events.append(Event(
+                image=f'synthetic/event-{i % 50}', category=category,
+                title=f'{city} {category.title()} {i}', short_description=f'A {category} event in {city}',
+                description=f'Synthetic {category} event {i} in {city}.', location=city,
+                startDateTime=start, endDateTime=end, is_multi_day=start.date() != end.date(),
+                available_tickets=0, organizer_id=rng.choice(organizers), status=status,
+                created_at=created, updated_at=created,
+            ))
+        self.insert(Event, events)
+        return events
+
+    def create_tiers(self, events):
+        """{event id: [tiers]}"""
+        rng = self.rng
+        tiers = {}
+        for event in events:
+            tiers[event.id] = [
+                TicketTier(
+                    name=name, short_description=name, price=price + rng.randint(0, 20), event=event,
+                    total_tickets=(size := rng.choice(TIER_SIZES)), available_tickets=size,
+                    salesStart=event.created_at, saleEnd=event.startDateTime,
+                    created_at=event.created_at, updated_at=event.created_at,
+                )
+                for name, price in sorted(rng.sample(TIERS, rng.randint(1, 3)), key=lambda tier: tier[1])
+            ]
+        self.insert(TicketTier, [tier for event_tiers in tiers.values() for tier in event_tiers])
+        return tiers
+
+    def create_speakers(self, organizers, per_organizer):
+        """{organizer id: [speakers]}"""
+        rng, now = self.rng, self.now
+        speakers = {
+            organizer: [
+                Speaker(
+                    id=uuid.uuid4(), name=f'Speaker {organizer}-{i}', title=rng.choice(SPEAKER_TITLES),
+                    email=f'speaker-{organizer}-{i}@{SYNTHETIC_EMAIL_DOMAIN}', organizer_id=organizer,
+                    created_at=now, updated_at=now,
+                )
+                for i in range(per_organizer)
+            ]
+            for organizer in organizers
+        }
+        self.insert(Speaker, [speaker for organizer in speakers.values() for speaker in organizer])
+        return speakers
+
+    def create_agendas(self, events, speakers, sessions_per_day):
+        """
+        Days of every event, as creating it through the API would make, and
+        sessions in two rooms on the days of the multi-day ones; returns the
+        session count
+        """
+        rng = self.rng
+        days, sessions, links = [], [], []
+        for event in events:
+            lineup = speakers[event.organizer_id]
+            for number, date in enumerate(event_dates(event), start=1):
+                day = EventDay(
+                    id=uuid.uuid4(), event=event, dayNumber=number, date=date,
+                    startTime=event.startDateTime.time(), endTime=event.endDateTime.time(),
+                    title=f'Day {number}', createdAt=event.created_at, updatedAt=event.created_at,
+                )
+                days.append(day)
+                if not event.is_multi_day:
+                    continue
+                # Consecutive speakers, so parallel sessions don't share one
+                offset = rng.randrange(len(lineup)) if lineup else 0
+                for slot in range(sessions_per_day):
+                    # Two sessions an hour from 09:00, one per room
+                    start = 9 * 60 + slot // 2 * 60
+                    if start + 50 >= 24 * 60:
+                        break
+                    session = Schedule(
+                        id=uuid.uuid4(), event=event, event_day=day, date=date,
+                        title=f'Session {number}.{slot + 1}',
+                        session_type='keynote' if slot == 0 else rng.choice(SESSION_TYPES),
+                        start_time=clock_time(start // 60, start % 60),
+                        end_time=clock_time((start + 50) // 60, (start + 50) % 60),
+                        room=f'Room {slot % 2 + 1}', order=slot,
+                        created_at=event.created_at, updated_at=event.created_at,
+                    )
+                    sessions.append(session)
+                    if lineup:
+                        speaker = lineup[(offset + slot) % len(lineup)]
+                        links.append(Schedule.speakers.through(schedule_id=session.id, speaker_id=speaker.id))
+        self.insert(EventDay, days)
+        self.insert(Schedule, sessions)
+        self.insert(Schedule.speakers.through, links)
+        return len(sessions)
+
+    def create_sales(self, events, weights, tiers, attendees, ticket_count, sold, ordered):
+        """
+        Orders of one to four tickets until ticket_count tickets exist,
+        bought over each tier's sale window. Paid tickets are counted per
+        tier into `sold` and the ordered events' ids added to `ordered`.
+        Returns the ticket count.
+        """
+        rng, now = self.rng, self.now
+        statuses, status_weights = zip(*ORDER_STATUSES)
+        created = 0
+        while created < ticket_count:
+            orders, plans = [], []
+            for event in rng.choices(events, cum_weights=weights, k=min(self.batch_size, ticket_count - created)):
+                if created >= ticket_count:
+                    break
+                tier = rng.choice(tiers[event.id])
+                quantity = min(rng.choice(TICKETS_PER_ORDER), ticket_count - created)
+                # Sales pick up as the event gets closer
+                window = min(tier.saleEnd, now) - tier.salesStart
+                bought = tier.salesStart + window * rng.random() ** 0.5
+                status = rng.choices(statuses, status_weights)[0]
+                # Foreign keys by id: bulk inserts of instances are slower
+                orders.append(Order(
+                    order_id=uuid.uuid4(), user_id=rng.choice(attendees), event_id=event.id,
+                    total_amount=tier.price * quantity, status=status, created_at=bought,
+                ))
+                plans.append((event, tier, quantity))
+                ordered.add(event.id)
+                created += quantity
+
+            with transaction.atomic():
+                Order.objects.bulk_create(orders)
+                tickets = []
+                for order, (event, tier, quantity) in zip(orders, plans):
+                    paid = order.status == 'paid'
+                    if paid:
+                        sold[tier.id] += quantity
+                    for n in range(quantity):
+                        used = paid and event.startDateTime < now and rng.random() < 0.8
+                        tickets.append(Ticket(
+                            order_id=order.id, event_id=event.id, user_id=order.user_id, ticket_tier_id=tier.id,
+                            qr_code=uuid.uuid4(), attendee_name=f'Attendee {order.user_id}-{n + 1}',
+                            status='used' if used else ('cancelled' if order.status == 'cancelled' else 'unused'),
+                            used_at=event.startDateTime if used else None, is_paid=paid,
+                            created_at=order.created_at, updated_at=order.created_at,
+                        ))
+                Ticket.objects.bulk_create(tickets, batch_size=self.batch_size)
+        return created
+
+    def create_saves(self, events, weights, attendees, count):
+        """Saves of popular events by random attendees; pairs drawn twice are skipped"""
+        rng = self.rng
+        saves = (
+            SavedEvent(
+                user_id=rng.choice(attendees), event=event,
+                created_at=event.created_at + (self.now - event.created_at) * rng.random(),
+            )
+            for event in rng.choices(events, cum_weights=weights, k=count)
+        )
+        return self.insert(SavedEvent, saves, ignore_conflicts=True)
+
+    def update_availability(self, events, tiers, sold):
+        """Take the paid tickets off the tiers' and events' availability"""
+        all_tiers = [tier for event_tiers in tiers.values() for tier in event_tiers]
+        for tier in all_tiers:
+            # The most popular events may sell past the drawn size
+            tier.total_tickets = max(tier.total_tickets, sold[tier.id])
+            tier.available_tickets = tier.total_tickets - sold[tier.id]
+        for event in events:
+            event.available_tickets = sum(tier.available_tickets for tier in tiers[event.id])
+        with transaction.atomic():
+            TicketTier.objects.bulk_update(all_tiers, ['total_tickets', 'available_tickets'], batch_size=self.batch_size)
+            Event.objects.bulk_update(events, ['available_tickets'], batch_size=self.batch_size)
+
+    def rebuild_analytics(self, event_ids):
+        # Bulk inserts skip the signals that keep these current
+        for event_id in event_ids:
+            rebuild_event_rollups(event_id)
+            rebuild_event_ledger(event_id)
+        return event_ids
+
+    def rebuild_agendas(self, events):
+        for event in events:
+            build_agenda(event.id)
+        return events
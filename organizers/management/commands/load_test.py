@@ -0,0 +1,243 @@
+import http.client
+import json
+import math
+import random
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from itertools import accumulate, count
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from accounts.serializers import TokenObtainPairSerializer
+from organizers.models import Event, EventDay
+from .generate_data import DEFAULT_PASSWORD, SYNTHETIC_EMAIL_DOMAIN, POPULARITY
+
+User = get_user_model()
+
+CATEGORIES = [choice for choice, _ in Event.CATEGORY_CHOICES]
+
+
+def hot(rng, items):
+    """An item of a list sorted most popular first, skewed toward its head"""
+    return items[min(int(rng.paretovariate(POPULARITY)) - 1, len(items) - 1)]
+
+
+# (weight, route, who, request) of the traffic mix: mostly anonymous catalog
+# browsing, then signed-in attendees, a few organizers and sign-ins. `who` is
+# None, 'attendee', 'organizer' or 'login'; request(rng, ctx, user) returns
+# (path, body).
+TRAFFIC = [
+    (25, "GET /api/events/", None, lambda rng, ctx, user: (f"/api/events/?page={rng.randint(1, ctx['pages'])}", None)),
+    (8, "GET /api/events/?category=", None,
+     lambda rng, ctx, user: (f'/api/events/?category={rng.choice(CATEGORIES)}', None)),
+    (6, "GET /api/events/new/", None, lambda rng, ctx, user: ('/api/events/new/', None)),
+    (6, "GET /api/events/trending/", None, lambda rng, ctx, user: ('/api/events/trending/', None)),
+    (20, "GET /api/event/{id}/", None, lambda rng, ctx, user: (f"/api/event/{hot(rng, ctx['events'])}/", None)),
+    (6, "GET /api/event/{id}/ticket-tiers/", 'attendee',
+     lambda rng, ctx, user: (f"/api/event/{hot(rng, ctx['events'])}/ticket-tiers/", None)),
+    (2, "GET /api/event/{id}/agenda.ics", None,
+     lambda rng, ctx, user: (f"/api/event/{rng.choice(ctx['agenda_events'])}/agenda.ics", None)),
+    (4, "GET /api/events/upcoming/", 'attendee', lambda rng, ctx, user: ('/api/events/upcoming/', None)),
+    (4, "GET /api/attendee/events/", 'attendee', lambda rng, ctx, user: ('/api/attendee/events/', None)),
+    (3, "GET /api/events/saved/", 'attendee', lambda rng, ctx, user: ('/api/events/saved/', None)),
+    (3, "GET /api/events/recommended/", 'attendee', lambda rng, ctx, user: ('/api/events/recommended/', None)),
+    (2, "GET /api/organizer/events/", 'organizer', lambda rng, ctx, user: ('/api/organizer/events/', None)),
+    (2, "GET /api/organizer/events/{id}/attendees/", 'organizer',
+     lambda rng, ctx, user: (f"/api/organizer/events/{rng.choice(user['events'])}/attendees/", None)),
+    (1, "GET /api/organizer/event-days/{id}/schedules/", 'organizer',
+     lambda rng, ctx, user: (f"/api/organizer/event-days/{rng.choice(ctx['days'])}/schedules/", None)),
+    (1, "GET /api/organizer/analytics/events/{id}/sales/", 'organizer',
+     lambda rng, ctx, user: (f"/api/organizer/analytics/events/{rng.choice(user['events'])}/sales/", None)),
+    (1, "GET /api/organizer/analytics/revenue/", 'organizer',
+     lambda rng, ctx, user: ('/api/organizer/analytics/revenue/', None)),
+    (1, "POST /api/auth/jwt/create/", 'login',
+     lambda rng, ctx, user: ('/api/auth/jwt/create/', {'email': user['email'], 'password': ctx['password']})),
+]
+# Context the routes pick ids from, when it isn't just the events
+NEEDS = {
+    "GET /api/event/{id}/agenda.ics": 'agenda_events',
+    "GET /api/organizer/event-days/{id}/schedules/": 'days',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a weighted mix of catalog, attendee, organizer and sign-in "
+        "traffic against a running API and report throughput and latency "
+        "percentiles per route. Signs in as the users generate_data created "
+        "(tokens are minted from this process's database and settings, so "
+        "point both at the server's). Each worker sends its next request as "
+        "soon as the last one returns; run the server with "
+        "RATE_LIMIT_ENABLED=false unless the limits are under test."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--duration', type=float, default=60, help="Seconds to send traffic for")
+        parser.add_argument('--requests', type=int, help="Stop after this many requests instead")
+        parser.add_argument('--concurrency', type=int, default=16, help="Concurrent workers (connections)")
+        parser.add_argument('--warmup', type=float, default=5, help="Seconds of traffic left out of the report")
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--users', type=int, default=200, help="Attendees and organizers to sign in as")
+        parser.add_argument('--password', default=DEFAULT_PASSWORD, help="Password generate_data gave the users")
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--report', metavar='PATH', help="Also write the results as JSON")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['base_url'])
+        if url.scheme not in ('http', 'https'):
+            raise CommandError(f"Unsupported base URL {options['base_url']}")
+
+        ctx = self.context(options['users'])
+        ctx['password'] = options['password']
+        self.stdout.write(
+            f"{len(ctx['events'])} events, {len(ctx['attendee'])} attendees, {len(ctx['organizer'])} organizers; "
+            f"{options['concurrency']} workers against {options['base_url']}"
+        )
+
+        # Leave out routes nothing was generated for
+        routes = [
+            route for route in TRAFFIC
+            if (route[2] != 'organizer' or ctx['organizer']) and ctx[NEEDS.get(route[1], 'events')]
+        ]
+        cum_weights = list(accumulate(route[0] for route in routes))
+        results = [[] for _ in range(options['concurrency'])]
+        sent = count()
+        started = time.monotonic()
+        deadline = started + options['warmup'] + options['duration']
+        measure_from = started + options['warmup']
+
+        def work(worker):
+            rng = random.Random(None if options['seed'] is None else options['seed'] + worker)
+            connection = None
+            while time.monotonic() < deadline and (options['requests'] is None or next(sent) < options['requests']):
+                _, route, who, build = rng.choices(routes, cum_weights=cum_weights)[0]
+                user = rng.choice(ctx['organizer'] if who == 'organizer' else ctx['attendee'])
+                path, body = build(rng, ctx, user)
+                headers = {'Accept': 'application/json'}
+                if who in ('attendee', 'organizer'):
+                    headers['Authorization'] = f"Bearer {user['token']}"
+                if body is not None:
+                    headers['Content-Type'] = 'application/json'
+                    body = json.dumps(body)
+
+                if connection is None:
+                    connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+                    connection = connection_class(url.netloc, timeout=options['timeout'])
+                sent_at = time.monotonic()
+                try:
+                    connection.request(route.split()[0], url.path.rstrip('/') + path, body, headers)
+                    response = connection.getresponse()
+                    response.read()
+                    status = response.status
+                except (OSError, http.client.HTTPException) as e:
+                    status = type(e).__name__
+                    connection.close()
+                    connection = None
+                if sent_at >= measure_from:
+                    results[worker].append((route, status, (time.monotonic() - sent_at) * 1000))
+            if connection is not None:
+                connection.close()
+
+        workers = [threading.Thread(target=work, args=(worker,)) for worker in range(options['concurrency'])]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - measure_from
+
+        results = [result for worker in results for result in worker]
+        if not results:
+            raise CommandError("No requests were sent after the warmup")
+        rows = self.summarize(results, elapsed)
+        self.report(rows)
+        if options['report']:
+            with open(options['report'], 'w') as file:
+                json.dump(rows, file, indent=2)
+
+    def context(self, users):
+        """The events and signed-in users the traffic is built from"""
+        published = Event.objects.filter(status='published')
+        events = list(
+            published.annotate(sold=Count('tickets'))
+            .order_by('-sold', 'id').values_list('id', flat=True)[:2000]
+        )
+        if not events:
+            raise CommandError("No published events; generate data with generate_data first")
+
+        ctx = {
+            'events': events,
+            # Browsing rarely goes past the first few pages of the catalog
+            'pages': min(5, math.ceil(published.count() / settings.REST_FRAMEWORK['PAGE_SIZE'])),
+            'agenda_events': list(
+                published.filter(is_multi_day=True).values_list('id', flat=True)[:200]
+            ),
+        }
+        for role in ('attendee', 'organizer'):
+            sample = list(
+                User.objects.filter(role=role, email__endswith=f'@{SYNTHETIC_EMAIL_DOMAIN}').order_by('?')[:users]
+            )
+            ctx[role] = [
+                {'email': user.email, 'token': str(TokenObtainPairSerializer.get_token(user).access_token)}
+                for user in sample
+            ]
+        if not ctx['attendee']:
+            raise CommandError(f"No attendees @{SYNTHETIC_EMAIL_DOMAIN}; generate data with generate_data first")
+
+        # Organizers act on their own events
+        owned = defaultdict(list)
+        for event_id, organizer in Event.objects.filter(
+            organizer__email__in=[user['email'] for user in ctx['organizer']]
+        ).values_list('id', 'organizer__email'):
+            owned[organizer].append(event_id)
+        ctx['organizer'] = [dict(user, events=owned[user['email']]) for user in ctx['organizer'] if owned[user['email']]]
+        ctx['days'] = list(
+            EventDay.objects.filter(event__organizer__email__in=[user['email'] for user in ctx['organizer']])
+            .values_list('id', flat=True)[:1000]
+        )
+        return ctx
+
+    def summarize(self, results, elapsed):
+        by_route = defaultdict(list)
+        for route, status, latency in results:
+            by_route[route].append((status, latency))
+        by_route['all'] = [(status, latency) for _, status, latency in results]
+
+        rows = []
+        for route, samples in by_route.items():
+            latencies = sorted(latency for _, latency in samples)
+            statuses = Counter(str(status) for status, _ in samples)
+            percentiles = (
+                statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+            )
+            rows.append({
+                'route': route, 'requests': len(samples), 'rps': round(len(samples) / elapsed, 1),
+                'errors': sum(n for status, n in statuses.items() if not status.isdigit() or int(status) >= 400),
+                'statuses': dict(statuses),
+                'p50_ms': round(percentiles[49], 1), 'p95_ms': round(percentiles[94], 1),
+                'p99_ms': round(percentiles[98], 1), 'max_ms': round(latencies[-1], 1),
+            })
+        rows.sort(key=lambda row: (row['route'] == 'all', -row['requests']))
+        return rows
+
+    def report(self, rows):
+        self.stdout.write(
+            f"\n{'route':<50} {'requests':>8} {'req/s':>8} {'errors':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+        )
+        for row in rows:
+            line = (
+                f"{row['route']:<50} {row['requests']:>8,d} {row['rps']:>8.1f} {row['errors']:>7,d}"
+                f" {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
+        for row in rows:
+            if row['errors'] and row['route'] != 'all':
+                codes = ', '.join(f"{status} x{n}" for status, n in sorted(row['statuses'].items()))
+                self.stdout.write(f"  {row['route']}: {codes}")
+        self.stdout.write("Latencies in ms")
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from organizers.models import ImageUpload
+from organizers.uploads import process_due_uploads, sweep_staging
+
+
+class Command(BaseCommand):
+    help = (
+        "Upload staged event and speaker images that are due (retries, and ones "
+        "a restarted process never got to) and delete staged files left by "
+        "rolled-back requests; with --loop, keep polling"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep running, polling for due uploads")
+        parser.add_argument('--interval', type=float, default=10, help="Seconds between polls")
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        while True:
+            finished = retrying = 0
+            while True:
+                done, failed = process_due_uploads(options['batch_size'])
+                if not done and not failed:
+                    break
+                finished += done
+                retrying += failed
+
+            if finished or retrying:
+                self.stdout.write(f"Finished {finished} uploads, {retrying} to retry")
+            swept = sweep_staging()
+            if swept:
+                self.stdout.write(f"Deleted {swept} orphaned staged files")
+            if not options['loop']:
+                pending = ImageUpload.objects.filter(status='pending').count()
+                failed = ImageUpload.objects.filter(status='failed').count()
+                self.stdout.write(f"{pending} pending, {failed} failed")
+                return
+            time.sleep(options['interval'])
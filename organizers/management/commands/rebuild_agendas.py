@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from organizers.agenda import build_agenda
+from organizers.models import Event
+
+
+class Command(BaseCommand):
+    help = (
+        "Synchronously rebuild the stored agenda documents of events. With "
+        "--stale, only the agendas whose document is missing or older than "
+        "their latest change (e.g. after failed or lost background builds)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'event_ids', nargs='*', type=int,
+            help="Only rebuild these events (default: all events)",
+        )
+        parser.add_argument(
+            '--stale', action='store_true',
+            help="Only rebuild missing or stale documents",
+        )
+
+    def handle(self, *args, **options):
+        events = Event.objects.order_by('id')
+        if options['event_ids']:
+            events = events.filter(id__in=options['event_ids'])
+        if options['stale']:
+            events = events.filter(
+                Q(agenda__document__isnull=True) | Q(agenda__version__lt=F('agenda__requested_version'))
+            )
+
+        count = 0
+        for event_id in events.values_list('id', flat=True).iterator():
+            build_agenda(event_id)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} agenda(s)"))
@@ -0,0 +1,47 @@
+import cloudinary
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from organizers.agenda import request_rebuild
+from organizers.models import Event, Schedule, Speaker
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the stored image variant URLs of events and speakers, e.g. "
+        "after changing organizers.images.VARIANTS (saves keep them current)"
+    )
+
+    def handle(self, *args, **options):
+        if not cloudinary.config().cloud_name:
+            raise CommandError("Cloudinary is not configured (CLOUDINARY_CLOUD_NAME)")
+
+        events = self.refresh(Event, 'image_variants')
+        speakers = self.refresh(Speaker, 'profile_image_variants')
+
+        # Agenda documents embed speakers; bulk_update sends no signals
+        with transaction.atomic():
+            request_rebuild(*Schedule.objects.filter(speakers__in=speakers).values_list('event_id', flat=True).distinct())
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated the image variants of {len(events)} event(s) and {len(speakers)} speaker(s)"
+        ))
+
+    def refresh(self, model, field_name):
+        field = model._meta.get_field(field_name)
+        changed, batch = [], []
+        for instance in model.objects.only('pk', field.image_field, field_name).iterator(chunk_size=BATCH_SIZE):
+            variants = field.variants_for(instance)
+            if variants != getattr(instance, field_name):
+                setattr(instance, field_name, variants)
+                batch.append(instance)
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_update(batch, [field_name])
+                changed += [instance.pk for instance in batch]
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, [field_name])
+            changed += [instance.pk for instance in batch]
+        return changed
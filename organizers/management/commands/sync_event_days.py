@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from organizers.agenda import inline_builds
+from organizers.days import reconcile_event_days
+from organizers.models import Event
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate or reconcile the EventDay rows of existing events from their "
+        "start and end dates (new and re-dated events are handled on save)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'event_ids', nargs='*', type=int,
+            help="Only sync these events (default: all events with dates)",
+        )
+
+    def handle(self, *args, **options):
+        events = Event.objects.filter(startDateTime__isnull=False, endDateTime__isnull=False).order_by('id')
+        if options['event_ids']:
+            events = events.filter(id__in=options['event_ids'])
+
+        # A list rather than a live cursor: reconciling writes as it goes
+        events = list(events)
+        with inline_builds():
+            for event in events:
+                is_multi_day = event.startDateTime.date() != event.endDateTime.date()
+                if event.is_multi_day != is_multi_day:
+                    Event.objects.filter(id=event.id).update(is_multi_day=is_multi_day)
+                reconcile_event_days(event)
+        count = len(events)
+
+        self.stdout.write(self.style.SUCCESS(f"Synced the days of {count} event(s)"))
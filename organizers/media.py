@@ -0,0 +1,199 @@
+"""
+Stored event and speaker images, deduplicated by content.
+
+Every image stored through the upload pipeline (organizers.uploads) is
+registered as a MediaAsset under the sha256 of its bytes. The hash is
+computed while the request body streams in (the Hashing*UploadHandler
+classes in FILE_UPLOAD_HANDLERS). An upload whose hash is already
+registered is never staged or stored again; the row just points at the
+existing asset.
+
+Assets are reference counted. Saving an event or speaker that starts or
+stops showing an asset adjusts its ref_count (organizers.signals), and
+so does deleting one. The stored file is deleted once no row shows it
+anymore. Images stored before the registry existed, or set by other
+means, aren't registered and are left alone.
+"""
+import hashlib
+import logging
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.db.models import DEFERRED, F
+from django.utils.module_loading import import_string
+
+from .models import MediaAsset
+
+logger = logging.getLogger(__name__)
+
+
+# ============ STORAGE BACKENDS ============
+
+class CloudinaryImageUploader:
+    """Stores images in Cloudinary"""
+
+    def upload(self, file, kind):
+        """Store the file; returns the reference to save in the CloudinaryField"""
+        from cloudinary import uploader
+        return uploader.upload_resource(file, type='upload', resource_type='image').get_prep_value()
+
+    def delete(self, reference):
+        from cloudinary import uploader
+        from cloudinary.models import CloudinaryField
+        uploader.destroy(CloudinaryField().parse_cloudinary_resource(reference).public_id)
+
+
+class LocalImageUploader:
+    """
+    Offline stand-in for Cloudinary: keeps images under
+    IMAGE_LOCAL_STORE_ROOT and returns Cloudinary-style references to them
+    """
+
+    def __init__(self):
+        self.storage = FileSystemStorage(location=settings.IMAGE_LOCAL_STORE_ROOT)
+
+    def upload(self, file, kind):
+        extension = os.path.splitext(file.name)[1].lstrip('.').lower() or 'jpg'
+        name = self.storage.save(f'local/{kind}/{uuid.uuid4().hex}.{extension}', file)
+        return f'image/upload/{name}'
+
+    def delete(self, reference):
+        self.storage.delete(reference.removeprefix('image/upload/'))
+
+
+def get_uploader():
+    return import_string(settings.IMAGE_UPLOAD_BACKEND)()
+
+
+# ============ HASHING ============
+
+class HashingUploadHandlerMixin:
+    """Hashes the files a handler receives, as their chunks stream in"""
+
+    def new_file(self, *args, **kwargs):
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # The memory handler passes files too large for it on to the next one
+        if getattr(self, 'activated', True):
+            self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.content_hash = self.hasher.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadHandlerMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadHandlerMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def content_hash(file):
+    """sha256 of a file; taken from the upload handlers when they computed it"""
+    digest = getattr(file, 'content_hash', None)
+    if digest is None:
+        hasher = hashlib.sha256()
+        for chunk in file.chunks():
+            hasher.update(chunk)
+        file.seek(0)
+        digest = file.content_hash = hasher.hexdigest()
+    return digest
+
+
+def stored_reference(instance, field_name, value=None):
+    """What an image field of the row holds (or would hold `value`), as saved in the database"""
+    field = instance._meta.get_field(field_name)
+    if value is None:
+        value = getattr(instance, field.attname)
+    if not value or isinstance(value, UploadedFile):
+        return ''
+    if isinstance(value, str):
+        value = field.to_python(value)
+    return field.get_prep_value(value) or ''
+
+
+# ============ REGISTRY ============
+
+def find(digest):
+    """The stored asset with this content hash, locked until the transaction ends; None if there is none"""
+    return MediaAsset.objects.select_for_update().filter(content_hash=digest).first()
+
+
+def register(digest, reference, size, uploader):
+    """
+    Register a newly stored image; returns the reference to use. If the
+    same content was registered meanwhile, that asset wins and the new
+    copy is deleted. Call it in the transaction that makes a row show the
+    image, so the asset never exists unreferenced for collect() to find.
+    """
+    asset, created = MediaAsset.objects.get_or_create(
+        content_hash=digest, defaults={'reference': reference, 'size': size}
+    )
+    if not created and asset.reference != reference:
+        uploader.delete(reference)
+    return asset.reference
+
+
+def acquire(reference):
+    if reference:
+        MediaAsset.objects.filter(reference=reference).update(ref_count=F('ref_count') + 1)
+
+
+def release(reference):
+    if not reference:
+        return
+    with transaction.atomic():
+        released = MediaAsset.objects.filter(reference=reference, ref_count__gt=0).update(
+            ref_count=F('ref_count') - 1
+        )
+        if released:
+            collect(reference)
+
+
+def collect(reference):
+    """Delete the asset if no row shows it; the stored file goes once the transaction commits"""
+    deleted, _ = MediaAsset.objects.filter(reference=reference, ref_count=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: delete_stored(reference))
+
+
+def delete_stored(reference):
+    try:
+        get_uploader().delete(reference)
+    except Exception:
+        logger.exception("Could not delete stored image %s", reference)
+
+
+def track_image(instance, field_name, created=False, update_fields=None):
+    """
+    After a save: move the reference from the image the row had when it
+    was loaded to the one it has now, if they differ
+    """
+    if update_fields is not None and field_name not in update_fields:
+        return
+    loaded_attr = f'_loaded_{field_name}'
+    loaded = '' if created else getattr(instance, loaded_attr)
+    current = getattr(instance, field_name)
+    setattr(instance, loaded_attr, current)
+    if loaded is None or loaded is DEFERRED:
+        # Not loaded from the database (or not with the image); unknown
+        # what it replaced, so the old asset keeps its count
+        loaded_reference = None
+    else:
+        loaded_reference = stored_reference(instance, field_name, loaded)
+    current_reference = stored_reference(instance, field_name, current)
+    if current_reference != loaded_reference:
+        acquire(current_reference)
+        release(loaded_reference)
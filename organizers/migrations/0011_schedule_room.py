@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizers', '0010_tickettier_short_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='room',
+            field=models.CharField(blank=True, help_text='Sessions in the same room may not overlap', max_length=100),
+        ),
+    ]
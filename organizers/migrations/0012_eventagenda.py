@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:13
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizers', '0011_schedule_room'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventAgenda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('version', models.PositiveIntegerField(default=0, help_text='Version the stored document was built for')),
+                ('requested_version', models.PositiveIntegerField(default=0, help_text='Bumped on every agenda change')),
+                ('built_at', models.DateTimeField(blank=True, null=True)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='agenda', to='organizers.event')),
+            ],
+        ),
+    ]
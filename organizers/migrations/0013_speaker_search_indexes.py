@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:20
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizers', '0012_eventagenda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='speaker',
+            index=models.Index(models.F('organizer'), django.db.models.functions.text.Upper('name'), name='speaker_org_upper_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='speaker',
+            index=models.Index(models.F('organizer'), django.db.models.functions.text.Upper('title'), name='speaker_org_upper_title_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:39
+
+import organizers.images
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizers', '0013_speaker_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='image_variants',
+            field=organizers.images.ImageVariantsField(blank=True, default=dict, editable=False, image_field='image', kind='event'),
+        ),
+        migrations.AddField(
+            model_name='speaker',
+            name='profile_image_variants',
+            field=organizers.images.ImageVariantsField(blank=True, default=dict, editable=False, image_field='profile_image', kind='speaker'),
+        ),
+    ]
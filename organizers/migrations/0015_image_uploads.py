@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:42
+
+import organizers.images
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizers', '0014_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='image_status',
+            field=models.CharField(choices=[('ready', 'Ready'), ('pending', 'Pending'), ('failed', 'Failed')], default='ready', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='speaker',
+            name='profile_image_status',
+            field=models.CharField(choices=[('ready', 'Ready'), ('pending', 'Pending'), ('failed', 'Failed')], default='ready', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='ImageUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('event', 'Event'), ('speaker', 'Speaker')], max_length=10)),
+                ('object_id', models.CharField(help_text='Primary key of the event or speaker', max_length=64)),
+                ('staged_file', models.FileField(max_length=255, storage=organizers.images.staging_storage, upload_to='images/')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField()),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('uploaded_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='image_upload_due_idx'), models.Index(fields=['kind', 'object_id'], name='image_upload_target_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizers', '0015_image_uploads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaAsset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('reference', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='imageupload',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
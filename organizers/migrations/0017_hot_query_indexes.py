@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizers', '0016_media_assets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coupon',
+            index=models.Index(fields=['event', 'code'], name='coupon_event_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', 'startDateTime'], name='event_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', 'created_at'], name='event_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tickettier',
+            index=models.Index(fields=['event', 'price'], name='tickettier_event_price_idx'),
+        ),
+    ]
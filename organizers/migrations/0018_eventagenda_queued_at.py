@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizers', '0017_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventagenda',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, help_text='When the latest build was queued', null=True),
+        ),
+    ]
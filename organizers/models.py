@@ -1,11 +1,20 @@
 
 from django.utils import timezone
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models import DEFERRED, F
+from django.db.models.functions import Upper
+from django.core.serializers.json import DjangoJSONEncoder
 from cloudinary.models import CloudinaryField
+from .images import ImageVariantsField, staging_storage
 from django.contrib.auth import get_user_model
 user = get_user_model()
 
+IMAGE_STATUSES = (
+    ('ready', 'Ready'),
+    ('pending', 'Pending'),
+    ('failed', 'Failed'),
+)
 
 
 class Event(models.Model):
@@ -27,6 +36,10 @@ class Event(models.Model):
         ('completed', 'Completed'),
     )
     image = CloudinaryField('image')
+    # Delivery URLs of the image's variants (see organizers.images)
+    image_variants = ImageVariantsField(image_field='image', kind='event')
+    # 'pending' while a new image is being uploaded (see organizers.uploads)
+    image_status = models.CharField(max_length=10, choices=IMAGE_STATUSES, default='ready')
     category = models.CharField(choices=CATEGORY_CHOICES)
     title = models.CharField(max_length=255)
     short_description = models.CharField(max_length=255)
@@ -43,14 +56,60 @@ class Event(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # (start date, end date) the row had in the database when it was loaded,
+    # used to detect date changes on save (see organizers.signals)
+    _loaded_date_range = None
+    # Image the row had in the database when it was loaded, used to count
+    # references to deduplicated images (see organizers.media)
+    _loaded_image = None
+
+    class Meta:
+        indexes = [
+            # Published catalog by start date, and new events by creation
+            models.Index(fields=['status', 'startDateTime'], name='event_status_start_idx'),
+            models.Index(fields=['status', 'created_at'], name='event_status_created_idx'),
+        ]
+
     def __str__(self):
         return self.title
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_date_range = cls._date_range(
+            instance.__dict__.get('startDateTime'), instance.__dict__.get('endDateTime')
+        )
+        instance._loaded_image = instance.__dict__.get('image', DEFERRED)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        if fields is None or {'startDateTime', 'endDateTime'} & set(fields):
+            self._loaded_date_range = self.date_range()
+        if fields is None or 'image' in fields:
+            self._loaded_image = self.__dict__.get('image', DEFERRED)
+
+    @staticmethod
+    def _date_range(start, end):
+        if start and end:
+            return start.date(), end.date()
+        return None
+
+    def date_range(self):
+        """(first date, last date) of the event, or None without dates"""
+        return self._date_range(self.startDateTime, self.endDateTime)
 
     def save(self, *args, **kwargs):
         if self.startDateTime and self.endDateTime:
-            self.isMultiDay = self.startDateTime.date() != self.endDateTime.date()
-        super().save(*args, **kwargs)
+            self.is_multi_day = self.startDateTime.date() != self.endDateTime.date()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'is_multi_day'}
+        if kwargs.get('update_fields') is not None and 'image' in kwargs['update_fields']:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'image_variants'}
+        # Event days are reconciled in post_save, in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_date_range = self.date_range()
     
     def get_duration_days(self):
         if self.startDateTime and self.endDateTime:
@@ -98,6 +157,10 @@ class Speaker(models.Model):
     name = models.CharField(max_length=255)
     title = models.CharField(max_length=255, help_text="Job title or role")
     profile_image = CloudinaryField('speaker_image', null=True, blank=True)
+    # Delivery URLs of the image's variants (see organizers.images)
+    profile_image_variants = ImageVariantsField(image_field='profile_image', kind='speaker')
+    # 'pending' while a new image is being uploaded (see organizers.uploads)
+    profile_image_status = models.CharField(max_length=10, choices=IMAGE_STATUSES, default='ready')
     email = models.EmailField(blank=True)
     
 
@@ -114,11 +177,33 @@ class Speaker(models.Model):
         ordering = ['name']
         indexes = [
             models.Index(fields=['organizer', 'name']),
+            # Case-insensitive prefix search in the speaker directory
+            models.Index(F('organizer'), Upper('name'), name='speaker_org_upper_name_idx'),
+            models.Index(F('organizer'), Upper('title'), name='speaker_org_upper_title_idx'),
         ]
     
+    # Image the row had in the database when it was loaded (see Event)
+    _loaded_profile_image = None
+
     def __str__(self):
         return f"{self.name} - {self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_profile_image = instance.__dict__.get('profile_image', DEFERRED)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        if fields is None or 'profile_image' in fields:
+            self._loaded_profile_image = self.__dict__.get('profile_image', DEFERRED)
+
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is not None and 'profile_image' in kwargs['update_fields']:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'profile_image_variants'}
+        super().save(*args, **kwargs)
+
 
 class Schedule(models.Model):
     SESSION_TYPES = (
@@ -161,6 +246,11 @@ class Schedule(models.Model):
     start_time = models.TimeField()
     end_time = models.TimeField()
     date = models.DateField(help_text="Date of this schedule item")
+    room = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Sessions in the same room may not overlap"
+    )
     
     
     # Speakers (many-to-many relationship)
@@ -229,6 +319,12 @@ class TicketTier(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # An event's tiers, by price (price range filters)
+            models.Index(fields=['event', 'price'], name='tickettier_event_price_idx'),
+        ]
+
     def __str__(self):
         return f'{self.event.title} - {self.name}'
 
@@ -244,8 +340,93 @@ class Coupon(models.Model):
     usage_limit = models.PositiveIntegerField(default=100)
     times_used = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            # Looking a code up at checkout
+            models.Index(fields=['event', 'code'], name='coupon_event_code_idx'),
+        ]
+
     def __str__(self):
         return self.code
 
 
+class EventAgenda(models.Model):
+    """
+    Pre-rendered agenda (days, sessions and deduplicated speakers) of an
+    event, rebuilt in the background whenever an EventDay, Schedule or
+    Speaker of the event changes. See organizers.agenda.
+    """
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, related_name='agenda')
+    document = models.JSONField(encoder=DjangoJSONEncoder, null=True, blank=True)
+    version = models.PositiveIntegerField(default=0, help_text="Version the stored document was built for")
+    requested_version = models.PositiveIntegerField(default=0, help_text="Bumped on every agenda change")
+    built_at = models.DateTimeField(null=True, blank=True)
+    queued_at = models.DateTimeField(null=True, blank=True, help_text="When the latest build was queued")
+
+    def __str__(self):
+        return f"Agenda for event {self.event_id} (v{self.version})"
+
+    @property
+    def is_stale(self):
+        return self.version < self.requested_version
+
+
+class ImageUpload(models.Model):
+    """
+    An event or speaker image staged on local disk until a worker stores
+    it and swaps it in (see organizers.uploads)
+    """
+    KINDS = (
+        ('event', 'Event'),
+        ('speaker', 'Speaker'),
+    )
+    STATUSES = (
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.CharField(max_length=64, help_text="Primary key of the event or speaker")
+    staged_file = models.FileField(storage=staging_storage, upload_to='images/', max_length=255)
+    # sha256 of the file, to deduplicate it once stored (see organizers.media)
+    content_hash = models.CharField(max_length=64, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    # Pending uploads are processed from then on; a worker pushes it ahead
+    # while it holds the upload
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    uploaded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='image_upload_due_idx'),
+            models.Index(fields=['kind', 'object_id'], name='image_upload_target_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} image ({self.status})"
+
+
+class MediaAsset(models.Model):
+    """
+    A stored image, registered by the hash of its content so identical
+    uploads reuse it. ref_count is the number of events and speakers
+    showing it; the asset is deleted when that drops to zero.
+    """
+    content_hash = models.CharField(max_length=64, unique=True)
+    # What the image fields of those rows hold
+    reference = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.reference} ({self.ref_count} uses)"
+
+
 # Create your models here.
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class SpeakerDirectoryPagination(CursorPagination):
+    """
+    Keyset pages over an organizer's speakers in name order, so deep pages
+    cost the same as the first one.
+    """
+    ordering = ('name', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
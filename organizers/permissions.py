@@ -1,6 +1,12 @@
 from rest_framework.permissions import BasePermission
 
 
+def request_role(request):
+    """The role claim of the request's token, or the user's role without one"""
+    token = request.auth
+    role = token.get('role') if hasattr(token, 'get') else None
+    return role if role is not None else request.user.role
+
 
 class IsOrganizer(BasePermission):
 
@@ -10,7 +16,7 @@ class IsOrganizer(BasePermission):
         return (
             request.user
             and request.user.is_authenticated
-            and request.user.role == "organizer"
+            and request_role(request) == "organizer"
         )
     
 class IsEventOrganizer(BasePermission):
@@ -4,6 +4,28 @@ from accounts.models import User
 from attendee.models import Ticket
 
 
+class VariantImageField(serializers.ImageField):
+    """
+    Image upload field that reads back as the original URL stored in the
+    model's `variants` field, so serializing doesn't build URLs per row
+    (falls back to building it for rows without stored variants)
+    """
+    def __init__(self, variants, **kwargs):
+        self.variants = variants
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        stored = getattr(instance, self.variants, None)
+        if stored:
+            return stored['original']['url']
+        return super().get_attribute(instance)
+
+    def to_representation(self, value):
+        if isinstance(value, str):
+            return value
+        return super().to_representation(value)
+
+
 class UserPublicSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -22,7 +44,8 @@ class TicketTierSerializer(serializers.ModelSerializer):
 class EventListSerializer(serializers.ModelSerializer):
     organizer = UserPublicSerializer(read_only=True)
     ticket_tiers = TicketTierSerializer(many=True, read_only=True)
-    image = serializers.ImageField()
+    image = VariantImageField(variants='image_variants')
+    image_variants = serializers.JSONField(read_only=True)
     min_price = serializers.SerializerMethodField()
     max_price = serializers.SerializerMethodField()
     available_tickets = serializers.SerializerMethodField()
@@ -36,7 +59,7 @@ class EventListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Event
         fields = [
-            'id', 'title', 'image',"short_description", 'description', 'category', 'organizer',
+            'id', 'title', 'image', 'image_variants', 'image_status', "short_description", 'description', 'category', 'organizer',
             'location', 'startDateTime', 'endDateTime', 
             'is_multi_day', 
             'status', 'ticket_tiers', 
@@ -104,16 +127,26 @@ class EventDaySerializer(serializers.ModelSerializer):
     
 class SpeakerSerializer(serializers.ModelSerializer):
     """Serializer for Speaker model"""
-    profile_image = serializers.ImageField(required=False, allow_null=True)
+    profile_image = VariantImageField(variants='profile_image_variants', required=False, allow_null=True)
+    profile_image_variants = serializers.JSONField(read_only=True)
     
     class Meta:
         model = Speaker
         fields = [
-            'id', 'name', 'title',  'profile_image',
+            'id', 'name', 'title',  'profile_image', 'profile_image_variants', 'profile_image_status',
             'email', 
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'profile_image_status', 'created_at', 'updated_at']
+
+
+class SpeakerDirectorySerializer(SpeakerSerializer):
+    """Speaker with the number of sessions and events they appear in"""
+    session_count = serializers.IntegerField(read_only=True, default=0)
+    event_count = serializers.IntegerField(read_only=True, default=0)
+
+    class Meta(SpeakerSerializer.Meta):
+        fields = SpeakerSerializer.Meta.fields + ['session_count', 'event_count']
 
 
 class ScheduleSerializer(serializers.ModelSerializer):
@@ -131,7 +164,7 @@ class ScheduleSerializer(serializers.ModelSerializer):
         model = Schedule
         fields = [
             'id', 'title', 'description', 'session_type',
-            'start_time', 'end_time', 'date',
+            'start_time', 'end_time', 'date', 'room',
             'speakers', 'speaker_ids', 'order', 
              'duration_minutes', 'event_day',
             'created_at', 'updated_at'
@@ -159,7 +192,15 @@ class ScheduleSerializer(serializers.ModelSerializer):
             )
         
         return data
-    
+
+    def create(self, validated_data):
+        """Create schedule with speakers"""
+        speaker_ids = validated_data.pop('speaker_ids', None)
+        schedule = super().create(validated_data)
+
+        if speaker_ids:
+            schedule.speakers.set(Speaker.objects.filter(id__in=speaker_ids))
+
         return schedule
     
     def update(self, instance, validated_data):
@@ -178,6 +219,57 @@ class ScheduleSerializer(serializers.ModelSerializer):
         
         return instance
 
+class BulkScheduleItemSerializer(serializers.ModelSerializer):
+    """
+    Field-level validation for one item of a bulk schedule import. Lookups
+    (event day, speakers, event date range) are checked set-wise for the
+    whole batch in organizers.bulk instead of per item.
+    """
+    event_day = serializers.UUIDField(required=False, allow_null=True)
+    speaker_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+    )
+
+    class Meta:
+        model = Schedule
+        fields = [
+            'title', 'description', 'session_type',
+            'start_time', 'end_time', 'date', 'room',
+            'speaker_ids', 'order', 'event_day',
+        ]
+
+    def validate(self, data):
+        if data['end_time'] <= data['start_time']:
+            raise serializers.ValidationError(
+                "End time must be after start time"
+            )
+        return data
+
+
+class ScheduleChangeSerializer(serializers.Serializer):
+    """
+    One item of a bulk reorder/reschedule. Only the given fields change;
+    cross-item checks (event range, event days, conflicts) happen in
+    organizers.bulk.
+    """
+    CHANGE_FIELDS = ('order', 'start_time', 'end_time', 'date', 'event_day')
+
+    id = serializers.UUIDField()
+    order = serializers.IntegerField(min_value=0, required=False)
+    start_time = serializers.TimeField(required=False)
+    end_time = serializers.TimeField(required=False)
+    date = serializers.DateField(required=False)
+    event_day = serializers.UUIDField(required=False, allow_null=True)
+
+    def validate(self, data):
+        if not any(field in data for field in self.CHANGE_FIELDS):
+            raise serializers.ValidationError(
+                f"At least one of {', '.join(self.CHANGE_FIELDS)} is required"
+            )
+        return data
+
+
 class SimpleEventDaySerializer(serializers.ModelSerializer):
     """EventDay serializer without neseted event to avoid circular queries"""
     class Meta:
@@ -194,12 +286,30 @@ class ScheduleListSerializer(serializers.ModelSerializer):
         model = Schedule
         fields = [
             'id', 'title', 'session_type', 'start_time','description','event_day',
-            'end_time',  'speakers',
+            'end_time', 'room', 'speakers',
              'order'
         ]
     
 
 
+class AgendaSessionSerializer(ScheduleListSerializer):
+    """Session fields stored in the agenda document; speakers are referenced by id"""
+    speakers = serializers.SerializerMethodField()
+
+    def get_speakers(self, obj):
+        return [str(speaker.id) for speaker in obj.agenda_speakers]
+
+
+class AgendaDaySerializer(serializers.ModelSerializer):
+    """EventDay fields stored in the agenda document (schedules are added separately)"""
+    class Meta:
+        model = EventDay
+        fields = [
+            'id', 'dayNumber', 'date', 'startTime', 'endTime',
+            'title', 'description', 'createdAt', 'updatedAt'
+        ]
+
+
 class EventDayWithScheduleSerializer(serializers.ModelSerializer):
     """EventDay serializer with nested schedules"""
     schedules = ScheduleListSerializer(many=True, read_only=True)
@@ -212,8 +322,8 @@ class EventDayWithScheduleSerializer(serializers.ModelSerializer):
         ]
 
 class EventDetailSerializer(EventListSerializer):
-    """Extended serializer with full schedule details"""
-    event_days = EventDayWithScheduleSerializer(many=True, read_only=True)
+    """Extended serializer with full schedule details, read from the agenda document"""
+    event_days = serializers.SerializerMethodField()
     # schedules = ScheduleListSerializer(many=True, read_only=True) # REMOVED: Redundant
     speakers = serializers.SerializerMethodField()
     is_saved = serializers.SerializerMethodField()
@@ -230,15 +340,17 @@ class EventDetailSerializer(EventListSerializer):
             return obj.saved_by.filter(user=user).exists()
         return False
 
-    def get_speakers(self, obj):
-        # Optimize: Avoid re-querying by using the pre-fetched schedules
-        # which already have speakers pre-fetched
-        unique_speakers = {}
-        
-        for schedule in obj.schedules.all():
-            for speaker in schedule.speakers.all():
-                if speaker.id not in unique_speakers:
-                    unique_speakers[speaker.id] = speaker
-                    
-        return SpeakerSerializer(unique_speakers.values(), many=True).data
+    def _agenda(self, obj):
+        from .agenda import get_agenda
 
+        agendas = self.context.setdefault('agendas', {})
+        if obj.id not in agendas:
+            agendas[obj.id] = get_agenda(obj.id)
+        return agendas[obj.id]
+
+    def get_event_days(self, obj):
+        return self._agenda(obj).days()
+
+    def get_speakers(self, obj):
+        # Deduplicated when the agenda document was built
+        return self._agenda(obj).speakers()
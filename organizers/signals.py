@@ -0,0 +1,72 @@
+from django.db.models import DEFERRED
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .agenda import request_rebuild
+from .days import reconcile_event_days
+from .media import release, stored_reference, track_image
+from .models import Event, EventDay, Schedule, Speaker
+
+
+def _speaker_event_ids(speaker_ids):
+    return set(
+        Schedule.objects.filter(speakers__in=speaker_ids).values_list('event_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Event)
+def sync_event_days(sender, instance, created, raw=False, **kwargs):
+    date_range = instance.date_range()
+    if raw or date_range is None:
+        return
+    if created or date_range != instance._loaded_date_range:
+        reconcile_event_days(instance)
+
+
+@receiver(post_save, sender=EventDay)
+@receiver(post_delete, sender=EventDay)
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def rebuild_agenda_for_event(sender, instance, **kwargs):
+    request_rebuild(instance.event_id)
+
+
+@receiver(post_save, sender=Speaker)
+@receiver(pre_delete, sender=Speaker)
+def rebuild_agendas_for_speaker(sender, instance, **kwargs):
+    # pre_delete: the schedule links are gone by the time post_delete runs
+    request_rebuild(*_speaker_event_ids([instance.pk]))
+
+
+@receiver(m2m_changed, sender=Schedule.speakers.through)
+def rebuild_agenda_for_speaker_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        request_rebuild(instance.event_id)
+    elif action == 'pre_clear':
+        request_rebuild(*_speaker_event_ids([instance.pk]))
+    else:
+        request_rebuild(*Schedule.objects.filter(id__in=pk_set).values_list('event_id', flat=True))
+
+
+# kind of row -> its image field, counted by the media registry
+IMAGE_FIELDS = {Event: 'image', Speaker: 'profile_image'}
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Speaker)
+def count_image_references(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        track_image(instance, IMAGE_FIELDS[sender], created, update_fields)
+
+
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Speaker)
+def release_image(sender, instance, **kwargs):
+    # What the deleted row held in the database, which is what was counted;
+    # the in-memory image may have been changed without being saved
+    field = IMAGE_FIELDS[sender]
+    loaded = getattr(instance, f'_loaded_{field}', None)
+    if loaded is not None and loaded is not DEFERRED:
+        release(stored_reference(instance, field, loaded))
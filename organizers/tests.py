@@ -1,3 +1,728 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+from datetime import time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Count, F
+from django.test import SimpleTestCase, TestCase, modify_settings, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from attendee.models import Order, Ticket
+from organizers.agenda import build_agenda, get_agenda, request_rebuild
+from organizers.conflicts import find_conflicts, overlapping_pairs
+from organizers.filters import SpeakerFilter, _prefix_bounds
+from organizers.management.commands._benchmark import create_event, create_organizer
+from organizers.media import LocalImageUploader, stored_reference
+from organizers.models import Event, EventAgenda, ImageUpload, MediaAsset, Schedule, Speaker, TicketTier
+from organizers.uploads import process_due_uploads, stage_image, sweep_staging
+from tixly.testing import EndpointBudgetTestCase
+
+
+class OrganizerBudgetTests(EndpointBudgetTestCase):
+    """An organizer's events and their attendees"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # The event most tickets were sold for, so attendee lists fill a page
+        cls.busy_event = Event.objects.annotate(sold=Count('tickets')).order_by('-sold').first()
+        cls.new_organizer = create_organizer()
+        create_event(cls.new_organizer, 'First event')
+
+    def test_organizer_events(self):
+        self.assertWithinBudget('/api/organizer/events/', user=self.data['organizer'], queries=3, p95_ms=100)
+
+    def test_organizer_events_query_count_is_independent_of_the_page(self):
+        self.assertConstantQueries('/api/organizer/events/', '/api/organizer/events/?page=2', user=self.data['organizer'])
+        self.assertEqual(
+            len(self.count_queries('/api/organizer/events/', self.data['organizer'])[0]),
+            len(self.count_queries('/api/organizer/events/', self.new_organizer)[0]),
+        )
+
+    def test_event_attendees(self):
+        self.assertWithinBudget(
+            f'/api/organizer/events/{self.busy_event.id}/attendees/', user=self.busy_event.organizer,
+            queries=3, p95_ms=25,
+        )
+
+    def test_event_attendees_by_name(self):
+        path = f'/api/organizer/events/{self.busy_event.id}/attendees/?name=attendee'
+        self.assertWithinBudget(path, user=self.busy_event.organizer, queries=3, p95_ms=25)
+        response = self.request(path, self.busy_event.organizer)
+        self.assertEqual(response.data['count'], self.busy_event.tickets.filter(is_paid=True).count())
+        self.assertEqual(self.request(f'{path}x', self.busy_event.organizer).data['count'], 0)
+
+    def test_event_attendees_by_email(self):
+        path = f'/api/organizer/events/{self.busy_event.id}/attendees/?email=bench-att'
+        self.assertWithinBudget(path, user=self.busy_event.organizer, queries=3, p95_ms=25)
+        response = self.request(path, self.busy_event.organizer)
+        self.assertEqual(response.data['count'], self.busy_event.tickets.filter(is_paid=True).count())
+        self.assertEqual(self.request(f'{path}x', self.busy_event.organizer).data['count'], 0)
+
+    def test_event_attendees_export(self):
+        self.assertWithinBudget(
+            f'/api/organizer/events/{self.busy_event.id}/attendees/export/', user=self.busy_event.organizer,
+            queries=3, p95_ms=25,
+        )
+
+    def test_speaker_directory(self):
+        self.assertWithinBudget(
+            '/api/organizer/speakers/directory/?search=spe', user=self.data['organizer'], queries=2, p95_ms=50
+        )
+
+
+# Silk would keep recording (and EXPLAINing) the queries of later suites
+@override_settings(ALLOWED_HOSTS=['testserver'], RATE_LIMIT_ENABLED=False)
+@modify_settings(MIDDLEWARE={'remove': ['silk.middleware.SilkyMiddleware']})
+class AttendeeExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.event = create_event(create_organizer(), 'Gala')
+        cls.tier = TicketTier.objects.create(
+            name='Regular', short_description='Regular', price=Decimal('10.00'), event=cls.event,
+            total_tickets=10, available_tickets=7, salesStart=timezone.now() - timedelta(days=1),
+            saleEnd=timezone.now() + timedelta(days=1),
+        )
+        cls.buyer = create_organizer()
+        cls.tickets = {}
+        for status, names in (('paid', ['Ada, "the first"', 'Grace']), ('pending', ['Unpaid'])):
+            order = Order.objects.create(
+                order_id=uuid.uuid4(), user=cls.buyer, event=cls.event, total_amount=cls.tier.price, status=status
+            )
+            for name in names:
+                cls.tickets[name] = Ticket.objects.create(
+                    order=order, event=cls.event, user=cls.buyer, ticket_tier=cls.tier, qr_code=uuid.uuid4(),
+                    attendee_name=name,
+                )
+
+    def export(self, query=''):
+        client = APIClient()
+        client.force_authenticate(self.event.organizer)
+        response = client.get(f'/api/organizer/events/{self.event.id}/attendees/export/{query}')
+        if response.streaming:
+            return response, b''.join(response.streaming_content).decode()
+        return response, None
+
+    def test_csv(self):
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn(f'filename="event-{self.event.id}-attendees.csv"', response['Content-Disposition'])
+        header, *rows = csv.reader(body.splitlines())
+        self.assertEqual(header, ['id', 'name', 'email', 'ticket_tier', 'status', 'created_at'])
+        ada = self.tickets['Ada, "the first"']
+        self.assertEqual(
+            sorted(rows),
+            sorted(
+                [str(ticket.id), ticket.attendee_name, self.buyer.email, 'Regular', 'unused', ticket.created_at.isoformat()]
+                for ticket in (ada, self.tickets['Grace'])
+            ),
+        )
+
+    def test_ndjson_with_selected_columns(self):
+        response, body = self.export('?export_format=ndjson&columns=name, qr_code,used_at')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertTrue(body.endswith('\n'))
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([list(row) for row in rows], [['name', 'qr_code', 'used_at']] * 2)
+        self.assertCountEqual(
+            rows,
+            [
+                {'name': ticket.attendee_name, 'qr_code': str(ticket.qr_code), 'used_at': None}
+                for ticket in (self.tickets['Ada, "the first"'], self.tickets['Grace'])
+            ],
+        )
+
+    def test_unpaid_tickets_are_left_out(self):
+        _, body = self.export('?columns=name')
+        self.assertNotIn('Unpaid', body)
+
+    def test_filters_apply(self):
+        _, body = self.export('?columns=name&name=gra')
+        self.assertEqual(body.splitlines(), ['name', 'Grace'])
+        _, body = self.export('?columns=name&email=BENCH-')
+        self.assertCountEqual(csv.reader(body.splitlines()), [['name'], ['Ada, "the first"'], ['Grace']])
+        _, body = self.export('?columns=name&email=bench-x')
+        self.assertEqual(body.splitlines(), ['name'])
+
+    def test_unknown_columns_are_rejected(self):
+        response, _ = self.export('?columns=name,password,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.data['error'].startswith('Unknown columns: password, secret.'))
+
+    def test_unknown_format_is_rejected(self):
+        response, _ = self.export('?export_format=xml')
+        self.assertEqual(response.status_code, 400)
+
+
+class AgendaBudgetTests(EndpointBudgetTestCase):
+    """Schedules and days of a multi-day event"""
+
+    def test_event_schedules(self):
+        self.assertWithinBudget(
+            f"/api/organizer/events/{self.data['agenda_event'].id}/schedules/", user=self.data['organizer'],
+            queries=1, p95_ms=25,
+        )
+
+    def test_event_schedules_by_date(self):
+        self.assertWithinBudget(
+            f"/api/organizer/events/{self.data['agenda_event'].id}/schedules/by-date/", user=self.data['organizer'],
+            queries=2, p95_ms=25,
+        )
+
+    def test_event_day_schedules(self):
+        day = self.data['agenda_event'].event_days.first()
+        self.assertWithinBudget(
+            f'/api/organizer/event-days/{day.id}/schedules/', user=self.data['organizer'], queries=2, p95_ms=25
+        )
+
+    def test_event_days(self):
+        self.assertWithinBudget(
+            f"/api/organizer/events/{self.data['agenda_event'].id}/days/", user=self.data['organizer'],
+            queries=1, p95_ms=25,
+        )
+
+    def test_schedule_conflicts(self):
+        self.assertWithinBudget(
+            f"/api/organizer/events/{self.data['agenda_event'].id}/schedules/conflicts/", user=self.data['organizer'],
+            queries=5, p95_ms=25,
+        )
+
+
+# Silk would keep recording (and EXPLAINing) the queries of later suites
+@override_settings(ALLOWED_HOSTS=['testserver'], AGENDA_BUILD_ASYNC=False, RATE_LIMIT_ENABLED=False)
+@modify_settings(MIDDLEWARE={'remove': ['silk.middleware.SilkyMiddleware']})
+class AgendaRebuildTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.event = create_event(create_organizer(), 'Conference', days=2)
+        build_agenda(cls.event.id)
+
+    def add_session(self, title):
+        day = self.event.event_days.first()
+        return Schedule.objects.create(
+            event=self.event, event_day=day, title=title, date=day.date, start_time=time(10), end_time=time(11)
+        )
+
+    def requested_version(self):
+        return EventAgenda.objects.get(event=self.event).requested_version
+
+    def test_changes_in_one_transaction_flush_once(self):
+        before = self.requested_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.add_session('Opening')
+            self.add_session('Closing')
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.requested_version(), before + 1)
+        self.assertEqual(
+            [session['title'] for session in EventAgenda.objects.get(event=self.event).document['sessions']],
+            ['Opening', 'Closing'],
+        )
+
+    def test_rolled_back_changes_request_nothing(self):
+        before = self.requested_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.add_session('Cancelled')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            request_rebuild()
+        self.assertEqual(self.requested_version(), before)
+
+    def test_missing_agenda_is_queued_not_built_on_read(self):
+        EventAgenda.objects.filter(event=self.event).delete()
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = APIClient().get(f'/api/organizer/events/{self.event.id}/days/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(len(callbacks), 1)
+
+        for callback in callbacks:
+            callback()
+        response = APIClient().get(f'/api/organizer/events/{self.event.id}/days/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+
+
+    def test_failed_build_is_requeued_once_overdue(self):
+        with mock.patch('organizers.agenda.render_document', side_effect=RuntimeError("Database went away")):
+            with self.assertLogs('organizers.agenda', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.add_session('Opening')
+        agenda = EventAgenda.objects.get(event=self.event)
+        self.assertTrue(agenda.is_stale)
+
+        # The build was queued moments ago, so a read doesn't queue another
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertFalse(get_agenda(self.event.id).pending)
+        self.assertEqual(callbacks, [])
+
+        EventAgenda.objects.update(queued_at=timezone.now() - timedelta(hours=1))
+        with self.assertLogs('organizers.agenda', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                get_agenda(self.event.id)
+                get_agenda(self.event.id)
+        self.assertEqual(len(callbacks), 1)
+        agenda.refresh_from_db()
+        self.assertFalse(agenda.is_stale)
+        self.assertEqual([session['title'] for session in agenda.document['sessions']], ['Opening'])
+
+    def test_missing_document_recovers(self):
+        EventAgenda.objects.update(document=None, queued_at=None)
+        client = APIClient()
+        client.force_authenticate(self.event.organizer)
+        path = f'/api/organizer/events/{self.event.id}/schedules/'
+        with self.assertLogs('organizers.agenda', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(client.get(path).status_code, 202)
+        self.assertEqual(client.get(path).status_code, 200)
+
+    def test_rebuild_agendas_sweeps_stale(self):
+        fresh = create_event(self.event.organizer, 'Meetup')
+        build_agenda(fresh.id)
+        EventAgenda.objects.filter(event=self.event).update(requested_version=F('requested_version') + 1)
+        out = StringIO()
+        call_command('rebuild_agendas', '--stale', stdout=out)
+        self.assertIn("Rebuilt 1 agenda(s)", out.getvalue())
+        self.assertFalse(EventAgenda.objects.get(event=self.event).is_stale)
+
+
+# Silk would keep recording (and EXPLAINing) the queries of later suites
+@override_settings(ALLOWED_HOSTS=['testserver'], AGENDA_BUILD_ASYNC=False, RATE_LIMIT_ENABLED=False)
+@modify_settings(MIDDLEWARE={'remove': ['silk.middleware.SilkyMiddleware']})
+class ScheduleBulkTestCase(TestCase):
+    """A two-day event and speakers of its organizer (and one of another)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        organizer = create_organizer()
+        cls.event = create_event(organizer, 'Conference', days=2)
+        cls.days = list(cls.event.event_days.order_by('date'))
+        cls.ada, cls.grace = (
+            Speaker.objects.create(name=name, title='Engineer', organizer=organizer) for name in ('Ada', 'Grace')
+        )
+        cls.stranger = Speaker.objects.create(name='Stranger', title='Engineer', organizer=create_organizer())
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.event.organizer)
+
+    def day(self, number):
+        return self.days[number - 1].date
+
+
+class BulkCreateSchedulesTests(ScheduleBulkTestCase):
+    def item(self, title, hour, room='Main', speakers=(), day=1):
+        return {
+            'title': title, 'date': self.day(day).isoformat(), 'start_time': f'{hour:02d}:00',
+            'end_time': f'{hour:02d}:50', 'room': room, 'speaker_ids': [str(speaker.id) for speaker in speakers],
+        }
+
+    def post(self, items, mode='best_effort'):
+        return self.client.post(
+            f'/api/organizer/events/{self.event.id}/schedules/bulk/', {'schedules': items, 'mode': mode}, format='json'
+        )
+
+    def error_indexes(self, response):
+        return [error['index'] for error in response.data['errors']]
+
+    def test_atomic_writes_nothing_if_an_item_fails(self):
+        invalid = {**self.item('Backwards', 11), 'end_time': '10:00'}
+        response = self.post([self.item('Opening', 9), invalid], mode='atomic')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.data['created'], self.error_indexes(response)), (0, [1]))
+        self.assertFalse(Schedule.objects.filter(event=self.event).exists())
+
+    def test_best_effort_writes_the_valid_items(self):
+        outside = self.item('Too late', 9, day=1) | {'date': (self.day(2) + timedelta(days=1)).isoformat()}
+        response = self.post([self.item('Opening', 9), outside, self.item('Day two', 9, day=2)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], self.error_indexes(response)), (2, [1]))
+        self.assertIn('date', response.data['errors'][0]['errors'])
+        self.assertEqual(
+            dict(Schedule.objects.filter(event=self.event).values_list('title', 'event_day')),
+            {'Opening': self.days[0].id, 'Day two': self.days[1].id},
+        )
+
+    def test_conflicts_within_the_batch(self):
+        response = self.post([
+            self.item('Keynote', 9, room='Main', speakers=[self.ada]),
+            self.item('Rival keynote', 9, room=' main ', speakers=[self.grace]),
+            self.item('Workshop', 10, room='Lab', speakers=[self.ada]),
+            self.item('Panel', 10, room='Hall', speakers=[self.ada]),
+            self.item('Late talk', 11, room='Main', speakers=[self.grace]),
+        ], mode='atomic')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.error_indexes(response), [0, 1, 2, 3])
+        kinds = {error['index']: {c['type'] for c in error['errors']['conflicts']} for error in response.data['errors']}
+        self.assertEqual(kinds, {0: {'room'}, 1: {'room'}, 2: {'speaker'}, 3: {'speaker'}})
+        self.assertEqual(response.data['errors'][2]['errors']['conflicts'][0]['conflicts_with'], 'item 3')
+        self.assertFalse(Schedule.objects.filter(event=self.event).exists())
+
+    def test_conflicts_with_existing_sessions(self):
+        self.assertEqual(self.post([self.item('Keynote', 9, speakers=[self.ada])]).status_code, 201)
+        response = self.post([self.item('Encore', 9, room='Lab', speakers=[self.ada])])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['errors']['conflicts'][0]['type'], 'speaker')
+
+    def test_unknown_and_foreign_speakers_are_rejected(self):
+        unknown = uuid.uuid4()
+        response = self.post([
+            self.item('Guest talk', 9, speakers=[self.stranger]),
+            self.item('Ghost talk', 10) | {'speaker_ids': [str(unknown)]},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.error_indexes(response), [0, 1])
+        self.assertEqual(response.data['errors'][0]['errors']['speaker_ids'], [f'Unknown speakers: {self.stranger.id}'])
+        self.assertEqual(response.data['errors'][1]['errors']['speaker_ids'], [f'Unknown speakers: {unknown}'])
+
+
+class BulkUpdateSchedulesTests(ScheduleBulkTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        build_agenda(cls.event.id)
+        cls.first, cls.second = (
+            Schedule.objects.create(
+                event=cls.event, event_day=cls.days[0], title=title, date=cls.days[0].date,
+                start_time=time(hour), end_time=time(hour, 50), room='Main', order=order,
+            )
+            for order, (title, hour) in enumerate((('Keynote', 10), ('Panel', 11)))
+        )
+        cls.second.speakers.add(cls.ada)
+
+    def patch(self, changes):
+        return self.client.patch(
+            f'/api/organizer/events/{self.event.id}/schedules/bulk-update/', {'schedules': changes}, format='json'
+        )
+
+    def slot(self, schedule):
+        schedule.refresh_from_db()
+        return schedule.date, schedule.start_time, schedule.event_day_id, schedule.order
+
+    def test_swap_two_sessions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.patch([
+                {'id': str(self.first.id), 'start_time': '11:00', 'end_time': '11:50', 'order': 1},
+                {'id': str(self.second.id), 'start_time': '10:00', 'end_time': '10:50', 'order': 0},
+            ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(self.slot(self.first), (self.day(1), time(11), self.days[0].id, 1))
+        self.assertEqual(self.slot(self.second), (self.day(1), time(10), self.days[0].id, 0))
+
+        agenda = EventAgenda.objects.get(event=self.event)
+        self.assertEqual(response.data['agenda_version'], agenda.requested_version)
+        self.assertEqual(agenda.version, agenda.requested_version)
+        self.assertEqual([session['title'] for session in agenda.document['sessions']], ['Panel', 'Keynote'])
+
+    def test_agenda_version_inside_an_outer_transaction(self):
+        before = EventAgenda.objects.get(event=self.event).requested_version
+        with transaction.atomic():
+            response = self.patch([{'id': str(self.first.id), 'order': 5}])
+        self.assertEqual(response.data['agenda_version'], before + 1)
+
+    def test_overlap_is_rejected(self):
+        response = self.patch([{'id': str(self.first.id), 'start_time': '11:30', 'end_time': '12:20'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['errors']['conflicts'][0]['type'], 'room')
+        self.assertEqual(self.slot(self.first), (self.day(1), time(10), self.days[0].id, 0))
+
+    def test_move_to_another_day_relinks_the_event_day(self):
+        response = self.patch([{'id': str(self.second.id), 'date': self.day(2).isoformat()}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.slot(self.second), (self.day(2), time(11), self.days[1].id, 1))
+
+    def test_duplicate_id_is_rejected(self):
+        response = self.patch([{'id': str(self.first.id), 'order': 3}, {'id': str(self.first.id), 'order': 4}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['errors'], [{'index': 1, 'errors': {'id': ['Schedule is changed more than once']}}]
+        )
+        self.assertEqual(self.slot(self.first)[3], 0)
+
+
+class OverlappingPairsTests(SimpleTestCase):
+    def test_pairs(self):
+        intervals = [(time(9), time(10), 'a'), (time(9, 30), time(11), 'b'), (time(10, 30), time(12), 'c')]
+        self.assertEqual(sorted(overlapping_pairs(intervals)), [('a', 'b'), ('b', 'c')])
+
+    def test_touching_intervals_do_not_overlap(self):
+        intervals = [(time(10), time(11), 'b'), (time(9), time(10), 'a'), (time(11), time(12), 'c')]
+        self.assertEqual(list(overlapping_pairs(intervals)), [])
+
+    def test_nested_intervals(self):
+        intervals = [(time(9), time(17), 'day'), (time(10), time(11), 'talk'), (time(13), time(14), 'lunch')]
+        self.assertEqual(sorted(overlapping_pairs(intervals)), [('day', 'lunch'), ('day', 'talk')])
+
+
+class ScheduleConflictTests(ScheduleBulkTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.keynote = cls.add_session(cls.event, 'Keynote', 10, room=' Main Hall ', speakers=[cls.ada])
+        cls.other_event = create_event(cls.event.organizer, 'Meetup')
+
+    @classmethod
+    def add_session(cls, event, title, hour, room='', speakers=()):
+        session = Schedule.objects.create(
+            event=event, title=title, date=cls.days[0].date, start_time=time(hour), end_time=time(hour, 50), room=room,
+        )
+        session.speakers.set(speakers)
+        return session
+
+    def test_rooms_match_ignoring_case_and_whitespace(self):
+        conflicts = find_conflicts(self.event.id, self.day(1), time(10, 30), time(11), room='main hall')
+        self.assertEqual(
+            [(conflict['type'], conflict['room'], conflict['conflicts_with']) for conflict in conflicts],
+            [('room', 'main hall', str(self.keynote.id))],
+        )
+        self.assertEqual(find_conflicts(self.event.id, self.day(1), time(10, 50), time(12), room='MAIN HALL'), [])
+        # Rooms are per event
+        self.assertEqual(find_conflicts(self.other_event.id, self.day(1), time(10), time(11), room='Main Hall'), [])
+
+    def test_create_rejects_a_room_conflict(self):
+        response = self.client.post(f'/api/organizer/events/{self.event.id}/schedules/create/', {
+            'title': 'Clash', 'date': self.day(1).isoformat(), 'start_time': '10:15', 'end_time': '10:45',
+            'room': 'MAIN HALL',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['conflicts'][0]['type'], 'room')
+
+    def test_speaker_double_booked_across_events(self):
+        conflicts = find_conflicts(
+            self.other_event.id, self.day(1), time(10, 30), time(11, 30), speaker_ids=[self.ada.id, self.grace.id]
+        )
+        self.assertEqual(
+            [(conflict['type'], conflict['speaker'], conflict['conflicts_with']) for conflict in conflicts],
+            [('speaker', str(self.ada.id), str(self.keynote.id))],
+        )
+
+    def test_conflicts_audit(self):
+        clash = self.add_session(self.event, 'Clash', 10, room='main hall')
+        elsewhere = self.add_session(self.other_event, 'Elsewhere', 10, room='Main Hall', speakers=[self.ada])
+        self.add_session(self.event, 'Later', 11, room='Main Hall', speakers=[self.ada])
+        self.add_session(self.other_event, 'Unrelated', 10, room='Main Hall', speakers=[self.grace])
+
+        response = self.client.get(f'/api/organizer/events/{self.event.id}/schedules/conflicts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['event_id'], response.data['count']), (self.event.id, 2))
+        self.assertCountEqual(
+            [
+                (conflict['type'], conflict[conflict['type']], conflict['date'], {conflict['schedule'], conflict['conflicts_with']})
+                for conflict in response.data['conflicts']
+            ],
+            [
+                ('room', 'main hall', self.day(1).isoformat(), {str(self.keynote.id), str(clash.id)}),
+                ('speaker', str(self.ada.id), self.day(1).isoformat(), {str(self.keynote.id), str(elsewhere.id)}),
+            ],
+        )
+
+
+class EventDayReconcileTests(TestCase):
+    """A three-day event re-dated, with sessions on its first and last day"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.event = create_event(create_organizer(), 'Festival', days=3)
+        first, _, last = cls.event.event_days.order_by('date')
+        cls.opening, cls.closing = (
+            Schedule.objects.create(
+                event=cls.event, event_day=day, title=title, date=day.date, start_time=time(10), end_time=time(11)
+            )
+            for title, day in (('Opening', first), ('Closing', last))
+        )
+
+    def setUp(self):
+        self.event.refresh_from_db()
+        self.days_before = {day.date: day.id for day in self.event.event_days.order_by('date')}
+        self.start = self.event.startDateTime.date()
+
+    def days(self):
+        return list(self.event.event_days.order_by('dayNumber').values_list('dayNumber', 'date', 'title', 'id'))
+
+    def day_of(self, session):
+        session.refresh_from_db()
+        return session.event_day_id
+
+    def test_lengthen(self):
+        self.event.endDateTime += timedelta(days=1)
+        self.event.save()
+        days = self.days()
+        self.assertEqual(
+            [(number, date, title) for number, date, title, _ in days],
+            [(n, self.start + timedelta(days=n - 1), f'Day {n}') for n in range(1, 5)],
+        )
+        self.assertEqual([day_id for *_, day_id in days[:3]], list(self.days_before.values()))
+
+    def test_shorten(self):
+        self.event.endDateTime -= timedelta(days=1)
+        self.event.save()
+        self.assertEqual([date for _, date, _, _ in self.days()], [self.start, self.start + timedelta(days=1)])
+        # The session stays, without a day
+        self.assertIsNone(self.day_of(self.closing))
+        self.assertEqual(self.day_of(self.opening), self.days_before[self.start])
+
+    def test_shift(self):
+        self.event.startDateTime += timedelta(days=1)
+        self.event.endDateTime += timedelta(days=1)
+        self.event.save()
+        days = self.days()
+        self.assertEqual(
+            [(number, date, title) for number, date, title, _ in days],
+            [(n, self.start + timedelta(days=n), f'Day {n}') for n in range(1, 4)],
+        )
+        # The days on dates the event still covers are kept and renumbered
+        self.assertEqual(
+            [day_id for *_, day_id in days[:2]],
+            [self.days_before[self.start + timedelta(days=1)], self.days_before[self.start + timedelta(days=2)]],
+        )
+        self.assertIsNone(self.day_of(self.opening))
+        self.assertEqual(self.day_of(self.closing), days[1][3])
+
+    def test_save_with_update_fields(self):
+        self.event.endDateTime -= timedelta(days=2)
+        self.event.save(update_fields=['endDateTime'])
+        self.event.refresh_from_db()
+        self.assertFalse(self.event.is_multi_day)
+        self.assertEqual(self.days(), [(1, self.start, 'Day 1', self.days_before[self.start])])
+        self.assertIsNone(self.day_of(self.closing))
+
+
+class FailingUploader(LocalImageUploader):
+    """An image store that is down"""
+
+    def upload(self, file, kind):
+        raise ConnectionError("Image store unavailable")
+
+
+@override_settings(
+    IMAGE_UPLOAD_BACKEND='organizers.media.LocalImageUploader', IMAGE_UPLOAD_ASYNC=False,
+    IMAGE_UPLOAD_MAX_ATTEMPTS=2, AGENDA_BUILD_ASYNC=False,
+)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.event = create_event(create_organizer(), 'Launch')
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings_override = override_settings(IMAGE_LOCAL_STORE_ROOT=os.path.join(root, 'images'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # The staging storage is built once, with the model
+        self.staging = FileSystemStorage(location=os.path.join(root, 'staging'))
+        patcher = mock.patch.object(ImageUpload._meta.get_field('staged_file'), 'storage', self.staging)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stage(self, content=b'png bytes', execute=True):
+        """Stage an image for the event in a transaction; returns the upload"""
+        with self.captureOnCommitCallbacks(execute=execute):
+            with transaction.atomic():
+                upload = stage_image(self.event, 'event', SimpleUploadedFile('poster.png', content))
+        return upload
+
+    def staged_files(self):
+        return self.staging.listdir('images')[1] if self.staging.exists('images') else []
+
+    def test_stage_upload_and_swap(self):
+        upload = self.stage()
+        self.event.refresh_from_db()
+        upload.refresh_from_db()
+        self.assertEqual((self.event.image_status, upload.status), ('ready', 'done'))
+        asset = MediaAsset.objects.get()
+        self.assertEqual(stored_reference(self.event, 'image'), asset.reference)
+        self.assertEqual(asset.ref_count, 1)
+        self.assertEqual(self.staged_files(), [])
+
+    @override_settings(IMAGE_UPLOAD_BACKEND='organizers.tests.FailingUploader')
+    def test_retry_with_backoff_then_give_up(self):
+        started = timezone.now()
+        with self.assertLogs('organizers.uploads', 'WARNING'):
+            upload = self.stage()
+        upload.refresh_from_db()
+        self.assertEqual((upload.status, upload.attempts), ('pending', 1))
+        self.assertGreaterEqual(upload.next_attempt_at, started + timedelta(seconds=30))
+        self.assertEqual(process_due_uploads(), (0, 0))
+
+        ImageUpload.objects.update(next_attempt_at=timezone.now())
+        with self.assertLogs('organizers.uploads', 'ERROR'):
+            self.assertEqual(process_due_uploads(), (1, 0))
+        upload.refresh_from_db()
+        self.event.refresh_from_db()
+        self.assertEqual((upload.status, upload.attempts, self.event.image_status), ('failed', 2, 'failed'))
+        self.assertEqual(self.staged_files(), [])
+
+    def test_superseded_upload_is_skipped(self):
+        first = self.stage(b'first', execute=False)
+        second = self.stage(b'second', execute=False)
+        self.assertEqual(process_due_uploads(), (2, 0))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('done', 'done'))
+        # Only the newer image was stored
+        self.assertEqual(MediaAsset.objects.get().ref_count, 1)
+        self.assertEqual(len(os.listdir(os.path.join(LocalImageUploader().storage.location, 'local', 'event'))), 1)
+
+    def test_rolled_back_staging_is_swept(self):
+        kept = self.stage(execute=False)
+        try:
+            with transaction.atomic():
+                stage_image(self.event, 'event', SimpleUploadedFile('poster.png', b'rolled back'))
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(len(self.staged_files()), 2)
+
+        self.assertEqual(sweep_staging(), 0)
+        self.assertEqual(sweep_staging(older_than=timedelta(0)), 1)
+        self.assertEqual(self.staged_files(), [os.path.basename(kept.staged_file.name)])
+
+
+class PrefixBoundsTests(SimpleTestCase):
+    def test_bounds(self):
+        self.assertEqual(_prefix_bounds('spe'), ('SPE', 'SPF'))
+
+    def test_highest_code_point(self):
+        top = chr(sys.maxunicode)
+        self.assertEqual(_prefix_bounds(f'a{top}'), (f'A{top}', 'B'))
+        self.assertEqual(_prefix_bounds(top), (top, None))
+
+    def test_skips_surrogates(self):
+        self.assertEqual(_prefix_bounds('\ud7ff'), ('\ud7ff', '\ue000'))
+
+
+class SpeakerSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = create_organizer()
+        for name, title in (('Ada Lovelace', 'Analyst'), ('Émile Zola', 'Écrivain'), ('Zed Shaw', 'Author')):
+            Speaker.objects.create(name=name, title=title, organizer=cls.organizer)
+
+    def search(self, value):
+        speakers = SpeakerFilter({'search': value}, queryset=Speaker.objects.filter(organizer=self.organizer)).qs
+        return sorted(speaker.name for speaker in speakers)
+
+    def test_ascii_prefix_is_case_insensitive(self):
+        self.assertEqual(self.search('ada'), ['Ada Lovelace'])
+        self.assertEqual(self.search('AU'), ['Zed Shaw'])
+        self.assertEqual(self.search('z'), ['Zed Shaw'])
+
+    def test_non_ascii_prefix(self):
+        self.assertEqual(self.search('Émile'), ['Émile Zola'])
+        self.assertEqual(self.search(chr(sys.maxunicode)), [])
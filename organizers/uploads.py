@@ -0,0 +1,289 @@
+"""
+Background upload of event and speaker images.
+
+Creating or updating an event or speaker with an image no longer uploads
+it to Cloudinary inside the request. The file is streamed to local
+staging (IMAGE_STAGING_ROOT) as an ImageUpload, and the row is saved
+without it, with its image status 'pending'. Once the transaction
+commits, a background thread uploads the file through
+IMAGE_UPLOAD_BACKEND and swaps the stored reference in. The status then
+becomes 'ready'.
+
+A failed upload is retried with exponential backoff by the
+process_image_uploads worker. After IMAGE_UPLOAD_MAX_ATTEMPTS the image
+status becomes 'failed'. Staged files whose transaction rolled back are
+swept by the same worker. Images already stored are reused instead of
+being staged and uploaded again (see organizers.media).
+"""
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import media
+from .media import content_hash, get_uploader
+from .models import Event, ImageUpload, MediaAsset, Speaker
+
+logger = logging.getLogger(__name__)
+
+# kind -> (model, image field, image status field)
+TARGETS = {
+    'event': (Event, 'image', 'image_status'),
+    'speaker': (Speaker, 'profile_image', 'profile_image_status'),
+}
+
+
+# ============ STAGING ============
+
+def stage_image(instance, kind, file):
+    """
+    Stage an uploaded file as the new image of an event or speaker and mark
+    it pending. The upload starts when the current transaction commits.
+    """
+    model, field, status_field = TARGETS[kind]
+    upload = ImageUpload(
+        kind=kind, object_id=str(instance.pk), content_hash=content_hash(file), next_attempt_at=timezone.now()
+    )
+    extension = os.path.splitext(file.name)[1].lower()
+    # Written in chunks, never read into memory as a whole
+    upload.staged_file.save(f'{upload.id.hex}{extension}', file, save=False)
+    upload.save()
+    model.objects.filter(pk=instance.pk).update(**{status_field: 'pending'})
+    setattr(instance, status_field, 'pending')
+    transaction.on_commit(lambda: _submit(upload.id))
+    return upload
+
+
+def save_with_staged_image(serializer, kind, **kwargs):
+    """
+    serializer.save(**kwargs), except that an uploaded image file is
+    staged instead of being uploaded during the save, or not even staged
+    if the same image is stored already
+    """
+    model, field, status_field = TARGETS[kind]
+    file = serializer.validated_data.get(field)
+    if not isinstance(file, UploadedFile):
+        return serializer.save(**kwargs)
+
+    staged = None
+    try:
+        with transaction.atomic():
+            asset = media.find(content_hash(file))
+            if asset is not None:
+                serializer.validated_data[field] = asset.reference
+                instance = serializer.save(**{status_field: 'ready'}, **kwargs)
+                # Recorded, so uploads staged earlier for the row are superseded
+                ImageUpload.objects.create(
+                    kind=kind, object_id=str(instance.pk), content_hash=asset.content_hash, status='done',
+                    next_attempt_at=timezone.now(), uploaded_at=timezone.now(),
+                )
+                return instance
+
+            if serializer.instance is None:
+                # New rows have no image until the upload is swapped in
+                serializer.validated_data[field] = ''
+            else:
+                # Existing rows keep theirs meanwhile
+                del serializer.validated_data[field]
+            instance = serializer.save(**kwargs)
+            staged = stage_image(instance, kind, file)
+    except Exception:
+        # Rolled back; a rollback of an enclosing transaction leaves the
+        # file to sweep_staging
+        if staged is not None:
+            staged.staged_file.delete(save=False)
+        raise
+    return instance
+
+
+# ============ PROCESSING ============
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _run(upload_id):
+    close_old_connections()
+    try:
+        upload = ImageUpload.objects.filter(id=upload_id).first()
+        if upload is not None:
+            process_upload(upload)
+    except Exception:
+        logger.exception("Image upload %s failed", upload_id)
+    finally:
+        close_old_connections()
+
+
+def _submit(upload_id):
+    global _executor
+    if not settings.IMAGE_UPLOAD_ASYNC:
+        _run(upload_id)
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-upload')
+    _executor.submit(_run, upload_id)
+
+
+def retry_delay(attempts):
+    """Wait before the next attempt after `attempts` failed ones"""
+    return min(settings.IMAGE_UPLOAD_RETRY_DELAY * 2 ** (attempts - 1), settings.IMAGE_UPLOAD_MAX_RETRY_DELAY)
+
+
+def claim(upload):
+    """
+    Lease a due, pending upload to this thread; False if it isn't due or
+    another worker got it first
+    """
+    now = timezone.now()
+    lease_until = now + settings.IMAGE_UPLOAD_LEASE
+    claimed = ImageUpload.objects.filter(
+        id=upload.id, status='pending', next_attempt_at=upload.next_attempt_at, next_attempt_at__lte=now
+    ).update(next_attempt_at=lease_until)
+    if claimed:
+        upload.next_attempt_at = lease_until
+    return bool(claimed)
+
+
+def _superseded(upload):
+    return ImageUpload.objects.filter(
+        kind=upload.kind, object_id=upload.object_id, created_at__gt=upload.created_at
+    ).exists()
+
+
+def process_upload(upload, uploader=None):
+    """
+    Upload a staged image and swap it in. Returns True when the upload is
+    finished (stored, superseded or given up on), False if it will be
+    retried or wasn't claimed.
+    """
+    if not claim(upload):
+        return False
+    model, field, status_field = TARGETS[upload.kind]
+    uploader = uploader or get_uploader()
+
+    if _superseded(upload):
+        # A newer image for the same row is on its way; skip the upload
+        stored = None
+    else:
+        try:
+            stored = _store(upload, uploader)
+        except Exception as error:
+            return _failed(upload, error)
+
+    retry = False
+    with transaction.atomic():
+        instance = model.objects.select_for_update().filter(pk=upload.object_id).first()
+        if stored is not None:
+            digest, reference, uploaded = stored
+            if instance is None or _superseded(upload):
+                # Nothing to show it on anymore
+                if uploaded:
+                    transaction.on_commit(lambda: media.delete_stored(reference))
+            elif not uploaded and media.find(digest) is None:
+                # The stored copy it was going to reuse was deleted meanwhile
+                retry = True
+            else:
+                if uploaded:
+                    # Registered in the transaction that makes the row show
+                    # it, so no other upload of the same image ever sees the
+                    # asset unused (and collects it) in between
+                    reference = media.register(digest, reference, upload.staged_file.size, uploader)
+                setattr(instance, field, reference)
+                setattr(instance, status_field, 'ready')
+                # Saved (not updated) so the variants and signals follow
+                instance.save(update_fields=[field, status_field, 'updated_at'])
+        if not retry:
+            upload.status = 'done'
+            upload.uploaded_at = timezone.now()
+            upload.save(update_fields=['status', 'uploaded_at'])
+
+    if retry:
+        return _failed(upload, RuntimeError("The stored image it matched was deleted"))
+    upload.staged_file.delete(save=False)
+    return True
+
+
+def _store(upload, uploader):
+    """
+    (content hash, reference, uploaded) of the staged image: the
+    registered copy's reference if there is one, else that of a new
+    upload, registered by process_upload once it is swapped in
+    """
+    digest = upload.content_hash
+    if not digest:
+        hasher = hashlib.sha256()
+        with upload.staged_file.open('rb') as file:
+            for chunk in file.chunks():
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+
+    registered = MediaAsset.objects.filter(content_hash=digest).values_list('reference', flat=True).first()
+    if registered is not None:
+        return digest, registered, False
+    with upload.staged_file.open('rb') as file:
+        return digest, uploader.upload(file, upload.kind), True
+
+
+def _failed(upload, error):
+    upload.attempts += 1
+    upload.last_error = f"{type(error).__name__}: {error}"
+    if upload.attempts < settings.IMAGE_UPLOAD_MAX_ATTEMPTS:
+        logger.warning("Upload of %s %s image failed, retrying: %s", upload.kind, upload.object_id, upload.last_error)
+        upload.next_attempt_at = timezone.now() + retry_delay(upload.attempts)
+        upload.save(update_fields=['attempts', 'last_error', 'next_attempt_at'])
+        return False
+
+    logger.error("Giving up on %s %s image: %s", upload.kind, upload.object_id, upload.last_error)
+    model, field, status_field = TARGETS[upload.kind]
+    with transaction.atomic():
+        upload.status = 'failed'
+        upload.save(update_fields=['status', 'attempts', 'last_error'])
+        if not _superseded(upload):
+            model.objects.filter(pk=upload.object_id).update(**{status_field: 'failed'})
+    upload.staged_file.delete(save=False)
+    return True
+
+
+def sweep_staging(older_than=None):
+    """
+    Delete staged files no upload refers to, left by transactions that
+    rolled back after staging them. Only files older than `older_than`
+    (IMAGE_STAGING_ORPHAN_AGE) are looked at, so transactions still in
+    flight keep theirs. Returns how many were deleted.
+    """
+    storage = ImageUpload._meta.get_field('staged_file').storage
+    cutoff = timezone.now() - (older_than if older_than is not None else settings.IMAGE_STAGING_ORPHAN_AGE)
+    try:
+        _, files = storage.listdir('images')
+    except FileNotFoundError:
+        return 0
+    names = [f'images/{name}' for name in files if storage.get_modified_time(f'images/{name}') < cutoff]
+
+    deleted = 0
+    for start in range(0, len(names), 500):
+        chunk = names[start:start + 500]
+        known = set(ImageUpload.objects.filter(staged_file__in=chunk).values_list('staged_file', flat=True))
+        for name in chunk:
+            if name not in known:
+                storage.delete(name)
+                deleted += 1
+    return deleted
+
+
+def process_due_uploads(limit=None):
+    """Process pending uploads whose (re)try is due; returns (finished, failed) counts"""
+    due = ImageUpload.objects.filter(status='pending', next_attempt_at__lte=timezone.now()).order_by('next_attempt_at')
+    finished = failed = 0
+    for upload in due[:limit or settings.IMAGE_UPLOAD_BATCH_SIZE]:
+        if process_upload(upload):
+            finished += 1
+        elif upload.attempts:
+            failed += 1
+    return finished, failed
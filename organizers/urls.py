@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import CreateEvent,UpdateEvent,DeleteEvent,OrganizerEvents,EventAttendees,CreateTicketTiers,UpdateTicketTier,DeleteTicketTier
+from .views import CreateEvent,UpdateEvent,DeleteEvent,OrganizerEvents,EventAttendees,EventAttendeesExport,CreateTicketTiers,UpdateTicketTier,DeleteTicketTier,BulkCreateSchedules,CreateSchedule,ScheduleDetail,EventScheduleConflicts,ListEventSchedules,EventSchedulesByDate,EventDaySchedules,ListEventDays,BulkUpdateSchedules,SpeakerDirectory
 
 urlpatterns = [
     path("create/event/",CreateEvent.as_view(),name="create-event"),
@@ -7,6 +7,17 @@ urlpatterns = [
     path("delete/event/<int:pk>/",DeleteEvent.as_view(),name="delete-event"),
     path("events/",OrganizerEvents.as_view(),name="events"),
     path("events/<int:pk>/attendees/",EventAttendees.as_view(),name="event-attendees"),
+    path("events/<int:pk>/attendees/export/",EventAttendeesExport.as_view(),name="event-attendees-export"),
     path("events/ticket-tiers/update/<int:pk>/",UpdateTicketTier.as_view(),name="event-ticket-tiers"),
     path("events/ticket-tiers/delete/<int:pk>/",DeleteTicketTier.as_view(),name="event-ticket-tiers"),
+    path("events/<int:event_id>/schedules/",ListEventSchedules.as_view(),name="event-schedules"),
+    path("events/<int:event_id>/schedules/by-date/",EventSchedulesByDate.as_view(),name="event-schedules-by-date"),
+    path("events/<int:event_id>/days/",ListEventDays.as_view(),name="event-days"),
+    path("event-days/<uuid:event_day_id>/schedules/",EventDaySchedules.as_view(),name="event-day-schedules"),
+    path("events/<int:event_id>/schedules/create/",CreateSchedule.as_view(),name="create-schedule"),
+    path("events/<int:event_id>/schedules/bulk/",BulkCreateSchedules.as_view(),name="bulk-create-schedules"),
+    path("events/<int:event_id>/schedules/bulk-update/",BulkUpdateSchedules.as_view(),name="bulk-update-schedules"),
+    path("events/<int:event_id>/schedules/conflicts/",EventScheduleConflicts.as_view(),name="schedule-conflicts"),
+    path("speakers/directory/",SpeakerDirectory.as_view(),name="speaker-directory"),
+    path("schedules/<uuid:pk>/",ScheduleDetail.as_view(),name="schedule-detail"),
 ]
\ No newline at end of file
@@ -13,9 +13,24 @@ from .models import Event, TicketTier, Speaker, Schedule, EventDay
 from .serializers import (
     EventCreateSerializer, EventListSerializer, EventDetailSerializer,
     TicketTierSerializer, SpeakerSerializer, ScheduleSerializer,
-    ScheduleListSerializer, EventDayWithScheduleSerializer
+    ScheduleListSerializer, EventDayWithScheduleSerializer, SpeakerDirectorySerializer
 )
-from django.db.models import Prefetch
+from django.db import transaction
+from django.db.models import Count
+from django.http import StreamingHttpResponse
+from django_filters.rest_framework import DjangoFilterBackend
+from .exports import EXPORT_FORMATS, parse_columns
+from .filters import AttendeeFilter, SpeakerFilter
+from .pagination import SpeakerDirectoryPagination
+from .bulk import (
+    ATOMIC, BEST_EFFORT, BULK_MODES, create_schedules, update_schedules,
+    validate_schedule_batch, validate_schedule_changes,
+)
+from .conflicts import event_conflicts, find_conflicts
+from .agenda import get_agenda
+from .uploads import save_with_staged_image
+from rest_framework.exceptions import ValidationError
+from tixly.db import ReplicaReadMixin
 
 
 class CreateEvent(generics.CreateAPIView):
@@ -24,7 +39,7 @@ class CreateEvent(generics.CreateAPIView):
     permission_classes = [IsOrganizer]
 
     def perform_create(self, serializer):
-        serializer.save(organizer=self.request.user)
+        save_with_staged_image(serializer, 'event', organizer=self.request.user)
 
 class UpdateEvent(generics.UpdateAPIView):
     queryset = Event.objects.all()
@@ -37,6 +52,9 @@ class UpdateEvent(generics.UpdateAPIView):
         kwargs['partial'] = True
         return super().update(request, *args, **kwargs)
 
+    def perform_update(self, serializer):
+        save_with_staged_image(serializer, 'event')
+
 class DeleteEvent(generics.DestroyAPIView):
     queryset = Event.objects.all()
     serializer_class = EventCreateSerializer
@@ -50,11 +68,17 @@ class OrganizerEvents(generics.ListAPIView):
 
     def get_queryset(self):
         organizer = self.request.user
-        return Event.objects.filter(organizer=organizer)
+        return Event.objects.filter(organizer=organizer).select_related(
+            'organizer'
+        ).prefetch_related(
+            'ticket_tiers'
+        ).order_by('id')
 
 class EventAttendees(generics.ListAPIView):
     serializer_class = AttendeeSerializer
     permission_classes = [IsOrganizer, IsEventOrganizer]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AttendeeFilter
 
     def get_queryset(self):
         event_id = self.kwargs.get("pk")
@@ -64,16 +88,52 @@ class EventAttendees(generics.ListAPIView):
         # Object-level permission check
         self.check_object_permissions(self.request, event)
 
+        # is_paid mirrors order.status so the listing stays on the
+        # (event, is_paid, created_at) index instead of joining Order per row
         return (
             Ticket.objects
             .filter(
-                order__event=event,
-                order__status="paid",
+                event=event,
+                is_paid=True,
             )
             .select_related("user", "ticket_tier", "order")
             .order_by("-created_at")
         )
-        
+
+
+class EventAttendeesExport(EventAttendees):
+    """
+    Stream the full attendee list of an event as CSV or NDJSON.
+
+    Query params: export_format (csv|ndjson, default csv), columns
+    (comma-separated, see organizers.exports.ATTENDEE_EXPORT_COLUMNS) and
+    the same search filters as EventAttendees.
+    """
+    chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"export_format must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            columns = parse_columns(request.query_params.get('columns'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream, content_type = EXPORT_FORMATS[export_format]
+        tickets = self.filter_queryset(self.get_queryset()).iterator(chunk_size=self.chunk_size)
+
+        response = StreamingHttpResponse(stream(tickets, columns), content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="event-{self.kwargs.get("pk")}-attendees.{export_format}"'
+        )
+        return response
+
+
 class CreateTicketTiers(generics.CreateAPIView):
     serializer_class = TicketTierSerializer
     permission_classes = [IsOrganizer]
@@ -122,7 +182,7 @@ class CreateSpeaker(generics.CreateAPIView):
     permission_classes = [IsOrganizer]
     
     def perform_create(self, serializer):
-        serializer.save(organizer=self.request.user)
+        save_with_staged_image(serializer, 'speaker', organizer=self.request.user)
 
 
 class ListSpeakers(generics.ListAPIView):
@@ -136,6 +196,40 @@ class ListSpeakers(generics.ListAPIView):
         ).order_by('-created_at')
 
 
+class SpeakerDirectory(generics.ListAPIView):
+    """
+    The organizer's speakers in name order, with how many sessions and
+    events each appears in. ?search= is a case-insensitive prefix match on
+    name or title. Cursor-paginated.
+    """
+    serializer_class = SpeakerDirectorySerializer
+    permission_classes = [IsOrganizer]
+    pagination_class = SpeakerDirectoryPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = SpeakerFilter
+
+    def get_queryset(self):
+        return Speaker.objects.filter(organizer=self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+
+        # Counts for the page only, in one grouped query over the link table
+        counts = {
+            row['speaker_id']: row
+            for row in Schedule.speakers.through.objects
+            .filter(speaker_id__in=[speaker.id for speaker in page])
+            .values('speaker_id')
+            .annotate(session_count=Count('schedule_id'), event_count=Count('schedule__event_id', distinct=True))
+        } if page else {}
+        for speaker in page:
+            row = counts.get(speaker.id, {})
+            speaker.session_count = row.get('session_count', 0)
+            speaker.event_count = row.get('event_count', 0)
+
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+
 class SpeakerDetail(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a speaker"""
     serializer_class = SpeakerSerializer
@@ -150,40 +244,74 @@ class SpeakerDetail(generics.RetrieveUpdateDestroyAPIView):
         kwargs['partial'] = True
         return super().update(request, *args, **kwargs)
 
+    def perform_update(self, serializer):
+        save_with_staged_image(serializer, 'speaker')
+
 
 # ============ SCHEDULE VIEWS ============
 
+def agenda_response(agenda, response):
+    """202 Accepted while the agenda the response was read from is still being built"""
+    if agenda is not None and agenda.pending:
+        response.status_code = status.HTTP_202_ACCEPTED
+    return response
+
+
+def check_schedule_conflicts(event_id, data, instance=None):
+    """
+    Raise a 400 if the schedule would overlap a room or speaker booking.
+    Call it in the transaction that saves the schedule: it locks the event
+    row, so concurrent writes to the event's schedule are checked (and
+    saved) one after another.
+    """
+    Event.objects.select_for_update().filter(id=event_id).values_list('id', flat=True).first()
+
+    def value(field, default=None):
+        if field in data:
+            return data[field]
+        return getattr(instance, field) if instance is not None else default
+
+    speaker_ids = data.get('speaker_ids')
+    if speaker_ids is None and instance is not None:
+        speaker_ids = [speaker.id for speaker in instance.speakers.all()]
+
+    conflicts = find_conflicts(
+        event_id,
+        value('date'), value('start_time'), value('end_time'),
+        room=value('room', ''),
+        speaker_ids=speaker_ids or (),
+        exclude_id=instance.id if instance is not None else None,
+    )
+    if conflicts:
+        raise ValidationError({'conflicts': conflicts})
+
+
 class CreateSchedule(generics.CreateAPIView):
     """Create a schedule item for an event"""
     serializer_class = ScheduleSerializer
-    permission_classes = [IsEventOrganizer]
+    permission_classes = [IsOrganizer, IsEventOrganizer]
     
     def perform_create(self, serializer):
         event_id = self.kwargs.get('event_id')
         event = get_object_or_404(Event, id=event_id)
-        
-        # # Check if user is the event organizer
-        # if event.organizer != self.request.user:
-        #     from rest_framework.exceptions import PermissionDenied
-        #     raise PermissionDenied("You don't have permission to add schedule to this event")
-        
-        serializer.save(event=event)
+        self.check_object_permissions(self.request, event)
+
+        with transaction.atomic():
+            check_schedule_conflicts(event.id, serializer.validated_data)
+            serializer.save(event=event)
 
 
-class ListEventSchedules(generics.ListAPIView):
-    """List all schedules for an event"""
+class ListEventSchedules(ReplicaReadMixin, generics.ListAPIView):
+    """List all schedules for an event, sliced from the agenda document"""
     serializer_class = ScheduleListSerializer
 
-    
-    def get_queryset(self):
-        event_id = self.kwargs.get('event_id')
-        return Schedule.objects.filter(
-            event_id=event_id
-        ).select_related(
-            'event', 'event_day'
-        ).prefetch_related(
-            'speakers'
-        ).order_by('date', 'start_time', 'order')
+    def list(self, request, *args, **kwargs):
+        agenda = get_agenda(self.kwargs.get('event_id'))
+        sessions = agenda.sessions()
+        page = self.paginate_queryset(sessions)
+        if page is not None:
+            return agenda_response(agenda, self.get_paginated_response(page))
+        return agenda_response(agenda, Response(list(sessions)))
 
 
 class ScheduleDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -202,19 +330,47 @@ class ScheduleDetail(generics.RetrieveUpdateDestroyAPIView):
         kwargs['partial'] = True
         return super().update(request, *args, **kwargs)
 
+    def perform_update(self, serializer):
+        instance = serializer.instance
+        with transaction.atomic():
+            check_schedule_conflicts(instance.event_id, serializer.validated_data, instance)
+            serializer.save()
+
+
+class EventScheduleConflicts(generics.GenericAPIView):
+    """
+    List every room overlap and speaker double-booking involving an event's
+    sessions (speaker bookings are checked across all events).
+    """
+    permission_classes = [IsOrganizer, IsEventOrganizer]
+
+    def get(self, request, event_id):
+        event = get_object_or_404(Event, id=event_id)
+        self.check_object_permissions(request, event)
+
+        conflicts = event_conflicts(event)
+        return Response({
+            'event_id': event.id,
+            'count': len(conflicts),
+            'conflicts': conflicts,
+        })
+
 
 class BulkCreateSchedules(generics.GenericAPIView):
-    """Bulk create multiple schedule items at once"""
+    """
+    Bulk create multiple schedule items at once.
+
+    The batch is validated set-wise against the event's dates, event days
+    and the organizer's speakers, then inserted with bulk_create. With
+    mode="atomic" nothing is created if any item is invalid; the default
+    mode="best_effort" creates the valid items and reports the rest.
+    """
     serializer_class = ScheduleSerializer
-    permission_classes = [IsEventOrganizer]
+    permission_classes = [IsOrganizer, IsEventOrganizer]
     
     def post(self, request, event_id):
         event = get_object_or_404(Event, id=event_id)
-        
-        # Check permission
-        # if event.organizer != self.request.user:
-        #     from rest_framework.exceptions import PermissionDenied
-        #     raise PermissionDenied("You don't have permission to add schedule to this event")
+        self.check_object_permissions(request, event)
         
         schedules_data = request.data.get('schedules', [])
         
@@ -223,20 +379,29 @@ class BulkCreateSchedules(generics.GenericAPIView):
                 {'error': 'schedules must be a list'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+        mode = request.data.get('mode', BEST_EFFORT)
+        if mode not in BULK_MODES:
+            return Response(
+                {'error': f"mode must be one of: {', '.join(BULK_MODES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
+        created = []
+        with transaction.atomic():
+            valid, errors = validate_schedule_batch(event, schedules_data)
+            if valid and not (errors and mode == ATOMIC):
+                created = create_schedules(event, valid)
+
         created_schedules = []
-        errors = []
-        
-        for idx, schedule_data in enumerate(schedules_data):
-            serializer = self.get_serializer(data=schedule_data)
-            if serializer.is_valid():
-                schedule = serializer.save(event=event)
-                created_schedules.append(serializer.data)
-            else:
-                errors.append({
-                    'index': idx,
-                    'errors': serializer.errors
-                })
+        if created:
+            # Re-read with speakers prefetched so serialization is two queries
+            by_id = Schedule.objects.prefetch_related('speakers').in_bulk(
+                [schedule.id for schedule in created]
+            )
+            created_schedules = self.get_serializer(
+                [by_id[schedule.id] for schedule in created], many=True
+            ).data
         
         response_data = {
             'created': len(created_schedules),
@@ -252,55 +417,73 @@ class BulkCreateSchedules(generics.GenericAPIView):
         )
 
 
-class EventSchedulesByDate(generics.GenericAPIView):
+class BulkUpdateSchedules(generics.GenericAPIView):
+    """
+    Reorder and reschedule many schedule items at once, e.g. after dragging
+    sessions around in the agenda editor.
+
+    Takes {"schedules": [{id, order, start_time, end_time, date, event_day}]}
+    (all but id optional). The changes are validated together and applied
+    in one bulk_update, or not at all. Returns the agenda version that will
+    include them.
+    """
+    permission_classes = [IsOrganizer, IsEventOrganizer]
+
+    def patch(self, request, event_id):
+        event = get_object_or_404(Event, id=event_id)
+        self.check_object_permissions(request, event)
+
+        changes = request.data.get('schedules', [])
+        if not isinstance(changes, list) or not changes:
+            return Response(
+                {'error': 'schedules must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            schedules, errors = validate_schedule_changes(event, changes)
+            if errors:
+                return Response({'updated': 0, 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+            agenda_version = update_schedules(event, schedules)
+        return Response({'updated': len(schedules), 'agenda_version': agenda_version})
+
+
+class EventSchedulesByDate(ReplicaReadMixin, generics.GenericAPIView):
     """Get event schedules grouped by date"""
     serializer_class = ScheduleListSerializer
 
     
     def get(self, request, event_id):
         event = get_object_or_404(Event, id=event_id)
-        
-        schedules = Schedule.objects.filter(
-            event=event
-        ).select_related(
-            'event', 'event_day'
-        ).prefetch_related(
-            'speakers'
-        ).order_by('date', 'start_time', 'order')
-        
-        # Group by date
-        schedules_by_date = {}
-        for schedule in schedules:
-            date_str = schedule.date.isoformat()
-            if date_str not in schedules_by_date:
-                schedules_by_date[date_str] = []
-            schedules_by_date[date_str].append(
-                self.get_serializer(schedule).data
-            )
-        
-        return Response({
+        agenda = get_agenda(event.id)
+
+        return agenda_response(agenda, Response({
             'event_id': event.id,
             'event_title': event.title,
             'start_date': event.startDateTime.date().isoformat() if event.startDateTime else None,
             'end_date': event.endDateTime.date().isoformat() if event.endDateTime else None,
             'is_multi_day': event.is_multi_day,
-            'schedules_by_date': schedules_by_date
-        })
+            'schedules_by_date': agenda.sessions_by_date()
+        }))
 
 
-class EventDaySchedules(generics.ListAPIView):
+class EventDaySchedules(ReplicaReadMixin, generics.ListAPIView):
     """Get schedules for a specific event day"""
     serializer_class = ScheduleListSerializer
     
-    def get_queryset(self):
+    def list(self, request, *args, **kwargs):
         event_day_id = self.kwargs.get('event_day_id')
-        return Schedule.objects.filter(
-            event_day_id=event_day_id
-        ).select_related(
-            'event', 'event_day'
-        ).prefetch_related(
-            'speakers'
-        ).order_by('start_time', 'order')
+        event_id = EventDay.objects.filter(id=event_day_id).values_list('event_id', flat=True).first()
+        if event_id is None:
+            agenda, sessions = None, []
+        else:
+            agenda = get_agenda(event_id)
+            sessions = agenda.day_sessions(event_day_id)
+
+        page = self.paginate_queryset(sessions)
+        if page is not None:
+            return agenda_response(agenda, self.get_paginated_response(page))
+        return agenda_response(agenda, Response(list(sessions)))
 
 
 # ============ EVENT DAY VIEWS (for multi-day events) ============
@@ -321,21 +504,18 @@ class CreateEventDay(generics.CreateAPIView):
         serializer.save(event=event)
 
 
-class ListEventDays(generics.ListAPIView):
+class ListEventDays(ReplicaReadMixin, generics.ListAPIView):
     """List all event days with their schedules"""
     serializer_class = EventDayWithScheduleSerializer
     permission_classes = []  # Public view
     
-    def get_queryset(self):
-        event_id = self.kwargs.get('event_id')
-        return EventDay.objects.filter(
-            event_id=event_id
-        ).prefetch_related(
-            Prefetch(
-                'schedules',
-                queryset=Schedule.objects.prefetch_related('speakers').order_by('start_time', 'order')
-            )
-        ).order_by('date', 'startTime')
+    def list(self, request, *args, **kwargs):
+        agenda = get_agenda(self.kwargs.get('event_id'))
+        days = agenda.days()
+        page = self.paginate_queryset(days)
+        if page is not None:
+            return agenda_response(agenda, self.get_paginated_response(page))
+        return agenda_response(agenda, Response(days))
 
 
 class EventDayDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -0,0 +1,104 @@
+"""
+Primary/replica database routing.
+
+Everything goes to the primary ('default') except the catalog reads of
+views that opt in with ReplicaReadMixin. Their queries are spread over
+DATABASE_REPLICAS. Replicas lag the primary, so a client that just wrote
+reads from the primary for REPLICA_PIN_SECONDS afterwards: its own new
+event or edit shows up right away. ReplicaPinningMiddleware pins the
+client after any successful unsafe request. It uses a cookie, plus a
+cache entry for the user, because token-authenticated clients may drop
+cookies. Within a request, reads also stay on the primary once
+something was written or inside a transaction.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_COOKIE = 'db_primary'
+
+# Whether reads in the current request may use a replica
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def _pin_key(user_id):
+    return f'db-primary:{user_id}'
+
+
+def is_pinned(request):
+    """Whether the client wrote recently enough that the replicas may not have caught up"""
+    if PIN_COOKIE in request.COOKIES:
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and cache.get(_pin_key(user.pk)))
+
+
+class PrimaryReplicaRouter:
+    """Sends the reads of replica-enabled views to a replica; everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Related objects come from where the object did
+            return instance._state.db
+        if not _replica_reads.get() or not settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        # Reads after a write in the same request see it
+        _replica_reads.set(False)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """
+    For read-only catalog views: safe requests read from a replica unless
+    the client is pinned to the primary. Authentication and permission
+    checks still read from the primary.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _replica_reads.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned(request):
+            _replica_reads.set(True)
+
+
+class ReplicaPinningMiddleware:
+    """Pins a client to the primary for REPLICA_PIN_SECONDS after it writes"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+            # DRF sets the user it authenticated on the underlying request
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                cache.set(_pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+        return response
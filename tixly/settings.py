@@ -11,9 +11,10 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 import os
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
     'accounts',
     'organizers',
     'attendee',
+    'analytics',
 
     # Third party apps
     'rest_framework',
@@ -79,7 +81,7 @@ DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'accounts.authentication.CookieJWTAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication'
+        'accounts.authentication.JWTAuthentication'
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -90,8 +92,15 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'accounts.throttling.PolicyThrottle',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Reverse proxies in front of the app. Client IPs (rate limits) come from
+    # X-Forwarded-For only past that many proxies; with 0, from REMOTE_ADDR,
+    # since clients can put anything in the header
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 0)),
 }
 
 
@@ -103,6 +112,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tixly.db.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'silk.middleware.SilkyMiddleware'
@@ -132,13 +142,74 @@ WSGI_APPLICATION = 'tixly.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Configured from the environment; SQLite in development. For PostgreSQL:
+# DB_ENGINE=django.db.backends.postgresql DB_NAME=... DB_HOST=...
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        'USER': os.getenv('DB_USER', ''),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', ''),
+        'PORT': os.getenv('DB_PORT', ''),
+        # Keep connections open between requests (seconds), checking them
+        # before reuse
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Connection pool per process instead of persistent connections
+# (PostgreSQL with psycopg 3 only): DB_POOL_MAX_SIZE=20
+if os.getenv('DB_POOL_MAX_SIZE'):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE')),
+            'timeout': 10,
+        },
+    }
+
+# Read replica for catalog reads (tixly.db), e.g. DB_REPLICA_HOST. To try
+# it with SQLite, copy the database and point DB_REPLICA_NAME at the copy:
+#   sqlite3 db.sqlite3 ".backup db.replica.sqlite3"
+#   DB_REPLICA_NAME=db.replica.sqlite3
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        # Tests use the primary's connection for it
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['tixly.db.PrimaryReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# Clients read from the primary for this long after they write, covering
+# replication lag (seconds)
+REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# Rate limit counters, cached token users and calendar feeds live here. Set
+# REDIS_URL to share it between processes; without it every process has
+# its own in-memory cache, so those are all per process
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -194,6 +265,8 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': True,
     
+    # Tokens are signed with the keys of accounts.keys (see JWT_* below);
+    # these only verify HS256 tokens issued before that
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'VERIFYING_KEY': None,
@@ -205,15 +278,110 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
     
-    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'AUTH_TOKEN_CLASSES': ('accounts.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
     
-    'TOKEN_OBTAIN_SERIALIZER': 'rest_framework_simplejwt.serializers.TokenObtainPairSerializer',
-    'TOKEN_REFRESH_SERIALIZER': 'rest_framework_simplejwt.serializers.TokenRefreshSerializer',
-    'TOKEN_VERIFY_SERIALIZER': 'rest_framework_simplejwt.serializers.TokenVerifySerializer',
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.TokenRefreshSerializer',
+    'TOKEN_VERIFY_SERIALIZER': 'accounts.serializers.TokenVerifySerializer',
     'TOKEN_BLACKLIST_SERIALIZER': 'rest_framework_simplejwt.serializers.TokenBlacklistSerializer',
 }
 
+# JWT Signing Keys (accounts.keys)
+# 'RS256' or 'EdDSA' (Ed25519); applies to keys created from then on.
+# RS256 signs slower but verifies faster, and every request verifies
+JWT_SIGNING_ALGORITHM = 'RS256'
+# Private keys are stored encrypted with this. Required outside DEBUG:
+# SECRET_KEY is committed, so it only stands in for development
+JWT_KEY_PASSWORD = os.getenv('JWT_KEY_PASSWORD')
+if not JWT_KEY_PASSWORD:
+    if not DEBUG:
+        raise ImproperlyConfigured("Set JWT_KEY_PASSWORD to encrypt the JWT signing keys with")
+    JWT_KEY_PASSWORD = SECRET_KEY
+# rotate_signing_keys replaces the signing key once it is this old...
+JWT_KEY_ROTATION_INTERVAL = timedelta(days=30)
+# ...publishing its successor this long before it starts signing (must
+# exceed JWKS_MAX_AGE + JWT_KEY_RING_REFRESH)
+JWT_KEY_PUBLISH_AHEAD = timedelta(hours=1)
+# Seconds each process keeps its parsed keys before reloading them
+JWT_KEY_RING_REFRESH = 60
+# Seconds clients may cache the JWKS
+JWKS_MAX_AGE = 60 * 15
+# Accept HS256 tokens without a kid (issued before asymmetric signing)
+# until this time, e.g. JWT_ACCEPT_HS256_UNTIL=2026-11-20 (UTC unless it
+# has an offset): the switch plus REFRESH_TOKEN_LIFETIME. Unset, they are
+# rejected
+JWT_ACCEPT_HS256_UNTIL = os.getenv('JWT_ACCEPT_HS256_UNTIL')
+if JWT_ACCEPT_HS256_UNTIL:
+    JWT_ACCEPT_HS256_UNTIL = datetime.fromisoformat(JWT_ACCEPT_HS256_UNTIL)
+    if JWT_ACCEPT_HS256_UNTIL.tzinfo is None:
+        JWT_ACCEPT_HS256_UNTIL = JWT_ACCEPT_HS256_UNTIL.replace(tzinfo=timezone.utc)
+
+# Seconds a token's user stays cached by accounts.authentication. Saves to
+# the user drop it right away in the same process, and everywhere when
+# CACHES is shared (REDIS_URL); otherwise other processes only see them
+# (a deactivation, a role change) after this long
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Blacklisted refresh-token JTIs each process remembers (accounts.tokens)
+TOKEN_BLACKLIST_CACHE_SIZE = 10000
+
+
+# Rate Limiting Settings (accounts.throttling; views declare `rate_limits`)
+# RATE_LIMIT_ENABLED=false turns limits off, e.g. for a server load_test runs against
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() != 'false'
+# 'shared' counts in the RATE_LIMIT_CACHE cache, 'local' in each process.
+# 'shared' is only shared between processes with REDIS_URL set (see CACHES);
+# otherwise every process counts on its own
+RATE_LIMIT_BACKEND = 'shared'
+RATE_LIMIT_CACHE = 'default'
+# Keys the 'local' backend holds per process before dropping the oldest
+RATE_LIMIT_LOCAL_MAX_KEYS = 100000
+
+
+# Analytics Settings
+# Per-minute sales buckets are kept this long, then only hourly/daily remain
+SALES_MINUTE_ROLLUP_RETENTION = timedelta(hours=48)
+
+
+# Agenda Settings
+# Rebuild agenda documents on a background thread after commit; set to False
+# to rebuild inline (tests, management commands)
+AGENDA_BUILD_ASYNC = True
+# A missing or stale document whose build was queued longer ago than this
+# (the build failed, or was lost with its worker) is queued again on read
+AGENDA_BUILD_TIMEOUT = timedelta(minutes=5)
+
+
+# Image Upload Settings
+# Event and speaker images are staged locally and stored by a background
+# upload (organizers.uploads) instead of inside the request
+IMAGE_UPLOAD_BACKEND = 'organizers.media.CloudinaryImageUploader'
+# Offline, without Cloudinary:
+# IMAGE_UPLOAD_BACKEND = 'organizers.media.LocalImageUploader'
+IMAGE_STAGING_ROOT = BASE_DIR / 'media' / 'staging'
+IMAGE_LOCAL_STORE_ROOT = BASE_DIR / 'media' / 'images'
+# Upload on a background thread after commit; set to False to upload inline
+IMAGE_UPLOAD_ASYNC = True
+# Failed uploads are retried by process_image_uploads after 30s, 1m,
+# 2m... (at most 30 minutes apart) and given up on after
+# IMAGE_UPLOAD_MAX_ATTEMPTS
+IMAGE_UPLOAD_RETRY_DELAY = timedelta(seconds=30)
+IMAGE_UPLOAD_MAX_RETRY_DELAY = timedelta(minutes=30)
+IMAGE_UPLOAD_MAX_ATTEMPTS = 6
+# How long an upload is held before another worker may take it over
+IMAGE_UPLOAD_LEASE = timedelta(minutes=5)
+IMAGE_UPLOAD_BATCH_SIZE = 20
+# Staged files no upload refers to (their transaction rolled back) are
+# deleted by process_image_uploads once they are this old
+IMAGE_STAGING_ORPHAN_AGE = timedelta(hours=1)
+# Django's default handlers, hashing uploads as they stream in so stored
+# images are deduplicated without reading them again (organizers.media)
+FILE_UPLOAD_HANDLERS = [
+    'organizers.media.HashingMemoryFileUploadHandler',
+    'organizers.media.HashingTemporaryFileUploadHandler',
+]
+
 
 # Djoser Settings
 DJOSER = {
@@ -280,11 +448,27 @@ CSRF_COOKIE_SAMESITE = 'Lax'
 # CSRF_COOKIE_SECURE = True
 # SESSION_COOKIE_SAMESITE = 'None'  # Required for cross-origin with secure=True
 
-# Email Settings (Development - prints to console)
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# Email Settings
+# Emails are queued and delivered by the send_queued_mail worker
+# (accounts.mail) through MAIL_QUEUE_DELIVERY_BACKEND
+EMAIL_BACKEND = 'accounts.mail.QueuedEmailBackend'
+
+# Development - prints to console
+MAIL_QUEUE_DELIVERY_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# Messages per batch, all sent over one connection
+MAIL_QUEUE_BATCH_SIZE = 50
+# Failed messages are retried after 1, 2, 4... minutes (at most an hour
+# apart) and given up on after MAIL_QUEUE_MAX_ATTEMPTS
+MAIL_QUEUE_RETRY_DELAY = timedelta(minutes=1)
+MAIL_QUEUE_MAX_RETRY_DELAY = timedelta(hours=1)
+MAIL_QUEUE_MAX_ATTEMPTS = 8
+# How long a worker holds a batch before other workers may take it over
+MAIL_QUEUE_LEASE = timedelta(minutes=5)
+# Sent messages are deleted after this long
+MAIL_QUEUE_KEEP_SENT = timedelta(days=7)
 
 # For Production - uncomment and configure:
-# EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# MAIL_QUEUE_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 # EMAIL_HOST = 'smtp.gmail.com'
 # EMAIL_PORT = 587
 # EMAIL_USE_TLS = True
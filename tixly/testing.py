@@ -0,0 +1,173 @@
+"""
+Query and latency budgets for the endpoint performance suites (the apps'
+tests.py).
+
+EndpointBudgetTestCase seeds a catalog once per test class and calls
+endpoints straight through their views, skipping the middleware: silk and
+the debug toolbar would add queries and time of their own. Each
+assertWithinBudget checks two things:
+
+- how many queries one cold request runs, which fails the test when it
+  goes past its budget
+- the p50/p95 latency over PERF_LATENCY_RUNS requests, which is only
+  recorded (and flagged in the report) unless PERF_ENFORCE_LATENCY=1
+
+An N+1 shows up as a count that grows with the page, so
+assertConstantQueries also compares the counts of pages with different
+contents.
+
+Latency depends on the machine and whatever else it is running, so it
+only fails tests where that is controlled (a dedicated perf job). The
+budgets are for a developer machine on SQLite; scale them with
+PERF_LATENCY_SCALE on slower hardware. Set PERF_REPORT to a path to
+write every measurement there as JSON.
+"""
+import json
+import os
+import statistics
+import sys
+import time
+import warnings
+
+import cloudinary
+from django.core.cache import cache
+from django.core.paginator import UnorderedObjectListWarning
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.test import force_authenticate
+
+from organizers.agenda import build_agenda
+from organizers.management.commands._benchmark import seed_catalog
+from organizers.models import Event
+
+LATENCY_RUNS = int(os.getenv('PERF_LATENCY_RUNS', 20))
+LATENCY_SCALE = float(os.getenv('PERF_LATENCY_SCALE', 1))
+ENFORCE_LATENCY = os.getenv('PERF_ENFORCE_LATENCY') == '1'
+REPORT = os.getenv('PERF_REPORT')
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    AGENDA_BUILD_ASYNC=False,
+    IMAGE_UPLOAD_ASYNC=False,
+    RATE_LIMIT_ENABLED=False,
+)
+class EndpointBudgetTestCase(TestCase):
+    # Passed to seed_catalog: enough rows that every list endpoint fills a page
+    dataset = {'events': 300, 'attendees': 40, 'agendas': 4, 'sessions': 20}
+
+    @classmethod
+    def setUpClass(cls):
+        # Serializers build image URLs, which needs a cloud name (no API calls)
+        cls._cloud_name = cloudinary.config().cloud_name
+        if not cls._cloud_name:
+            cloudinary.config(cloud_name='tixly-test')
+        cls.measurements = []
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cloudinary.config(cloud_name=cls._cloud_name)
+        cls.report()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_catalog(**cls.dataset)
+        # Agenda documents exist before anything reads them (as they do
+        # once the post-commit rebuilds have run)
+        agenda_events = set(Event.objects.filter(event_days__isnull=False).values_list('id', flat=True))
+        for event_id in agenda_events | {cls.data['event'].id}:
+            build_agenda(event_id)
+
+    def request(self, path, user=None, method='get', data=None, cookies=None):
+        with warnings.catch_warnings():
+            # Pages of an unordered queryset can repeat or skip rows
+            warnings.simplefilter('error', UnorderedObjectListWarning)
+            return self._request(path, user, method, data, cookies)
+
+    def _request(self, path, user, method, data, cookies):
+        factory = RequestFactory()
+        if method == 'get':
+            request = factory.get(path, data)
+        else:
+            request = getattr(factory, method)(path, data or {}, content_type='application/json')
+        request.COOKIES.update(cookies or {})
+        if user is not None:
+            force_authenticate(request, user=user)
+        match = resolve(request.path_info)
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def count_queries(self, path, user=None, method='get', data=None, cookies=None):
+        """(queries, response) of one request with cold caches"""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.request(path, user, method, data, cookies)
+        self.assertLess(
+            response.status_code, 400,
+            f"{method.upper()} {path} returned {response.status_code}: {getattr(response, 'data', '')}"
+        )
+        return queries.captured_queries, response
+
+    def assertWithinBudget(self, path, *, queries, p95_ms, user=None, method='get', data=None, runs=None):
+        captured, response = self.count_queries(path, user, method, data)
+
+        timings = []
+        for _ in range(runs or LATENCY_RUNS):
+            started = time.perf_counter()
+            self.request(path, user, method, data)
+            timings.append((time.perf_counter() - started) * 1000)
+        p50 = statistics.median(timings)
+        p95 = statistics.quantiles(timings, n=20, method='inclusive')[-1] if len(timings) > 1 else timings[0]
+        p95_budget = p95_ms * LATENCY_SCALE
+        self.measurements.append({
+            'test': self.id(), 'method': method.upper(), 'path': path,
+            'queries': len(captured), 'query_budget': queries,
+            'p50_ms': round(p50, 2), 'p95_ms': round(p95, 2), 'p95_budget_ms': p95_budget,
+            'over_latency_budget': p95 > p95_budget,
+        })
+
+        self.assertLessEqual(
+            len(captured), queries,
+            f"{method.upper()} {path} ran {len(captured)} queries (budget {queries}):\n"
+            + "\n".join(query['sql'] for query in captured)
+        )
+        if ENFORCE_LATENCY:
+            self.assertLessEqual(
+                p95, p95_budget,
+                f"{method.upper()} {path} p95 is {p95:.1f} ms (budget {p95_budget:.0f} ms, p50 {p50:.1f} ms)"
+            )
+        return response
+
+    def assertConstantQueries(self, *paths, user=None):
+        """The paths (pages with different contents) run as many queries as each other"""
+        counts = {path: len(self.count_queries(path, user)[0]) for path in paths}
+        self.assertEqual(len(set(counts.values())), 1, f"Query counts depend on the page: {counts}")
+
+    @classmethod
+    def report(cls):
+        if not cls.measurements:
+            return
+        lines = [f"\n{cls.__module__}.{cls.__name__}"]
+        for row in cls.measurements:
+            lines.append(
+                f"  {row['method']:<6} {row['path']:<58} {row['queries']:3d}/{row['query_budget']:<3d} queries"
+                f"  p50 {row['p50_ms']:7.2f} ms  p95 {row['p95_ms']:7.2f}/{row['p95_budget_ms']:.0f} ms"
+                + ("  over budget" if row['over_latency_budget'] else "")
+            )
+        sys.stderr.write("\n".join(lines) + "\n")
+
+        if REPORT:
+            existing = []
+            if os.path.exists(REPORT):
+                with open(REPORT) as file:
+                    existing = json.load(file)
+            with open(REPORT, 'w') as file:
+                json.dump(existing + cls.measurements, file, indent=2)
@@ -0,0 +1,87 @@
+import cloudinary
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TransactionTestCase, modify_settings, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from attendee.models import SavedEvent
+from organizers.management.commands._benchmark import create_event, create_organizer
+from tixly.db import PIN_COOKIE
+
+
+# Committed rows, so the replica's connection sees them. Silk would keep
+# recording (and EXPLAINing) the queries of later suites.
+@override_settings(DATABASE_REPLICAS=['replica'], ALLOWED_HOSTS=['testserver'], RATE_LIMIT_ENABLED=False)
+@modify_settings(MIDDLEWARE={'remove': ['silk.middleware.SilkyMiddleware']})
+class PrimaryReplicaRouterTests(TransactionTestCase):
+    def setUp(self):
+        # A second connection to the test database stands in for the replica
+        connections['replica'] = connections.create_connection(DEFAULT_DB_ALIAS)
+        self.addCleanup(self.drop_replica)
+        # Serializers build image URLs, which needs a cloud name (no API calls)
+        self.addCleanup(cloudinary.config, cloud_name=cloudinary.config().cloud_name)
+        cloudinary.config(cloud_name=cloudinary.config().cloud_name or 'tixly-test')
+        cache.clear()
+        self.event = create_event(create_organizer(), 'Launch')
+        self.attendee = User.objects.create_user(
+            email='replica@example.com', username='replica', first_name='Replica', last_name='User',
+            role='attendee', password='a-long-password-1',
+        )
+
+    def drop_replica(self):
+        connections['replica'].close()
+        del connections['replica']
+
+    def client_for(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    def send(self, client, method, path, data=None):
+        """(response, primary query count, replica query count)"""
+        with CaptureQueriesContext(connections['default']) as primary:
+            with CaptureQueriesContext(connections['replica']) as replica:
+                response = getattr(client, method)(path, data, format='json')
+        return response, len(primary), len(replica)
+
+    def test_catalog_reads_go_to_the_replica(self):
+        response, primary, replica = self.send(self.client_for(), 'get', '/api/events/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_other_views_read_from_the_primary(self):
+        response, primary, replica = self.send(self.client_for(self.attendee), 'get', '/api/events/saved/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_writes_go_to_the_primary_and_pin_the_client(self):
+        client = self.client_for(self.attendee)
+        response, primary, replica = self.send(client, 'post', '/api/events/saved/', {'event_id': self.event.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+        self.assertTrue(SavedEvent.objects.filter(user=self.attendee, event=self.event).exists())
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        # The cookie pins this client...
+        _, primary, replica = self.send(client, 'get', '/api/events/')
+        self.assertEqual((primary > 0, replica), (True, 0))
+        # ...and the cache entry the user, on clients that drop cookies
+        _, primary, replica = self.send(self.client_for(self.attendee), 'get', '/api/events/')
+        self.assertEqual((primary > 0, replica), (True, 0))
+        # Other clients still read from the replica
+        _, primary, replica = self.send(self.client_for(), 'get', '/api/events/')
+        self.assertEqual((primary, replica > 0), (0, True))
+
+    def test_failed_writes_do_not_pin(self):
+        response, _, _ = self.send(self.client_for(self.attendee), 'post', '/api/events/saved/', {})
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        _, primary, replica = self.send(self.client_for(self.attendee), 'get', '/api/events/')
+        self.assertEqual((primary, replica > 0), (0, True))
@@ -33,6 +33,7 @@ urlpatterns = [
     
     # Your application endpoints
     path('api/organizer/', include('organizers.urls')),
+    path('api/organizer/analytics/', include('analytics.urls')),
     path('api/', include('attendee.urls')),
 
     # API Documentation